@@ -0,0 +1,69 @@
+from settings import *
+
+
+class AssetCache:
+    """
+    Process-wide image cache keyed by path and conversion mode.
+
+    Each image is read from disk and converted once; every caller gets the same shared surface,
+    so restarts and mass enemy spawns cost no disk I/O or PNG decoding.
+    """
+
+    MODES = ('alpha', 'opaque', None)
+
+    def __init__(self):
+        self.images = {}
+        self.hits = 0
+        self.misses = 0
+
+    def image(self, path, mode='alpha'):
+        """
+        Return the shared surface for an image file.
+
+        Args:
+            path (str): Path of the image file.
+            mode (str): 'alpha' for convert_alpha(), 'opaque' for convert(), None to keep it as decoded.
+        """
+        key = (path, mode)
+        entry = self.images.get(key)
+        if entry and (entry[1] or not pygame.display.get_surface()):
+            self.hits += 1
+            return entry[0]
+        if entry:
+            # Decoded before a display existed (e.g. preloaded headless); convert it now
+            self.hits += 1
+            surface = entry[0]
+        else:
+            self.misses += 1
+            surface = pygame.image.load(path)
+        surface, converted = self.convert(surface, mode)
+        self.images[key] = (surface, converted)
+        return surface
+
+    @staticmethod
+    def convert(surface, mode):
+        """Convert a surface to the display format if a display is available."""
+        if mode is None:
+            return surface, True
+        if not pygame.display.get_surface():
+            return surface, False
+        return (surface.convert_alpha() if mode == 'alpha' else surface.convert()), True
+
+    def preload(self, paths, mode='alpha'):
+        """Load a batch of images ahead of time."""
+        for path in paths:
+            self.image(path, mode)
+
+    def evict(self, path=None):
+        """Drop one image (every mode) or, with no path, the whole cache."""
+        if path is None:
+            self.images.clear()
+        else:
+            for mode in self.MODES:
+                self.images.pop((path, mode), None)
+
+    def stats(self):
+        return {'images': len(self.images), 'hits': self.hits, 'misses': self.misses}
+
+
+assets = AssetCache()
@@ -0,0 +1,154 @@
+import argparse
+import csv
+import json
+import os
+import time
+from multiprocessing import get_context
+from random import Random
+from settings import *
+from controls import InputState, ScriptedInput
+from simulation import Simulation
+
+
+def idle_policy(world, rng):
+    """Stand still and never fire."""
+    return InputState((0, 0), False, False, (1, 0))
+
+
+def random_policy(world, rng, hold=30):
+    """Mash random keys, keeping each choice for `hold` ticks."""
+    if world.steps % hold == 0:
+        world.random_input = InputState(
+            move=(rng.randint(-1, 1), rng.randint(-1, 1)),
+            sprint=rng.random() < 0.3,
+            fire=rng.random() < 0.5,
+            aim=(rng.uniform(-1, 1), rng.uniform(-1, 1)),
+        )
+    return world.random_input
+
+
+def hunter_policy(world, rng, danger=200):
+    """Shoot the nearest enemy, back away from it when close, otherwise walk toward the boss."""
+    player = pygame.Vector2(world.player.rect.center)
+    enemies = [pygame.Vector2(enemy.rect.center) for enemy in world.enemy_sprites]
+    target = min(enemies, key=player.distance_squared_to) if enemies else pygame.Vector2(world.boss.rect.center)
+    offset = target - player
+    if enemies and offset.length() < danger:
+        move = -offset
+    else:
+        move = pygame.Vector2(world.boss.rect.center) - player
+    return InputState(
+        move=(int(move.x > 8) - int(move.x < -8), int(move.y > 8) - int(move.y < -8)),
+        sprint=False,
+        fire=True,
+        aim=tuple(offset) if offset else (1, 0),
+    )
+
+
+POLICIES = {'idle': idle_policy, 'random': random_policy, 'hunter': hunter_policy}
+
+FIELDS = ('run', 'seed', 'policy', 'level', 'enemies', 'result', 'time_to_win', 'sim_time', 'steps',
+          'wall_time', 'step_ms_mean', 'step_ms_p95', 'step_ms_max', 'active_max')
+
+
+def play(spec):
+    """
+    Play one headless game.
+
+    Args:
+        spec (dict): run, seed, policy, level, enemies (None for the level's own) and max_time in seconds.
+
+    Returns:
+        dict: The spec merged with the Simulation.run() report and time_to_win (None unless won).
+    """
+    rng = Random(spec['seed'])
+    controls = ScriptedInput(lambda world: POLICIES[spec['policy']](world, rng))
+    simulation = Simulation(controls, spec['level'], enemy_count=spec['enemies'], seed=spec['seed'])
+    report = simulation.run(int(spec['max_time'] / simulation.timestep))
+    report['enemies'] = len(simulation.enemy_sprites) if spec['enemies'] is None else spec['enemies']
+    report['time_to_win'] = report['sim_time'] if report['result'] == 'win' else None
+    return {**spec, **report}
+
+
+def run_batch(runs, policy='hunter', level=LEVEL_PATH, enemies=None, max_time=120, seed=0, workers=None):
+    """
+    Play `runs` games across a process pool, one Simulation per game.
+
+    Run i uses seed + i, so a batch is reproducible and runs are independent of the worker count.
+    With workers=1 the games are played in this process.
+
+    Returns:
+        list: One result dict per run, in run order.
+    """
+    specs = [{'run': i, 'seed': seed + i, 'policy': policy, 'level': level, 'enemies': enemies,
+              'max_time': max_time} for i in range(runs)]
+    if workers == 1:
+        return [play(spec) for spec in specs]
+    # Spawned rather than forked: a worker forked after pygame.init inherits SDL's state and its
+    # SIGTERM handler, and can hang the pool on shutdown
+    pool = get_context('spawn').Pool(workers)
+    try:
+        return pool.map(play, specs)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def summarize(results):
+    """Aggregate outcome counts, time to win and step cost over a batch."""
+    wins = [result['time_to_win'] for result in results if result['result'] == 'win']
+    steps = sum(result['steps'] for result in results)
+    return {
+        'runs': len(results),
+        'wins': len(wins),
+        'losses': sum(result['result'] == 'lose' for result in results),
+        'timeouts': sum(result['result'] is None for result in results),
+        'mean_time_to_win': sum(wins) / len(wins) if wins else None,
+        'steps': steps,
+        'step_ms_mean': sum(result['step_ms_mean'] * result['steps'] for result in results) / max(steps, 1),
+        'step_ms_p95_max': max((result['step_ms_p95'] for result in results), default=None),
+    }
+
+
+def write_results(results, path):
+    """Write one row per run as CSV, or the runs plus a summary as JSON if path ends in .json."""
+    if path.endswith('.json'):
+        with open(path, 'w') as file:
+            json.dump({'summary': summarize(results), 'runs': [{key: result[key] for key in FIELDS}
+                                                                for result in results]}, file, indent=2)
+    else:
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, FIELDS, extrasaction='ignore')
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    parser = argparse.ArgumentParser(description='Play many headless games in parallel.')
+    parser.add_argument('--runs', type=int, default=os.cpu_count())
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per core)')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='hunter')
+    parser.add_argument('--level', default=LEVEL_PATH)
+    parser.add_argument('--enemies', type=int, default=None, help="enemy count (default: the level's)")
+    parser.add_argument('--max-time', type=float, default=120, help='simulated seconds per run')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='batch_results.csv')
+    parser.add_argument('--history', action='store_true', help='also record runs in the game history as <policy>-bot')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = run_batch(args.runs, args.policy, args.level, args.enemies, args.max_time, args.seed, args.workers)
+    write_results(results, args.output)
+    if args.history:
+        from history import HistoryStore
+        store = HistoryStore()
+        for result in results:
+            if result['result']:
+                store.record(f"{result['policy']}-bot", result['sim_time'], result['result'])
+        store.close()
+    summary = summarize(results)
+    print(f"{summary['runs']} runs in {time.perf_counter() - start:.1f}s: {summary['wins']} won, "
+          f"{summary['losses']} lost, {summary['timeouts']} timed out; "
+          f"mean time to win {summary['mean_time_to_win']}, {summary['step_ms_mean']:.3f} ms/step")
+    print(f"results written to {args.output}")
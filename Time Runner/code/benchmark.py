@@ -0,0 +1,411 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from random import Random
+from settings import *
+from assets import assets
+from sprites import Sprite, CollisionSprite, Tile, Enemy, Bullet
+from groups import AllSprites, CollisionSprites
+
+BASELINE_PATH = 'benchmark_baseline.json'
+
+
+def make_tiles(map_size, layers=4, seed=0, compact=True):
+    """Build map_size x map_size tiles per layer from random tileset tiles (Tile, or Sprite if not compact)."""
+    rng = Random(seed)
+    tileset = assets.image(join('data', 'maps', 'maplvl1', 'Hexed Forest 1.4', 'tiles', 'hexedforest_tileset.png'))
+    columns, rows = tileset.get_width() // TILE_SIZE, tileset.get_height() // TILE_SIZE
+    images = [tileset.subsurface((c * TILE_SIZE, r * TILE_SIZE, TILE_SIZE, TILE_SIZE)) for c in range(columns) for r in range(rows)]
+    tiles = []
+    for layer in range(layers):
+        for x in range(map_size):
+            for y in range(map_size):
+                # Upper layers are sparse, like the Cliff/Objects layers of the real map
+                if layer == 0 or rng.random() < 0.2:
+                    pos, image = (x * TILE_SIZE, y * TILE_SIZE), rng.choice(images)
+                    tiles.append(Tile(pos, image) if compact else Sprite(pos, image, ()))
+    return tiles
+
+
+def bench_draw(map_size, chunked, frames=120):
+    """Return the average frames per second of AllSprites.draw while panning over the map."""
+    group = AllSprites(chunked=chunked)
+    group.set_static(make_tiles(map_size))
+    span = max(map_size * TILE_SIZE - WINDOW_WIDTH, 1)
+    start = time.perf_counter()
+    for frame in range(frames):
+        x = WINDOW_WIDTH / 2 + span * frame / frames
+        group.display_surface.fill('black')
+        group.draw((x, x))
+    return frames / (time.perf_counter() - start)
+
+
+def run_draw_comparison(sizes=(50, 100, 200, 400)):
+    print(f"{'map':>8} {'legacy fps':>12} {'chunked fps':>12} {'speedup':>8}")
+    for size in sizes:
+        legacy = bench_draw(size, chunked=False, frames=30 if size > 100 else 120)
+        chunked = bench_draw(size, chunked=True)
+        print(f"{f'{size}x{size}':>8} {legacy:>12.1f} {chunked:>12.1f} {chunked / legacy:>7.1f}x")
+
+
+def make_walls(map_size, count, seed=0, compact=True):
+    """Scatter wall colliders over a map_size x map_size tile area (Collider rects, or CollisionSprites with surfaces)."""
+    rng = Random(seed)
+    walls = CollisionSprites()
+    extent = map_size * TILE_SIZE
+    for _ in range(count):
+        x, y = rng.uniform(0, extent), rng.uniform(0, extent)
+        width, height = rng.randint(TILE_SIZE, TILE_SIZE * 5), rng.randint(TILE_SIZE, TILE_SIZE * 5)
+        if compact:
+            walls.add_rect(x, y, width, height)
+        else:
+            CollisionSprite((x, y), pygame.Surface((width, height)), walls)
+    walls.build_index()
+    return walls
+
+
+def make_enemies(count, walls, map_size, swarm=None, seed=0):
+    """Spawn enemies at random positions chasing a target in the middle of the map."""
+    rng = Random(seed)
+    extent = map_size * TILE_SIZE
+    target = Sprite((extent / 2, extent / 2), pygame.Surface((59, 87)), ())
+    enemies = [Enemy((rng.uniform(0, extent), rng.uniform(0, extent)), (), target, walls, swarm) for _ in range(count)]
+    return target, enemies
+
+
+def bench_enemies(count, use_swarm, frames=60, map_size=50):
+    """Return the average milliseconds per frame to move count enemies."""
+    from swarm import EnemySwarm
+    walls = make_walls(map_size, 150)
+    swarm = EnemySwarm(walls) if use_swarm else None
+    target, enemies = make_enemies(count, walls, map_size, swarm)
+    start = time.perf_counter()
+    for _ in range(frames):
+        if swarm:
+            swarm.update(target.rect.center, 1 / 60)
+        else:
+            for enemy in enemies:
+                enemy.update(1 / 60)
+    return (time.perf_counter() - start) * 1000 / frames
+
+
+def run_enemy_comparison(counts=(30, 300, 1000, 3000)):
+    print(f"{'enemies':>8} {'per-Enemy ms':>13} {'swarm ms':>9} {'speedup':>8}")
+    for count in counts:
+        legacy = bench_enemies(count, use_swarm=False, frames=10 if count > 300 else 60)
+        swarm = bench_enemies(count, use_swarm=True)
+        print(f"{count:>8} {legacy:>13.2f} {swarm:>9.2f} {legacy / swarm:>7.1f}x")
+
+
+def bench_flow_field(map_size, rebuilds=5):
+    """Return the average milliseconds to rebuild a flow field over a map_size x map_size map."""
+    from pathfinding import FlowField
+    walls = make_walls(map_size, map_size * map_size // 16)
+    field = FlowField(walls, map_size, map_size)
+    start = time.perf_counter()
+    for i in range(rebuilds):
+        field.rebuild((i, map_size // 2))
+    return (time.perf_counter() - start) * 1000 / rebuilds
+
+
+def run_flow_field_timing(sizes=(50, 100, 200, 400)):
+    print(f"{'map':>8} {'rebuild ms':>11}")
+    for size in sizes:
+        print(f"{f'{size}x{size}':>8} {bench_flow_field(size):>11.2f}")
+
+
+def measure_storage(map_size, compact):
+    """
+    Build the tiles and colliders of a map_size x map_size map.
+
+    Returns:
+        tuple: (build ms, Python heap MB from tracemalloc, MB of collider surface pixels).
+    """
+    make_tiles(1)  # load the tileset outside the measurement
+    start = time.perf_counter()
+    make_tiles(map_size, compact=compact)
+    make_walls(map_size, map_size * map_size // 16, compact=compact)
+    elapsed = (time.perf_counter() - start) * 1000
+    tracemalloc.start()
+    tiles = make_tiles(map_size, compact=compact)
+    walls = make_walls(map_size, map_size * map_size // 16, compact=compact)
+    heap = tracemalloc.get_traced_memory()[0] / 2 ** 20
+    tracemalloc.stop()
+    pixels = sum(wall.image.get_width() * wall.image.get_height() * wall.image.get_bytesize()
+                 for wall in walls if hasattr(wall, 'image')) / 2 ** 20
+    del tiles, walls
+    return elapsed, heap, pixels
+
+
+def run_storage_report(sizes=(100, 200, 400)):
+    print(f"{'map':>8} {'sprite ms':>10} {'sprite MB':>10} {'surface MB':>11} {'compact ms':>11} {'compact MB':>11}")
+    for size in sizes:
+        legacy_ms, legacy_heap, legacy_pixels = measure_storage(size, compact=False)
+        compact_ms, compact_heap, _ = measure_storage(size, compact=True)
+        print(f"{f'{size}x{size}':>8} {legacy_ms:>10.0f} {legacy_heap:>10.1f} {legacy_pixels:>11.1f} "
+              f"{compact_ms:>11.0f} {compact_heap:>11.1f}")
+
+
+def write_large_map(path, map_size, enemies=1000, seed=0):
+    """
+    Write a map_size x map_size TMX from random tileset tiles, with random wall colliders, enemy
+    spawns, the player near the top left corner and the boss in the bottom right one.
+    """
+    rng = Random(seed)
+    tileset = os.path.abspath(join('data', 'maps', 'maplvl1', 'Hexed Forest 1.4', 'tiles', 'hexedforest_tileset.png'))
+    pixels = map_size * TILE_SIZE
+    with open(path, 'w') as file:
+        file.write(f'<?xml version="1.0" encoding="UTF-8"?>\n<map orientation="orthogonal" width="{map_size}" '
+                   f'height="{map_size}" tilewidth="{TILE_SIZE}" tileheight="{TILE_SIZE}">\n'
+                   f'<tileset firstgid="1" name="tiles" tilewidth="{TILE_SIZE}" tileheight="{TILE_SIZE}" columns="30">'
+                   f'<image source="{tileset}"/></tileset>\n')
+        for index, name in enumerate(TILE_LAYERS):
+            # The ground is filled, upper layers are sparse like the real map
+            density = 1 if index == 0 else 0.05
+            file.write(f'<layer name="{name}" width="{map_size}" height="{map_size}"><data encoding="csv">\n')
+            for _ in range(map_size):
+                file.write(','.join(str(rng.randint(1, 900) if rng.random() < density else 0)
+                                    for _ in range(map_size)) + ',\n')
+            file.write('</data></layer>\n')
+        file.write('<objectgroup name="Collisions">\n')
+        for _ in range(map_size * map_size // 64):
+            file.write(f'<object x="{rng.uniform(0, pixels)}" y="{rng.uniform(0, pixels)}" '
+                       f'width="{rng.uniform(16, 96)}" height="{rng.uniform(16, 96)}"/>\n')
+        file.write('</objectgroup>\n<objectgroup name="Spawns">\n')
+        file.write(f'<object name="player" x="{4 * TILE_SIZE}" y="{4 * TILE_SIZE}"/>\n')
+        file.write(f'<object name="boss" x="{pixels - 8 * TILE_SIZE}" y="{pixels - 8 * TILE_SIZE}"/>\n')
+        for _ in range(enemies):
+            file.write(f'<object name="enemy" x="{rng.uniform(0, pixels)}" y="{rng.uniform(0, pixels)}"/>\n')
+        file.write('</objectgroup>\n</map>\n')
+
+
+def run_streaming_report(map_size=1000, speed=32):
+    """
+    Fly the camera diagonally across a streamed map_size x map_size map at TARGET_FPS and report
+    per-frame streaming cost and the chunks, surface memory and colliders resident at peak.
+    """
+    import tempfile
+    from level import compile_level
+    from world import World
+    directory = tempfile.mkdtemp()
+    path = join(directory, 'large.tmx')
+    write_large_map(path, map_size)
+    start = time.perf_counter()
+    compile_level(path)
+    print(f"{map_size}x{map_size} map compiled in {time.perf_counter() - start:.1f}s")
+    start = time.perf_counter()
+    world = World(path, stream=True)
+    print(f"world ready in {(time.perf_counter() - start) * 1000:.0f} ms")
+    times, peak_chunks, peak_pixels, peak_colliders = [], 0, 0, 0
+    center = pygame.Vector2(world.player.rect.center)
+    while center.x < map_size * TILE_SIZE - WINDOW_WIDTH:
+        center += (speed, speed * 0.6)
+        start = time.perf_counter()
+        world.streamer.update(center)
+        elapsed = time.perf_counter() - start
+        times.append(elapsed * 1000)
+        time.sleep(max(0.0, 1 / TARGET_FPS - elapsed))
+        peak_chunks = max(peak_chunks, len(world.streamer.loaded))
+        peak_pixels = max(peak_pixels, sum(surface.get_width() * surface.get_height() * surface.get_bytesize()
+                                           for surface, _ in world.all_sprites.chunks.values()))
+        peak_colliders = max(peak_colliders, len(world.collision_sprites))
+    world.streamer.close()
+    times.sort()
+    stats = world.streamer.stats()
+    print(f"{len(times)} frames: update mean {statistics.mean(times):.3f} ms, p99 {times[int(0.99 * len(times))]:.3f} ms, "
+          f"max {times[-1]:.3f} ms")
+    print(f"chunks loaded {stats['loads']}, evicted {stats['evictions']}, peak resident {peak_chunks}, "
+          f"chunk surfaces {peak_pixels / 2 ** 20:.0f} MB, peak colliders {peak_colliders}")
+
+
+def measure(operation, repeat, prepare=None):
+    """Return the median milliseconds of `repeat` calls of operation(), calling prepare() untimed before each."""
+    times = []
+    for _ in range(repeat):
+        if prepare:
+            prepare()
+        start = time.perf_counter()
+        operation()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def scenario_draw(map_size, repeat):
+    """One AllSprites.draw frame over a map_size x map_size map, as configured in settings."""
+    group = AllSprites()
+    group.set_static(make_tiles(map_size))
+    center = (map_size * TILE_SIZE / 2,) * 2
+    return measure(lambda: group.draw(center), repeat)
+
+
+def scenario_enemies(count, repeat):
+    """One frame of Enemy.update (move and wall collision) for count enemies."""
+    walls = make_walls(50, 150)
+    _, enemies = make_enemies(count, walls, 50)
+
+    def frame():
+        for enemy in enemies:
+            enemy.update(FIXED_TIMESTEP)
+    return measure(frame, repeat)
+
+
+def scenario_arrow_collision(bullets, repeat, enemies=200):
+    """One World.arrow_collision pass with `bullets` bullets among `enemies` enemies."""
+    from simulation import Simulation
+    world = Simulation(enemy_count=0)
+    rng = Random(0)
+    extent = world.level.width * TILE_SIZE, world.level.height * TILE_SIZE
+    enemy_sprites = [Enemy((rng.uniform(0, extent[0]), rng.uniform(0, extent[1])), (), world.player,
+                           world.collision_sprites) for _ in range(enemies)]
+    bullet_sprites = [Bullet(world.bullet_surf, (rng.uniform(0, extent[0]), rng.uniform(0, extent[1])),
+                             pygame.Vector2(1, 0), ()) for _ in range(bullets)]
+
+    def prepare():
+        # Hits kill sprites, so every pass starts from the same population
+        world.enemy_sprites.add(enemy_sprites)
+        world.bullet_sprites.add(bullet_sprites)
+    return measure(world.arrow_collision, repeat, prepare)
+
+
+def scenario_setup(enemy_count, repeat):
+    """Build a headless World: level load (cache or TMX), static tiles, colliders and spawns."""
+    from simulation import Simulation
+    return measure(lambda: Simulation(enemy_count=enemy_count), repeat)
+
+
+def scenario_world_setup(enemy_count, repeat):
+    """Build a World as Game does: level with tile images, baked chunk surfaces, colliders and spawns."""
+    from simulation import Simulation
+    if pygame.display.get_surface() is None:
+        pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    return measure(lambda: Simulation(enemy_count=enemy_count, headless=False), repeat)
+
+
+def scenario_restart(enemy_count, repeat):
+    """World.restart_game with enemy_count enemies respawned."""
+    from simulation import Simulation
+    world = Simulation(enemy_count=enemy_count)
+    return measure(world.restart_game, repeat)
+
+
+# name: (function, parameter name, parameter values, repeats)
+SCENARIOS = {
+    'draw': (scenario_draw, 'map_size', (50, 100, 200), 30),
+    'enemy_update': (scenario_enemies, 'enemies', (30, 300, 1000), 10),
+    'arrow_collision': (scenario_arrow_collision, 'bullets', (10, 100, 500), 20),
+    'setup': (scenario_setup, 'enemies', (7, 100, 1000), 5),
+    'world_setup': (scenario_world_setup, 'enemies', (7, 100, 1000), 5),
+    'restart': (scenario_restart, 'enemies', (7, 100, 1000), 10),
+}
+
+
+def run_suite(names=None, quick=False):
+    """
+    Run the benchmark scenarios.
+
+    Args:
+        names (iterable): Scenarios to run (default: all).
+        quick (bool): Only the smallest parameter of each scenario, with fewer repeats.
+
+    Returns:
+        list: {'scenario', 'param', 'value', 'ms'} records, ms being the median per operation.
+    """
+    results = []
+    for name in names or SCENARIOS:
+        function, param, values, repeat = SCENARIOS[name]
+        for value in values[:1] if quick else values:
+            ms = function(value, max(repeat // 5, 2) if quick else repeat)
+            results.append({'scenario': name, 'param': param, 'value': value, 'ms': round(ms, 4)})
+    return results
+
+
+def write_results(results, path):
+    with open(path, 'w') as file:
+        json.dump({'python': platform.python_version(), 'pygame': pygame.version.ver,
+                   'machine': platform.machine(), 'platform': platform.platform(),
+                   'results': results}, file, indent=2)
+
+
+def read_results(path):
+    with open(path) as file:
+        return json.load(file)['results']
+
+
+def compare(results, baseline, tolerance=0.2):
+    """
+    Compare results against a baseline run.
+
+    Returns:
+        list: (scenario, param, value, baseline ms, ms, ratio, regressed) for every measurement present
+        in both, regressed meaning more than `tolerance` slower than the baseline.
+    """
+    previous = {(record['scenario'], record['value']): record['ms'] for record in baseline}
+    rows = []
+    for record in results:
+        old = previous.get((record['scenario'], record['value']))
+        if old is None:
+            continue
+        ratio = record['ms'] / old if old else 1.0
+        rows.append((record['scenario'], record['param'], record['value'], old, record['ms'], ratio,
+                     ratio > 1 + tolerance))
+    return rows
+
+
+def print_comparison(rows):
+    print(f"{'scenario':>16} {'param':>16} {'baseline ms':>12} {'ms':>10} {'ratio':>7}")
+    for scenario, param, value, old, new, ratio, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{scenario:>16} {f'{param}={value}':>16} {old:>12.3f} {new:>10.3f} {ratio:>6.2f}x{flag}")
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    parser = argparse.ArgumentParser(description='Headless performance benchmarks.')
+    parser.add_argument('scenarios', nargs='*', help=f"any of {', '.join(SCENARIOS)} (default: all)")
+    parser.add_argument('--quick', action='store_true', help='smallest size of each scenario only')
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--save-baseline', action='store_true', help='store this run as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown before failing')
+    parser.add_argument('--comparisons', action='store_true',
+                        help='run the legacy-vs-optimized comparisons instead of the suite')
+    parser.add_argument('--storage', action='store_true',
+                        help='report tile and collider memory and build time, sprites vs compact storage')
+    parser.add_argument('--streaming', type=int, metavar='MAP_SIZE',
+                        help='stream a generated MAP_SIZE x MAP_SIZE map and report its cost and memory')
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario: {', '.join(sorted(unknown))}")
+
+    pygame.init()
+    pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    if args.comparisons:
+        run_draw_comparison()
+        run_enemy_comparison()
+        run_flow_field_timing()
+        sys.exit()
+    if args.storage:
+        run_storage_report()
+        sys.exit()
+    if args.streaming:
+        run_streaming_report(args.streaming)
+        sys.exit()
+
+    results = run_suite(args.scenarios, args.quick)
+    write_results(results, args.output)
+    for record in results:
+        print(f"{record['scenario']:>16} {record['param']}={record['value']:<6} {record['ms']:>10.3f} ms")
+    if args.save_baseline:
+        write_results(results, args.baseline)
+        print(f"baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        rows = compare(results, read_results(args.baseline), args.tolerance)
+        print_comparison(rows)
+        if any(row[-1] for row in rows):
+            sys.exit(1)
@@ -0,0 +1,49 @@
+from collections import namedtuple
+from settings import *
+
+
+class InputState(namedtuple('InputState', 'move sprint fire aim')):
+    """
+    One tick of player input, independent of where it came from.
+
+    Attributes:
+        move (tuple): (x, y) movement axes, each -1, 0 or 1.
+        sprint (bool): Sprint key held.
+        fire (bool): Fire button held.
+        aim (tuple): Aim vector from the player (screen center) toward the cursor.
+    """
+
+    __slots__ = ()
+
+
+IDLE_INPUT = InputState((0, 0), False, False, (1, 0))
+
+
+class PygameInput:
+    """Reads the keyboard and mouse of the live pygame window."""
+
+    def poll(self):
+        keys = pygame.key.get_pressed()
+        mouse_x, mouse_y = pygame.mouse.get_pos()
+        return InputState(
+            move=(int(keys[pygame.K_d]) - int(keys[pygame.K_a]), int(keys[pygame.K_s]) - int(keys[pygame.K_w])),
+            sprint=bool(keys[pygame.K_SPACE]),
+            fire=bool(pygame.mouse.get_pressed()[0]),
+            aim=(mouse_x - WINDOW_WIDTH / 2, mouse_y - WINDOW_HEIGHT / 2),
+        )
+
+
+class ScriptedInput:
+    """
+    Input source driven by a policy function, for headless runs and tests.
+
+    Args:
+        policy (callable): Called with the World each tick; returns an InputState.
+    """
+
+    def __init__(self, policy=lambda world: IDLE_INPUT):
+        self.policy = policy
+        self.world = None
+
+    def poll(self):
+        return self.policy(self.world)
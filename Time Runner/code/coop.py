@@ -0,0 +1,543 @@
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import OrderedDict, deque
+from settings import *
+from controls import IDLE_INPUT
+from groups import CollisionSprites
+from level import Level
+from player import Player
+from replay import quantize
+from simulation import Simulation
+from sprites import Arrow
+from netcode import *
+
+
+class Seat:
+    """One connected player in a CoopWorld: its sprites, shooting timer and current input."""
+
+    def __init__(self, player, arrow):
+        self.player = player
+        self.arrow = arrow
+        self.input = IDLE_INPUT
+        self.can_shoot = True
+        self.shoot_time = 0
+        self.down = False
+
+
+class CoopWorld(Simulation):
+    """
+    Headless world with one Player per connected client, simulated by CoopServer.
+
+    Enemies chase the nearest standing player. The swarm, flow field and enemy LOD are built
+    around a single player, so they are off in co-op. A caught player is down for the rest of the round, and
+    the round is lost once every player is down.
+
+    Args:
+        level_path (str): Level to load.
+        enemy_count (int): Enemy count override (see Simulation).
+        seed (int): Spawn seed.
+    """
+
+    swarm_enabled = False
+    flow_field_enabled = False
+    lod_enabled = False
+
+    def __init__(self, level_path=LEVEL_PATH, enemy_count=None, seed=0):
+        self.seats = {}
+        self.spawn_point = (0, 0)
+        self.net_ids = {}
+        self.next_net_id = 1
+        super().__init__(level_path=level_path, enemy_count=enemy_count, seed=seed, stream=False)
+
+    def spawn(self, spawn):
+        # Players join through add_player(); the level's player spawn is where they appear
+        if spawn.name == 'player':
+            self.spawn_point = spawn.pos
+            self.player = None
+        else:
+            super().spawn(spawn)
+
+    def add_player(self, client_id):
+        player = Player(self.spawn_point, self.all_sprites, self.collision_sprites)
+        self.seats[client_id] = Seat(player, Arrow(player, self.all_sprites))
+        return self.seats[client_id]
+
+    def remove_player(self, client_id):
+        seat = self.seats.pop(client_id, None)
+        if seat:
+            seat.player.kill()
+            seat.arrow.kill()
+
+    def fire(self, seat):
+        """World.input and World.arrow_timer for one seat."""
+        if not seat.can_shoot and self.ticks() - seat.shoot_time >= self.arrow_cooldown:
+            seat.can_shoot = True
+        if seat.input.fire and seat.can_shoot and seat.player.ammo_count == 1:
+            pos = seat.arrow.rect.center + seat.arrow.player_direction * 50
+            self.bullet_pool.acquire(self.bullet_surf, pos, seat.arrow.player_direction,
+                                     (self.all_sprites, self.bullet_sprites), self.boss)
+            seat.player.ammo_count -= 1
+            seat.can_shoot = False
+            seat.shoot_time = self.ticks()
+
+    def caught(self, player):
+        candidates = pygame.sprite.spritecollide(player, self.enemy_sprites, False)
+        self.broad_phase_pairs += len(candidates)
+        if any(self.collide_mask(player, enemy) for enemy in candidates):
+            return True
+        return bool(self.boss and player.rect.colliderect(self.boss.rect) and self.collide_mask(player, self.boss))
+
+    def step(self, delta_time, state=IDLE_INPUT):
+        """Advance one tick with every seat's current input; `state` is unused (inputs come per seat)."""
+        self.sim_time += delta_time
+        self.broad_phase_pairs = 0
+        self.narrow_phase_tests = 0
+        standing = [seat for seat in self.seats.values() if not seat.down]
+        if not standing:
+            return
+        for seat in standing:
+            seat.player.input_state = seat.input
+            self.fire(seat)
+        self.arrow_collision()
+        for seat in standing:
+            if self.caught(seat.player):
+                seat.down = True
+                seat.player.kill()
+                seat.arrow.kill()
+        targets = [seat.player for seat in standing if not seat.down]
+        if not targets:
+            self.game_over_state = True
+            return
+        for enemy in self.enemy_sprites:
+            enemy.player = min(targets, key=lambda player: (player.rect.centerx - enemy.rect.centerx) ** 2
+                               + (player.rect.centery - enemy.rect.centery) ** 2)
+        self.all_sprites.update(delta_time)
+
+    def restart_game(self):
+        """Start a new round with everyone who is connected."""
+        client_ids = list(self.seats)
+        self.seats.clear()
+        super().restart_game()
+        for client_id in client_ids:
+            self.add_player(client_id)
+
+    def net_id(self, sprite, live):
+        entity_id = self.net_ids.get(sprite)
+        if entity_id is None:
+            entity_id = self.net_ids[sprite] = self.next_net_id
+            self.next_net_id = self.next_net_id % 0xFFFF + 1
+        live[sprite] = entity_id
+        return entity_id
+
+    def snapshot(self):
+        """
+        Quantized state of every entity, keyed by a network id that stays the same while it lives.
+
+        Returns:
+            tuple: (entities, {client id: entity id of its player}).
+        """
+        live = {}
+        entities = {}
+        own = {}
+        for client_id, seat in self.seats.items():
+            player = seat.player
+            entity_id = own[client_id] = self.net_id(player, live)
+            entities[entity_id] = entity_state(PLAYER, player.rect.center, player.stamina * 5,
+                                               player.ammo_count * 250, PLAYER_DOWN if seat.down else 0)
+        for kind, group in ((ENEMY, self.enemy_sprites), (BULLET, self.bullet_sprites)):
+            for sprite in group:
+                entities[self.net_id(sprite, live)] = entity_state(kind, sprite.rect.center)
+        if self.boss and self.boss.alive():
+            entities[self.net_id(self.boss, live)] = entity_state(BOSS, self.boss.rect.center, self.boss.health)
+        # Sprites that left the world give up their id; a recycled one comes back with a new id
+        self.net_ids = live
+        return entities, own
+
+
+class ClientConnection:
+    """Server-side state of one client: queued inputs, acknowledged snapshots and traffic."""
+
+    def __init__(self, client_id, writer):
+        self.id = client_id
+        self.writer = writer
+        self.inputs = deque()
+        self.input_seq = 0
+        self.acked = 0
+        self.sent = OrderedDict()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.snapshots = 0
+        self.skipped = 0
+
+
+class CoopServer:
+    """
+    Authoritative co-op server over TCP on asyncio.
+
+    Every net tick (tick_rate per second) it applies each client's next queued input, advances the
+    CoopWorld by the fixed steps that tick covers and sends each client a snapshot delta-encoded
+    against the last snapshot that client acknowledged. Finished rounds restart immediately.
+
+    Args:
+        level_path (str): Level to play.
+        host (str): Address to listen on.
+        port (int): Port to listen on (0 picks a free one; see self.port after start()).
+        tick_rate (int): Net ticks per second.
+        enemy_count (int): Enemy count override, None for the level's own.
+        seed (int): Spawn seed.
+        measure_full (bool): Also encode a full snapshot per tick, to report what deltas save.
+    """
+
+    def __init__(self, level_path=LEVEL_PATH, host=NET_HOST, port=NET_PORT, tick_rate=NET_TICK_RATE,
+                 enemy_count=None, seed=0, measure_full=False):
+        self.world = CoopWorld(level_path, enemy_count, seed)
+        self.host = host
+        self.port = port
+        self.tick_rate = tick_rate
+        self.steps_per_tick = max(1, round(1 / (tick_rate * FIXED_TIMESTEP)))
+        self.measure_full = measure_full
+        self.clients = {}
+        self.handlers = set()
+        self.next_client_id = 1
+        self.tick_count = 0
+        self.running = False
+        self.server = None
+        self.tick_times = []
+        self.sim_times = []
+        self.full_bytes = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.rounds = 0
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.handle_client, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def handle_client(self, reader, writer):
+        self.handlers.add(asyncio.current_task())
+        try:
+            await self.serve_client(reader, writer)
+        finally:
+            self.handlers.discard(asyncio.current_task())
+
+    async def serve_client(self, reader, writer):
+        try:
+            kind, _ = await read_frame(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+            return
+        if kind != JOIN:
+            writer.close()
+            return
+        client = ClientConnection(self.next_client_id, writer)
+        self.next_client_id += 1
+        self.clients[client.id] = client
+        self.world.add_player(client.id)
+        level = self.world.level_path.encode()
+        writer.write(frame(WELCOME, WELCOME_FORMAT.pack(client.id, self.tick_rate, self.steps_per_tick, len(level)) + level))
+        try:
+            while True:
+                kind, payload = await read_frame(reader)
+                client.bytes_received += FRAME.size + len(payload)
+                if kind == INPUT:
+                    seq, ack, state = decode_input(payload)
+                    client.inputs.append((seq, state))
+                    client.acked = max(client.acked, ack)
+                    while len(client.inputs) > NET_INPUT_BUFFER:
+                        client.inputs.popleft()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            del self.clients[client.id]
+            self.world.remove_player(client.id)
+            writer.close()
+
+    def tick(self):
+        """Apply inputs, simulate one net tick and send every client its snapshot."""
+        start = time.perf_counter()
+        for client in self.clients.values():
+            seat = self.world.seats.get(client.id)
+            if client.inputs and seat:
+                client.input_seq, seat.input = client.inputs.popleft()
+        for _ in range(self.steps_per_tick):
+            self.world.step(FIXED_TIMESTEP)
+        if self.world.result:
+            self.world.restart_game()
+            self.rounds += 1
+        self.sim_times.append(time.perf_counter() - start)
+
+        self.tick_count += 1
+        entities, own = self.world.snapshot()
+        for client in self.clients.values():
+            if client.writer.transport.get_write_buffer_size() > NET_SEND_LIMIT:
+                client.skipped += 1
+                self.skipped += 1
+                continue
+            baseline = client.sent.get(client.acked)
+            payload = encode_snapshot(self.tick_count, client.acked if baseline is not None else 0, client.input_seq,
+                                      own.get(client.id, 0), entities, baseline or {})
+            client.writer.write(frame(SNAPSHOT, payload))
+            client.bytes_sent += FRAME.size + len(payload)
+            client.snapshots += 1
+            client.sent[self.tick_count] = entities
+            while len(client.sent) > NET_SNAPSHOT_HISTORY or (client.sent and next(iter(client.sent)) < client.acked):
+                client.sent.popitem(last=False)
+        self.tick_times.append(time.perf_counter() - start)
+        if self.measure_full:
+            self.full_bytes += FRAME.size + len(encode_snapshot(self.tick_count, 0, 0, 0, entities, {}))
+
+    async def run(self, duration=None):
+        """Tick at tick_rate until stop() (or for `duration` seconds)."""
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.tick_rate
+        self.running = True
+        started = next_tick = loop.time()
+        while self.running and (duration is None or loop.time() - started < duration):
+            self.tick()
+            next_tick += interval
+            delay = next_tick - loop.time()
+            if delay < 0:
+                # Behind schedule: count it and carry on from now rather than bursting to catch up
+                self.overruns += 1
+                next_tick = loop.time()
+            await asyncio.sleep(max(0.0, delay))
+
+    def stop(self):
+        self.running = False
+
+    async def close(self):
+        for client in list(self.clients.values()):
+            client.writer.close()
+        # Let the handlers see their connections close before the server goes away
+        await asyncio.gather(*self.handlers, return_exceptions=True)
+        self.server.close()
+        await self.server.wait_closed()
+
+    def stats(self):
+        tick_ms = sorted(duration * 1000 for duration in self.tick_times) or [0.0]
+        return {
+            'ticks': self.tick_count,
+            'tick_ms_mean': statistics.mean(tick_ms),
+            'tick_ms_p95': tick_ms[int(0.95 * (len(tick_ms) - 1))],
+            'tick_ms_max': tick_ms[-1],
+            'sim_ms_mean': 1000 * statistics.mean(self.sim_times) if self.sim_times else 0.0,
+            'overruns': self.overruns,
+            'skipped_snapshots': self.skipped,
+            'rounds': self.rounds,
+            'players': len(self.world.seats),
+            'enemies': len(self.world.enemy_sprites),
+        }
+
+
+class CoopClient:
+    """
+    Co-op client: sends input every net tick, predicts its own player and interpolates the rest.
+
+    The own player is simulated locally with the same Player code and level colliders as the
+    server, so it responds to input at once. Every snapshot rewinds it to the server's state and
+    replays the inputs the server has not applied yet (reconciliation); the distance that moves
+    it is recorded in `corrections`. Other entities are drawn interp_delay seconds in the past,
+    between the two snapshots around that moment.
+
+    Args:
+        nickname (str): Sent to the server when joining.
+        interp_delay (float): How far in the past remote entities are shown, in seconds.
+    """
+
+    def __init__(self, nickname='player', interp_delay=NET_INTERP_DELAY):
+        self.nickname = nickname
+        self.interp_delay = interp_delay
+        self.snapshots = OrderedDict()
+        self.timeline = deque(maxlen=32)
+        self.pending = deque()
+        self.corrections = []
+        self.player = None
+        self.own_id = None
+        self.seq = 0
+        self.latest_tick = 0
+        self.snapshot_count = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.connected = False
+
+    async def connect(self, host=NET_HOST, port=NET_PORT):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(frame(JOIN, self.nickname.encode()))
+        kind, payload = await read_frame(self.reader)
+        self.client_id, self.tick_rate, self.steps_per_tick, length = WELCOME_FORMAT.unpack_from(payload)
+        self.level_path = payload[WELCOME_FORMAT.size:WELCOME_FORMAT.size + length].decode()
+        level = Level.load(self.level_path, images=False)
+        self.collision_sprites = CollisionSprites()
+        for rect in level.collisions:
+            self.collision_sprites.add_rect(*rect)
+        self.collision_sprites.build_index()
+        self.connected = True
+        self.receiver = asyncio.create_task(self.receive_loop())
+
+    async def receive_loop(self):
+        try:
+            while True:
+                kind, payload = await read_frame(self.reader)
+                self.bytes_received += FRAME.size + len(payload)
+                if kind == SNAPSHOT:
+                    self.snapshot_count += 1
+                    self.on_snapshot(payload)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            self.connected = False
+
+    def on_snapshot(self, payload):
+        decoded = decode_snapshot(payload, self.snapshots)
+        if decoded is None:
+            return
+        tick, input_seq, own_id, entities = decoded
+        if tick <= self.latest_tick:
+            return
+        self.snapshots[tick] = entities
+        while len(self.snapshots) > NET_SNAPSHOT_HISTORY:
+            self.snapshots.popitem(last=False)
+        self.latest_tick = tick
+        self.timeline.append((time.perf_counter(), entities))
+        self.reconcile(input_seq, own_id, entities)
+
+    def simulate(self, state):
+        self.player.input_state = state
+        for _ in range(self.steps_per_tick):
+            self.player.update(FIXED_TIMESTEP)
+
+    def reconcile(self, input_seq, own_id, entities):
+        own = entities.get(own_id)
+        if own is None:
+            return
+        server_pos = (position(own[1]), position(own[2]))
+        if own_id != self.own_id or self.player is None:
+            # First snapshot, or a new round gave us a new player
+            self.player = Player(server_pos, (), self.collision_sprites)
+            self.own_id = own_id
+        predicted = pygame.Vector2(self.player.rect.center)
+        self.player.hitbox_rect.center = self.player.rect.center = server_pos
+        self.player.stamina = own[3] / 5
+        self.player.ammo_count = own[4] / 250
+        while self.pending and self.pending[0][0] <= input_seq:
+            self.pending.popleft()
+        if not own[5] & PLAYER_DOWN:
+            for _, state in self.pending:
+                self.simulate(state)
+        self.corrections.append(predicted.distance_to(self.player.rect.center))
+
+    def send_input(self, state):
+        """Send one net tick of input and apply it to the predicted player right away."""
+        state = quantize(state)
+        self.seq += 1
+        self.pending.append((self.seq, state))
+        if self.player:
+            self.simulate(state)
+        payload = frame(INPUT, encode_input(self.seq, self.latest_tick, state))
+        self.writer.write(payload)
+        self.bytes_sent += len(payload)
+
+    @property
+    def position(self):
+        """Predicted position of the own player, None before the first snapshot."""
+        return self.player.rect.center if self.player else None
+
+    def interpolated(self, now=None):
+        """
+        Return {entity id: (kind, x, y, a, b, c)} with positions in pixels, interp_delay seconds in the past.
+        """
+        if not self.timeline:
+            return {}
+        render_time = (time.perf_counter() if now is None else now) - self.interp_delay
+        before, after = self.timeline[0], None
+        for entry in self.timeline:
+            if entry[0] <= render_time:
+                before = entry
+            else:
+                after = entry
+                break
+        if after is None or before is after:
+            return {entity_id: (state[0], position(state[1]), position(state[2])) + state[3:]
+                    for entity_id, state in before[1].items()}
+        t = max(0.0, min(1.0, (render_time - before[0]) / (after[0] - before[0])))
+        result = {}
+        for entity_id, state in after[1].items():
+            old = before[1].get(entity_id)
+            x, y = position(state[1]), position(state[2])
+            if old and old[0] == state[0]:
+                x = position(old[1]) + (x - position(old[1])) * t
+                y = position(old[2]) + (y - position(old[2])) * t
+            result[entity_id] = (state[0], x, y) + state[3:]
+        return result
+
+    async def close(self):
+        self.writer.close()
+        self.receiver.cancel()
+
+
+async def serve(args):
+    server = CoopServer(host=args.host, port=args.port, enemy_count=args.enemies, seed=args.seed)
+    await server.start()
+    print(f"co-op server on {server.host}:{server.port}, {server.tick_rate} ticks/s")
+    run = asyncio.create_task(server.run())
+    while not run.done():
+        await asyncio.sleep(5)
+        stats = server.stats()
+        print(f"{stats['players']} players, {stats['enemies']} enemies, tick {stats['tick_ms_mean']:.2f} ms "
+              f"(p95 {stats['tick_ms_p95']:.2f}), {stats['overruns']} overruns")
+
+
+async def play(args):
+    """Windowed client: the level, the predicted own player and interpolated everything else."""
+    from assets import assets
+    from controls import PygameInput
+    from groups import AllSprites
+    from pacing import FramePacer, set_mode
+    from world import World
+    pygame.init()
+    screen = set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+    pygame.display.set_caption(f'Time Runner co-op: {args.nickname}')
+    client = CoopClient(args.nickname)
+    await client.connect(args.host, args.port)
+    _, tiles, chunks = World.prepare_level(client.level_path)
+    background = AllSprites()
+    background.set_static(tiles, chunks)
+    images = {kind: assets.image(join('images', name)) for kind, name in
+              ((PLAYER, 'boy.png'), (ENEMY, 'slime.png'), (BULLET, 'bullet.png'), (BOSS, 'boss.png'))}
+    controls = PygameInput()
+    pacer = FramePacer()
+    next_input = 0.0
+    while client.connected and not any(event.type == pygame.QUIT for event in pygame.event.get()):
+        now = time.perf_counter()
+        if now >= next_input:
+            client.send_input(controls.poll())
+            next_input = now + 1 / client.tick_rate
+        camera = pygame.Vector2(client.position or (0, 0))
+        offset = pygame.Vector2(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2) - camera
+        screen.fill('black')
+        background.draw(camera)
+        for entity_id, (kind, x, y, _, _, flags) in client.interpolated(now).items():
+            if kind == PLAYER and flags & PLAYER_DOWN:
+                continue
+            pos = camera if entity_id == client.own_id else pygame.Vector2(x, y)
+            screen.blit(images[kind], images[kind].get_rect(center=pos + offset))
+        pygame.display.update()
+        # Let the network tasks run while waiting out the frame
+        await asyncio.sleep(max(0.0, 1 / pacer.fps_cap - (time.perf_counter() - now)))
+    await client.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time Runner co-op over TCP.')
+    parser.add_argument('mode', choices=('server', 'client'))
+    parser.add_argument('--host', default=NET_HOST)
+    parser.add_argument('--port', type=int, default=NET_PORT)
+    parser.add_argument('--enemies', type=int, help='enemy count (default: the level\'s own)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--nickname', default='player')
+    args = parser.parse_args()
+    if args.mode == 'server':
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    asyncio.run(serve(args) if args.mode == 'server' else play(args))
@@ -1,124 +1,88 @@
 import pygame
+import os
+import re
 import time
-import csv
+import uuid
 from random import randint
 from settings import *
-from player import *
-from sprites import *
-from pytmx.util_pygame import load_pygame
-from groups import AllSprites
+from hud import hud
+from profiler import profiler
+from history import HistoryStore
+from pacing import FramePacer, set_mode
+from replay import InputRecorder
+from controls import PygameInput
+from world import World
+from levels import LevelManager
 
 
-class Game:
+class Game(World):
     _instance = None
 
     def __new__(cls, nickname, *args, **kwargs):
         if not cls._instance:
-            cls._instance = super(Game, cls).__new__(cls, *args, **kwargs)
+            cls._instance = super(Game, cls).__new__(cls)
             cls._instance.nickname = nickname
         return cls._instance
 
-    def __init__(self, nickname):
+    def __init__(self, nickname, prepared=None, history=None):
+        """
+        Args:
+            nickname (str): Player name recorded in the game history.
+            prepared (tuple): Level built ahead by World.prepare_level, if any.
+            history (HistoryStore): Where finished games are recorded (default: the one at HISTORY_PATH).
+        """
         if not hasattr(self, 'initialized'):
             self.initialized = True
             pygame.init()
-            self.display_surface = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+            self.display_surface = set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
             pygame.display.set_caption('Time Runner')
-            self.clock = pygame.time.Clock()
+            self.pacer = FramePacer()
+            self.clock = self.pacer.clock
             self.running = True
-            self.game_over_state = False
             self.nickname = nickname
-            self.start_time = time.time()
-
-            # Groups
-            self.all_sprites = AllSprites()
-            self.collision_sprites = pygame.sprite.Group()
-            self.bullet_sprites = pygame.sprite.Group()
-            self.enemy_sprites = pygame.sprite.Group()
-
-            # Arrow timer
-            self.can_shoot = True
-            self.shoot_time = 0
-            self.arrow_cooldown = 800
-
-            # Setup
-            self.load_images()
-            self.setup()
-
-    def load_images(self):
-        self.bullet_surf = pygame.image.load(join('images', 'bullet.png')).convert_alpha()
-
-    def input(self):
-        if pygame.mouse.get_pressed()[0] and self.can_shoot and self.player.ammo_count == 1:
-            pos = self.arrow.rect.center + self.arrow.player_direction * 50
-            Bullet(self.bullet_surf, pos, self.arrow.player_direction, (self.all_sprites, self.bullet_sprites), self.boss)
-            self.player.ammo_count -= 1
-            self.can_shoot = False
-            self.shoot_time = pygame.time.get_ticks()
-
-    def arrow_timer(self):
-        if not self.can_shoot:
-            current_time = pygame.time.get_ticks()
-            if current_time - self.shoot_time >= self.arrow_cooldown:
-                self.can_shoot = True
-
-    def setup(self):
-        map = load_pygame(join('data', 'maps', 'maplvl1', 'map1.tmx'))
-        for layer_name in ['Ground1', 'Cliff2', 'Objects2', 'Objects1']:
-            for x, y, image in map.get_layer_by_name(layer_name).tiles():
-                Sprite((TILE_SIZE * x, TILE_SIZE * y), image, self.all_sprites)
-        for obj in map.get_layer_by_name('Collisions'):
-            CollisionSprite((obj.x, obj.y), pygame.Surface((obj.width, obj.height)), self.collision_sprites)
-        for obj in map.get_layer_by_name('Spawns'):
-            if obj.name == 'player':
-                self.player = Player((obj.x, obj.y), self.all_sprites, self.collision_sprites)
-                self.arrow = Arrow(self.player, self.all_sprites)
-            elif obj.name == 'enemy':
-                enemy = Enemy((obj.x, obj.y), self.all_sprites, self.player, self.collision_sprites)
-                self.enemy_sprites.add(enemy)
-            elif obj.name == 'boss':
-                self.boss = Boss((obj.x, obj.y), self.all_sprites, self.collision_sprites)
-
-    def arrow_collision(self):
-        for bullet in self.bullet_sprites:
-            collided_enemies = pygame.sprite.spritecollide(bullet, self.enemy_sprites, True, pygame.sprite.collide_mask)
-            if collided_enemies:
-                bullet.kill()
-            for enemy in collided_enemies:
-                enemy.kill()
-
-    def player_collision(self):
-        if pygame.sprite.spritecollide(self.player, self.enemy_sprites, False, pygame.sprite.collide_mask):
-            self.game_over_state = True
-        if self.boss and pygame.sprite.collide_mask(self.player, self.boss):
-            self.game_over_state = True
+            # Simulated seconds of the campaign's finished levels; the current one adds sim_time
+            self.campaign_time = 0.0
+            self.controls = PygameInput()
+            self.history = history or HistoryStore()
+            self.levels = LevelManager(prepare=not STREAM_WORLD)
+            level_path = self.levels.current
+            if prepared is None or prepared[0].path != level_path:
+                prepared = self.levels.get(level_path, startup=True)
+            else:
+                self.levels.put(level_path, prepared)
+            super().__init__(level_path, prepared=prepared)
+            self.recorder = InputRecorder(level_path=level_path) if RECORD_INPUT else None
+            self.levels.prefetch_next()
+
+    @property
+    def time_passed(self):
+        """
+        Seconds played, on the simulation clock: pauses and clamped stalls do not count, so the
+        time of each level matches the sim_time its replay verifies.
+        """
+        return round(self.campaign_time + self.sim_time, 2)
 
     def save_game_history(self, result):
-        """Save the game history to a CSV file."""
-        end_time = time.time()
-        time_passed = round(end_time - self.start_time, 2)
-        file_path = 'game_history.csv'
-        try:
-            with open(file_path, mode='a', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow([self.nickname, time_passed, result])
-        except FileNotFoundError:
-            with open(file_path, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(['Nickname', 'Time Passed (s)', 'Result'])
-                writer.writerow([self.nickname, time_passed, result])
+        """Queue the finished game for the history store; the write happens off the game thread."""
+        self.history.record(self.nickname, self.time_passed, result)
+
+    def save_replay(self):
+        """Write this game's input recording to REPLAY_DIR; replay.py re-runs and verifies it."""
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        # Nicknames are free text: keep them from leaving REPLAY_DIR, and never overwrite another game
+        name = re.sub(r'[^A-Za-z0-9_-]+', '_', self.nickname)[:32].strip('_') or 'player'
+        path = join(REPLAY_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.trr")
+        self.recorder.save(path, self)
+        return path
 
     def display_message(self, title, subtitle, instructions):
-        font = pygame.font.SysFont('Impact', 150)
-        instructions_font = pygame.font.SysFont('Impact', 50)
-
-        title_text = font.render(title, True, (255, 151, 0))
+        title_text = hud.text(title, 'Impact', 150, (255, 151, 0))
         title_rect = title_text.get_rect(center=(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 3))
 
-        subtitle_text = instructions_font.render(subtitle, True, (255, 255, 255))
+        subtitle_text = hud.text(subtitle, 'Impact', 50, (255, 255, 255))
         subtitle_rect = subtitle_text.get_rect(center=(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2))
 
-        instructions_text = instructions_font.render(instructions, True, (255, 255, 255))
+        instructions_text = hud.text(instructions, 'Impact', 50, (255, 255, 255))
         instructions_rect = instructions_text.get_rect(center=(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2 + 100))
 
         self.display_surface.fill((104, 117, 142))
@@ -126,82 +90,154 @@ class Game:
         self.display_surface.blit(subtitle_text, subtitle_rect)
         self.display_surface.blit(instructions_text, instructions_rect)
         pygame.display.update()
+        self.all_sprites.invalidate()
 
     def render_timer(self):
-        elapsed_time = round(time.time() - self.start_time, 2)
-        font = pygame.font.SysFont('Impact', 30)
-        timer_text = font.render(f"Time: {elapsed_time}s", True, (255, 255, 255))
-        self.display_surface.blit(timer_text, (10, 10))
+        timer_text = hud.text(f"Time: {self.time_passed}s", 'Impact', 30, (255, 255, 255))
+        hud.blit(self.display_surface, timer_text, (10, 10))
 
     def game_won(self):
-        end_time = time.time()
-        time_passed = round(end_time - self.start_time, 2)
-        self.display_message("You Win!", f"Time: {time_passed} seconds", "Press R to Restart or Q to Quit")
+        self.display_message("You Win!", f"Time: {self.time_passed} seconds", "Press R to Restart or Q to Quit")
         self.save_game_history("win")
+        if self.recorder:
+            self.save_replay()
 
     def game_over(self):
-        end_time = time.time()
-        time_passed = round(end_time - self.start_time, 2)
-        self.display_message("Game Over!", f"Time: {time_passed} seconds", "Press R to Restart or Q to Quit")
+        self.display_message("Game Over!", f"Time: {self.time_passed} seconds", "Press R to Restart or Q to Quit")
         self.save_game_history("lose")
+        if self.recorder:
+            self.save_replay()
 
     def wait_for_restart(self):
-        """Wait for the player to restart or quit."""
-        waiting = True
-        while waiting:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
+        """Sleep until the player restarts or quits."""
+        while True:
+            event = pygame.event.wait()
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                quit()
+            elif event.type == pygame.KEYDOWN:
+                if event.key == pygame.K_r:
+                    self.restart_campaign()
+                    return
+                elif event.key == pygame.K_q:
                     pygame.quit()
                     quit()
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
-                        self.restart_game()
-                        waiting = False
-                    elif event.key == pygame.K_q:
-                        pygame.quit()
-                        quit()
+            elif event.type == pygame.WINDOWEXPOSED:
+                pygame.display.update()
 
     def restart_game(self):
-        self.game_over_state = False
-        self.enemy_sprites.empty()
-        self.all_sprites.empty()
-        self.setup()
+        """Reset the dynamic entities and timers; the parsed level and static tiles are kept."""
+        super().restart_game()
+        self.campaign_time = 0.0
         self.running = True
 
+    def restart_campaign(self):
+        """
+        Start over on the campaign's first level with the clock at zero, so a recorded win always
+        covers every level.
+        """
+        if not self.levels.index:
+            self.restart_game()
+            return
+        path, prepared = self.levels.restart()
+        self.change_level(path, prepared)
+        if self.recorder:
+            self.recorder.level_path = path
+        self.levels.prefetch_next()
+
+    def next_level(self):
+        """Continue on the campaign's next level after a boss kill, using the prefetched build when it is ready."""
+        # Starting the next level clears the recorder, so the finished level's replay is saved first
+        if self.recorder:
+            self.save_replay()
+        start = time.perf_counter()
+        campaign_time = self.campaign_time + self.sim_time
+        path, prepared = self.levels.advance()
+        self.change_level(path, prepared)
+        # The campaign clock keeps running across levels; each level records its own replay
+        self.campaign_time = campaign_time
+        if self.recorder:
+            self.recorder.level_path = path
+        self.levels.record_transition(time.perf_counter() - start)
+        self.levels.prefetch_next()
+
     def run(self):
-        """Main game loop."""
+        """Main game loop: the simulation advances in FIXED_TIMESTEP steps, rendering once per frame."""
+        accumulator = 0.0
         while self.running:
-            delta_time = self.clock.tick() / 1000
+            delta_time = self.pacer.tick()
+            # Clamp long stalls (window drag, breakpoints) instead of replaying them all at once
+            accumulator += min(delta_time, MAX_FRAME_TIME)
+            steps = broad_phase_pairs = narrow_phase_tests = 0
+            profiler.begin_frame()
+            self.levels.collect()
             for event in pygame.event.get():
+                self.pacer.handle_event(event)
                 if event.type == pygame.QUIT:
                     self.running = False
+                elif event.type == pygame.KEYDOWN and event.key == PROFILE_OVERLAY_KEY:
+                    profiler.toggle_overlay()
+                    self.all_sprites.invalidate()
+                elif event.type == pygame.KEYDOWN and event.key == PROFILE_EXPORT_KEY:
+                    profiler.export(PROFILE_EXPORT_PATH)
 
-            if self.game_over_state:
+            if self.result == 'lose':
                 self.game_over()
                 self.wait_for_restart()
-            elif self.boss and self.boss.health <= 0:
+                accumulator = 0.0
+                profiler.begin_frame()
+            elif self.result == 'win' and self.levels.next:
+                self.next_level()
+                accumulator = 0.0
+            elif self.result == 'win':
                 self.game_won()
                 self.wait_for_restart()
+                accumulator = 0.0
+                profiler.begin_frame()
             else:
-                self.arrow_timer()
-                self.input()
-                self.arrow_collision()
-                self.player_collision()
-                self.all_sprites.update(delta_time)
-
-            self.display_surface.fill('black')
-            self.all_sprites.draw(self.player.rect.center)
-            if self.player:
-                self.player.stamina_bar(self.display_surface)
-                self.player.ammo_bar(self.display_surface)
-            if self.boss:
-                self.boss.health_bar(self.display_surface)
+                state = self.controls.poll()
+                while accumulator >= FIXED_TIMESTEP and not self.result:
+                    self.step(FIXED_TIMESTEP, state)
+                    steps += 1
+                    # step() resets the collision counters, so sum them over the frame's steps
+                    broad_phase_pairs += self.broad_phase_pairs
+                    narrow_phase_tests += self.narrow_phase_tests
+                    accumulator -= FIXED_TIMESTEP
+
+            with profiler.scope('draw'):
+                self.display_surface.fill('black')
+                blits = self.all_sprites.draw(self.player.rect.center)
+            hud.begin_frame()
+            with profiler.scope('hud'):
+                if self.player:
+                    self.player.stamina_bar(self.display_surface)
+                    self.player.ammo_bar(self.display_surface)
+                if self.boss:
+                    self.boss.health_bar(self.display_surface)
 
             # Render the timer
-            self.render_timer()
-
-            pygame.display.update()
-
+            with profiler.scope('render_timer'):
+                self.render_timer()
+            hud.end_frame()
+            if profiler.show_overlay:
+                profiler.draw_overlay(self.display_surface)
+
+            with profiler.scope('present'):
+                dirty_rects = self.all_sprites.dirty_rects
+                if DIRTY_RECTS and dirty_rects is not None and not profiler.show_overlay:
+                    # Camera did not move: only sprites and HUD elements changed
+                    pygame.display.update(dirty_rects + hud.dirty_rects())
+                else:
+                    pygame.display.update()
+            profiler.end_frame(steps=steps, sprites=len(self.all_sprites), blits=blits,
+                               enemies=len(self.enemy_sprites), active=self.active_enemies,
+                               bullets=len(self.bullet_sprites), broad_phase_pairs=broad_phase_pairs,
+                               narrow_phase_tests=narrow_phase_tests)
+
+        self.history.close()
+        self.levels.close()
+        if self.streamer:
+            self.streamer.close()
         pygame.quit()
 
 
@@ -1,15 +1,76 @@
 import pygame
 from settings import *
+from sprites import Collider
 
 class AllSprites(pygame.sprite.Group):
     """
     Custom sprite group to handle drawing with an offset for a moving effect.
+
+    Static map tiles are kept out of the group itself and handed over with set_static().
+    In chunked mode they are baked into CHUNK_SIZE x CHUNK_SIZE tile surfaces once, so a
+    frame only blits the chunks and dynamic sprites that are inside the camera view.
+
+    While the camera stays still the background does not change, so after draw() dirty_rects
+    holds the screen areas of the dynamic sprites this frame and last frame; it is None when the
+    whole screen changed (camera moved, or invalidate() was called).
     """
 
-    def __init__(self):
+    def __init__(self, chunked=CHUNKED_RENDERING):
         super().__init__()
         self.display_surface = pygame.display.get_surface()
         self.offset = pygame.Vector2()
+        self.chunked = chunked
+        self.static_sprites = []
+        self.chunks = {}
+        self.last_offset = None
+        self.sprite_rects = []
+        self.dirty_rects = None
+
+    def set_static(self, sprites, chunks=None):
+        """
+        Register the static tile sprites drawn underneath every dynamic sprite.
+
+        Args:
+            sprites (list): Tile sprites in draw order (lower layers first).
+        """
+        self.static_sprites = list(sprites)
+        if not self.chunked:
+            self.chunks = {}
+        else:
+            self.chunks = self.bake_chunks(self.static_sprites) if chunks is None else chunks
+
+    def invalidate(self):
+        """Force the next frame to be a full-screen update (something else drew over the screen)."""
+        self.last_offset = None
+
+    @staticmethod
+    def bake_chunks(sprites):
+        """
+        Pre-render static sprites into chunk surfaces keyed by chunk grid position.
+
+        Args:
+            sprites (list): Sprites to bake, in draw order.
+
+        Returns:
+            dict: (chunk_x, chunk_y) -> (surface, topleft) for every non-empty chunk.
+        """
+        chunk_pixels = CHUNK_SIZE * TILE_SIZE
+        chunks = {}
+        for sprite in sprites:
+            # A tile can overhang into the neighbouring chunks, so blit it into each one it touches
+            left, top = int(sprite.rect.left // chunk_pixels), int(sprite.rect.top // chunk_pixels)
+            right = int((sprite.rect.right - 1) // chunk_pixels)
+            bottom = int((sprite.rect.bottom - 1) // chunk_pixels)
+            for cx in range(left, right + 1):
+                for cy in range(top, bottom + 1):
+                    if (cx, cy) not in chunks:
+                        surface = pygame.Surface((chunk_pixels, chunk_pixels), pygame.SRCALPHA)
+                        chunks[(cx, cy)] = (surface, (cx * chunk_pixels, cy * chunk_pixels))
+                    surface, origin = chunks[(cx, cy)]
+                    surface.blit(sprite.image, (sprite.rect.left - origin[0], sprite.rect.top - origin[1]))
+        if pygame.display.get_surface():
+            chunks = {key: (surface.convert_alpha(), origin) for key, (surface, origin) in chunks.items()}
+        return chunks
 
     def draw(self, target_pos):
         """
@@ -17,9 +78,215 @@ class AllSprites(pygame.sprite.Group):
 
         Args:
             target_pos (tuple): The position of the target (e.g., player) to center the screen around.
+
+        Returns:
+            int: Number of blits issued this frame.
         """
         self.offset.x = -(target_pos[0] - WINDOW_WIDTH / 2)
         self.offset.y = -(target_pos[1] - WINDOW_HEIGHT / 2)
+        camera_moved = self.offset != self.last_offset
+        self.last_offset = self.offset.copy()
+        sprite_rects = []
+
+        if not self.chunked:
+            # A streamed level only exists as the chunk surfaces the streamer keeps resident
+            for surface, origin in self.chunks.values():
+                self.display_surface.blit(surface, origin + self.offset)
+            for sprite in self.static_sprites:
+                self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
+            for sprite in self:
+                sprite_rects.append(self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset))
+            blits = len(self.chunks) + len(self.static_sprites) + len(self)
+        else:
+            view = pygame.FRect(-self.offset.x, -self.offset.y, WINDOW_WIDTH, WINDOW_HEIGHT)
+            chunk_pixels = CHUNK_SIZE * TILE_SIZE
+            blits = 0
+            for cx in range(int(view.left // chunk_pixels), int((view.right - 1) // chunk_pixels) + 1):
+                for cy in range(int(view.top // chunk_pixels), int((view.bottom - 1) // chunk_pixels) + 1):
+                    chunk = self.chunks.get((cx, cy))
+                    if chunk:
+                        surface, origin = chunk
+                        self.display_surface.blit(surface, origin + self.offset)
+                        blits += 1
+            for sprite in self:
+                if view.colliderect(sprite.rect):
+                    sprite_rects.append(self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset))
+                    blits += 1
+
+        self.dirty_rects = None if camera_moved else self.sprite_rects + sprite_rects
+        self.sprite_rects = sprite_rects
+        return blits
+
+
+class CollisionSprites:
+    """
+    Container of static colliders with a uniform-grid spatial index.
+
+    Colliders are usually bare Collider rects added with add_rect(); pygame sprites with a rect
+    (e.g. CollisionSprite) can join it like a normal group too. Iteration follows insertion order.
+    The index is built once (build_index); colliders added or removed later are inserted into or
+    taken out of just their own cells, so streaming chunks in and out stays cheap. Colliders must
+    not move while they are in the group. After empty() the index is rebuilt lazily.
+    """
+
+    # Lets pygame.sprite.Sprite.add/kill treat this like a sprite group
+    _spritegroup = True
+
+    def __init__(self, *colliders, cell_size=COLLISION_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = None
+        # Collider -> insertion order, which query() sorts by
+        self.colliders = {}
+        self.next_order = 0
+        self.add(*colliders)
+
+    def add_rect(self, x, y, width, height):
+        collider = Collider(x, y, width, height)
+        self.add_internal(collider)
+        return collider
+
+    def add(self, *colliders):
+        for collider in colliders:
+            if isinstance(collider, pygame.sprite.Sprite):
+                collider.add(self)
+            else:
+                self.add_internal(collider)
+
+    def remove(self, *colliders):
+        for collider in colliders:
+            if isinstance(collider, pygame.sprite.Sprite):
+                collider.remove(self)
+            else:
+                self.remove_internal(collider)
 
-        for sprite in self:
-            self.display_surface.blit(sprite.image, sprite.rect.topleft + self.offset)
\ No newline at end of file
+    def add_internal(self, collider, layer=None):
+        if collider in self.colliders:
+            return
+        order = self.colliders[collider] = self.next_order
+        self.next_order += 1
+        if self.cells is not None:
+            xs, ys = self.cell_range(collider.rect)
+            for x in xs:
+                for y in ys:
+                    self.cells.setdefault((x, y), []).append((order, collider))
+
+    def remove_internal(self, collider):
+        order = self.colliders.pop(collider, None)
+        if order is None or self.cells is None:
+            return
+        xs, ys = self.cell_range(collider.rect)
+        for x in xs:
+            for y in ys:
+                cell = self.cells.get((x, y))
+                if cell:
+                    cell.remove((order, collider))
+                    if not cell:
+                        del self.cells[(x, y)]
+
+    def has_internal(self, collider):
+        return collider in self.colliders
+
+    def empty(self):
+        for collider in list(self.colliders):
+            if isinstance(collider, pygame.sprite.Sprite):
+                collider.remove_internal(self)
+        self.colliders.clear()
+        self.cells = None
+
+    def sprites(self):
+        return list(self.colliders)
+
+    def __iter__(self):
+        return iter(list(self.colliders))
+
+    def __len__(self):
+        return len(self.colliders)
+
+    def __contains__(self, collider):
+        return collider in self.colliders
+
+    def cell_range(self, rect):
+        """Return the x and y cell ranges covered by a rect."""
+        size = self.cell_size
+        return (range(int(rect.left // size), int(rect.right // size) + 1),
+                range(int(rect.top // size), int(rect.bottom // size) + 1))
+
+    def build_index(self):
+        """Bucket every sprite into the grid cells its rect overlaps."""
+        self.cells = {}
+        for sprite, order in self.colliders.items():
+            xs, ys = self.cell_range(sprite.rect)
+            for x in xs:
+                for y in ys:
+                    self.cells.setdefault((x, y), []).append((order, sprite))
+
+    def query(self, rect):
+        """
+        Return (order, sprite) pairs from the cells a rect overlaps, in group order.
+
+        Args:
+            rect (Rect): Area to look up.
+        """
+        if self.cells is None:
+            self.build_index()
+        xs, ys = self.cell_range(rect)
+        found = {}
+        for x in xs:
+            for y in ys:
+                for order, sprite in self.cells.get((x, y), ()):
+                    found[order] = sprite
+        return sorted(found.items())
+
+    def nearby(self, rect):
+        """
+        Yield the sprites that may collide with a rect, in the same order as iterating the group.
+
+        The rect may be moved between yields (collision push-out); the remaining candidates are then
+        looked up again around its new position, so resolution matches a full scan of the group.
+
+        Args:
+            rect (Rect): Hitbox being resolved.
+        """
+        candidates = self.query(rect)
+        key = tuple(rect)
+        index = 0
+        while index < len(candidates):
+            order, sprite = candidates[index]
+            index += 1
+            yield sprite
+            if tuple(rect) != key:
+                key = tuple(rect)
+                candidates = [candidate for candidate in self.query(rect) if candidate[0] > order]
+                index = 0
+
+
+def sweep_pairs(sprites_a, sprites_b):
+    """
+    Broad phase: find every rect overlap between two sprite groups with one sort-and-sweep on x.
+
+    Args:
+        sprites_a (iterable): First set of sprites (e.g. bullets).
+        sprites_b (iterable): Second set of sprites (e.g. enemies).
+
+    Returns:
+        list: (sprite_a, [overlapping sprite_b, ...]) in the iteration order of both inputs.
+    """
+    sprites_a, sprites_b = list(sprites_a), list(sprites_b)
+    if not sprites_a or not sprites_b:
+        return []
+    entries = [(sprite.rect.left, 0, index) for index, sprite in enumerate(sprites_a)]
+    entries += [(sprite.rect.left, 1, index) for index, sprite in enumerate(sprites_b)]
+    entries.sort(key=lambda entry: entry[0])
+    sides = (sprites_a, sprites_b)
+    active = ([], [])
+    overlaps = {}
+    for left, side, index in entries:
+        rect = sides[side][index].rect
+        for other in (0, 1):
+            active[other][:] = [i for i in active[other] if sides[other][i].rect.right > left]
+        for other_index in active[1 - side]:
+            if sides[1 - side][other_index].rect.colliderect(rect):
+                a, b = (index, other_index) if side == 0 else (other_index, index)
+                overlaps.setdefault(a, []).append(b)
+        active[side].append(index)
+    return [(sprites_a[a], [sprites_b[b] for b in sorted(overlaps[a])]) for a in sorted(overlaps)]
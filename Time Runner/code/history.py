@@ -0,0 +1,170 @@
+import atexit
+import csv
+import logging
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from settings import *
+
+log = logging.getLogger(__name__)
+
+SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS games (
+        id INTEGER PRIMARY KEY,
+        nickname TEXT NOT NULL,
+        time_passed REAL NOT NULL,
+        result TEXT NOT NULL,
+        played_at REAL NOT NULL
+    )''',
+    'CREATE INDEX IF NOT EXISTS games_by_result ON games (result, time_passed)',
+    'CREATE INDEX IF NOT EXISTS games_by_nickname ON games (nickname, result, time_passed)',
+)
+
+
+class HistoryStore:
+    """
+    Game history in an SQLite database (WAL mode), written by a background thread.
+
+    record() only queues the row, so the game loop never waits on disk. The writer commits queued
+    rows in batches of up to batch_size, or after flush_interval seconds, in one transaction each.
+    `synchronous` is SQLite's fsync policy: 'FULL' syncs every commit, 'NORMAL' (the WAL default)
+    keeps the database consistent after a crash but may lose the last commits on power loss.
+
+    Args:
+        path (str): Database file.
+        batch_size (int): Most rows committed per transaction.
+        flush_interval (float): Longest time in seconds a queued row waits to be committed.
+        synchronous (str): 'OFF', 'NORMAL' or 'FULL'.
+    """
+
+    def __init__(self, path=HISTORY_PATH, batch_size=HISTORY_BATCH_SIZE, flush_interval=HISTORY_FLUSH_INTERVAL,
+                 synchronous=HISTORY_SYNCHRONOUS):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.synchronous = synchronous
+        self.queue = queue.Queue()
+        self.commits = 0
+        self.written = 0
+        self.failed = 0
+        self.connection = self.connect()
+        with self.connection:
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+        self.writer = threading.Thread(target=self.write_loop, name='history-writer', daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute(f'PRAGMA synchronous={self.synchronous}')
+        return connection
+
+    def record(self, nickname, time_passed, result, played_at=None):
+        """Queue one finished game; returns immediately."""
+        self.queue.put((nickname, float(time_passed), result, time.time() if played_at is None else played_at))
+
+    def write_loop(self):
+        connection = self.connect()
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self.queue.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            if batch[-1] is None:
+                running = False
+            rows = [row for row in batch if row is not None]
+            try:
+                if rows:
+                    with connection:
+                        connection.executemany(
+                            'INSERT INTO games (nickname, time_passed, result, played_at) VALUES (?, ?, ?, ?)', rows)
+                    self.commits += 1
+                    self.written += len(rows)
+            except Exception:
+                # A locked or full database costs this batch, not the writer: later rows are still written
+                log.exception("could not write %d game history rows", len(rows))
+                self.failed += len(rows)
+            finally:
+                # flush() waits on these, so they are marked done even when the write failed
+                for _ in batch:
+                    self.queue.task_done()
+        connection.close()
+
+    def flush(self):
+        """Block until every queued row is committed."""
+        self.queue.join()
+
+    def close(self):
+        """Commit the remaining rows and stop the writer."""
+        if self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+            self.connection.close()
+
+    def import_csv(self, path):
+        """
+        Queue the rows of a game_history.csv (nickname, time passed, result), with or without a header.
+
+        Returns:
+            int: Number of rows imported.
+        """
+        count = 0
+        with open(path, newline='') as file:
+            for row in csv.reader(file):
+                try:
+                    nickname, time_passed, result = row[0], float(row[1]), row[2]
+                except (IndexError, ValueError):
+                    continue  # header or malformed line
+                self.record(nickname, time_passed, result, played_at=0)
+                count += 1
+        return count
+
+    def best_times(self, limit=10):
+        """Fastest win per nickname: [(nickname, seconds)], fastest first."""
+        return self.connection.execute(
+            "SELECT nickname, MIN(time_passed) AS best FROM games WHERE result = 'win' "
+            "GROUP BY nickname ORDER BY best, nickname LIMIT ?", (limit,)).fetchall()
+
+    def top_wins(self, limit=10):
+        """Most wins per nickname: [(nickname, wins)], most first."""
+        return self.connection.execute(
+            "SELECT nickname, COUNT(*) AS wins FROM games WHERE result = 'win' "
+            "GROUP BY nickname ORDER BY wins DESC, nickname LIMIT ?", (limit,)).fetchall()
+
+    def fastest_wins(self, limit=10):
+        """Fastest individual wins: [(nickname, seconds)]."""
+        return self.connection.execute(
+            "SELECT nickname, time_passed FROM games WHERE result = 'win' "
+            "ORDER BY time_passed LIMIT ?", (limit,)).fetchall()
+
+    def player_stats(self, nickname):
+        """Return {'games', 'wins', 'best'} for one nickname (best is None without a win)."""
+        games, wins, best = self.connection.execute(
+            "SELECT COUNT(*), COUNT(CASE WHEN result = 'win' THEN 1 END), "
+            "MIN(CASE WHEN result = 'win' THEN time_passed END) FROM games WHERE nickname = ?",
+            (nickname,)).fetchone()
+        return {'games': games, 'wins': wins, 'best': best}
+
+
+if __name__ == "__main__":
+    # python history.py import game_history.csv | python history.py top
+    store = HistoryStore()
+    if sys.argv[1:2] == ['import']:
+        for csv_path in sys.argv[2:] or ['game_history.csv']:
+            print(f"{csv_path}: {store.import_csv(csv_path)} rows")
+        store.flush()
+    print('Best times:')
+    for nickname, best in store.best_times():
+        print(f"  {nickname:<20} {best:>8.2f}s")
+    print('Most wins:')
+    for nickname, wins in store.top_wins():
+        print(f"  {nickname:<20} {wins:>8}")
+    store.close()
@@ -0,0 +1,101 @@
+import time
+from collections import OrderedDict
+from settings import *
+
+
+class HUD:
+    """
+    Font registry and cached text/bar surfaces for the on-screen HUD.
+
+    Fonts are looked up once per (name, size), rendered text is cached by (text, font, color) and
+    bars are only redrawn when their pixel width or label changes. begin_frame/end_frame measure
+    how long the HUD took to draw each frame, and everything drawn through blit() is remembered
+    so dirty_rects() can tell which screen areas the HUD touched this frame and last frame.
+    """
+
+    def __init__(self, text_cache_size=HUD_TEXT_CACHE_SIZE):
+        self.fonts = {}
+        self.texts = OrderedDict()
+        self.text_cache_size = text_cache_size
+        self.bars = {}
+        self.frame_start = 0
+        self.frame_ms = 0.0
+        self.renders = 0
+        self.frame_renders = 0
+        self.drawn = []
+        self.last_drawn = []
+
+    def font(self, name, size):
+        key = (name.lower(), size)
+        if key not in self.fonts:
+            self.fonts[key] = pygame.font.SysFont(*key)
+        return self.fonts[key]
+
+    def text(self, text, name, size, color):
+        """Return a rendered text surface, rendering it only if it is not cached."""
+        key = (text, name.lower(), size, tuple(color))
+        surface = self.texts.get(key)
+        if surface is None:
+            surface = self.font(name, size).render(text, True, color)
+            self.renders += 1
+            self.texts[key] = surface
+            if len(self.texts) > self.text_cache_size:
+                self.texts.popitem(last=False)
+        else:
+            self.texts.move_to_end(key)
+        return surface
+
+    def bar(self, surface, key, rect, value, max_value, bg_color, fg_color, label, font, label_color):
+        """
+        Draw a filled bar with a centered label, redrawing its cached surface only when it changed.
+
+        Args:
+            surface (Surface): Surface to draw on.
+            key (str): Identifies the bar in the cache.
+            rect (tuple): (x, y, width, height) of the bar.
+            value, max_value (float): Fill amount.
+            bg_color, fg_color (tuple): Background and fill colors.
+            label (str): Text drawn in the middle of the bar.
+            font (tuple): (name, size) of the label font.
+            label_color (tuple): Label color.
+        """
+        x, y, width, height = rect
+        state = (max(0, int((value / max_value) * width)), label, tuple(rect))
+        cached = self.bars.get(key)
+        if not cached or cached[0] != state:
+            text = self.text(label, *font, label_color)
+            bar_rect = pygame.Rect(x, y, width, height)
+            area = bar_rect.union(text.get_rect(center=(x + width / 2, y + height / 2)))
+            image = pygame.Surface(area.size, pygame.SRCALPHA)
+            pygame.draw.rect(image, bg_color, bar_rect.move(-area.x, -area.y))
+            pygame.draw.rect(image, fg_color, (x - area.x, y - area.y, state[0], height))
+            image.blit(text, text.get_rect(center=(x + width / 2 - area.x, y + height / 2 - area.y)))
+            cached = self.bars[key] = (state, image, area.topleft)
+        return self.blit(surface, cached[1], cached[2])
+
+    def blit(self, surface, image, pos):
+        """Blit a HUD element and record its area for dirty_rects()."""
+        rect = surface.blit(image, pos)
+        self.drawn.append(rect)
+        return rect
+
+    def dirty_rects(self):
+        return self.last_drawn + self.drawn
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+        self.frame_renders = self.renders
+        self.last_drawn = self.drawn
+        self.drawn = []
+
+    def end_frame(self):
+        self.frame_ms = (time.perf_counter() - self.frame_start) * 1000
+        self.frame_renders = self.renders - self.frame_renders
+
+    def stats(self):
+        """Return the last frame's HUD cost and the cache sizes."""
+        return {'frame_ms': self.frame_ms, 'text_renders': self.frame_renders,
+                'fonts': len(self.fonts), 'texts': len(self.texts), 'bars': len(self.bars)}
+
+
+hud = HUD()
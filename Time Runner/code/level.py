@@ -0,0 +1,223 @@
+import hashlib
+import json
+import os
+import sys
+import xml.etree.ElementTree as ElementTree
+from collections import namedtuple
+from os.path import dirname, exists
+from settings import *
+from assets import assets
+
+Spawn = namedtuple('Spawn', 'name pos')
+
+CACHE_VERSION = 1
+# Tiled stores flip/rotation flags in the top bits of a gid
+GID_FLAGS = 0xE0000000
+
+
+class Level(namedtuple('Level', 'path width height tiles collisions spawns')):
+    """
+    Immutable snapshot of a parsed level.
+
+    Attributes:
+        path (str): Source map file.
+        width, height (int): Map size in tiles.
+        tiles (tuple): ((x, y), surface) for every tile, in draw order (lower layers first).
+        collisions (tuple): (x, y, width, height) of every object in the Collisions layer.
+        spawns (tuple): Spawn(name, (x, y)) for every object in the Spawns layer.
+    """
+
+    __slots__ = ()
+
+    @classmethod
+    def load(cls, path, images=True):
+        """
+        Load a level from its compiled cache, rebuilding the cache from the TMX when it is stale.
+
+        Falls back to parsing the TMX with pytmx if the cache cannot be used or written.
+
+        Args:
+            path (str): TMX map file.
+            images (bool): Load tile images; headless simulations only need colliders and spawns.
+        """
+        if LEVEL_CACHE:
+            try:
+                if not cache_is_fresh(path):
+                    compile_level(path)
+                return cls.from_cache(path, images)
+            except (ImportError, OSError, ValueError, KeyError):
+                pass
+        return cls.from_tmx(path, images)
+
+    @classmethod
+    def from_tmx(cls, path, images=True):
+        """Parse a Tiled map with pytmx."""
+        if images:
+            from pytmx.util_pygame import load_pygame
+            map = load_pygame(path)
+        else:
+            from pytmx import TiledMap
+            map = TiledMap(path)
+        tiles = tuple(
+            ((TILE_SIZE * x, TILE_SIZE * y), image)
+            for layer_name in TILE_LAYERS
+            for x, y, image in map.get_layer_by_name(layer_name).tiles()
+        ) if images else ()
+        collisions = tuple((obj.x, obj.y, obj.width, obj.height) for obj in map.get_layer_by_name('Collisions'))
+        spawns = tuple(Spawn(obj.name, (obj.x, obj.y)) for obj in map.get_layer_by_name('Spawns'))
+        return cls(path, map.width, map.height, tiles, collisions, spawns)
+
+    @classmethod
+    def from_cache(cls, path, images=True):
+        """Load a compiled level, memory-mapping its tile and collision arrays."""
+        meta, tiles, collisions = read_cache(path)
+        atlas = TileAtlas(dirname(path), meta['tilesets'])
+        layers = [tiles[meta['layers'].index(name)] for name in TILE_LAYERS] if images else []
+        return cls(
+            path, meta['width'], meta['height'],
+            tuple(((TILE_SIZE * x, TILE_SIZE * y), atlas[int(layer[y, x])])
+                  for layer in layers for y, x in zip(*layer.nonzero())),
+            tuple(tuple(rect) for rect in collisions.tolist()),
+            tuple(Spawn(name, (x, y)) for name, x, y in meta['spawns']),
+        )
+
+
+class TileAtlas:
+    """Maps gids to subsurfaces of the tileset images referenced by a compiled level."""
+
+    def __init__(self, map_dir, tilesets):
+        self.map_dir = map_dir
+        self.tilesets = sorted(tilesets, key=lambda tileset: tileset['firstgid'])
+        self.images = {}
+
+    def __getitem__(self, gid):
+        if gid not in self.images:
+            tileset = next(t for t in reversed(self.tilesets) if t['firstgid'] <= gid)
+            sheet = assets.image(join(self.map_dir, tileset['image']))
+            index = gid - tileset['firstgid']
+            width, height = tileset['tilewidth'], tileset['tileheight']
+            area = ((index % tileset['columns']) * width, (index // tileset['columns']) * height, width, height)
+            self.images[gid] = sheet.subsurface(area)
+        return self.images[gid]
+
+
+def cache_dir(path):
+    return os.path.splitext(path)[0] + '.level'
+
+
+def source_signature(path, with_hash=False):
+    """Return the mtime and size (and optionally the SHA-1) of a map file."""
+    stat = os.stat(path)
+    signature = {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+    if with_hash:
+        with open(path, 'rb') as file:
+            signature['sha1'] = hashlib.sha1(file.read()).hexdigest()
+    return signature
+
+
+def cache_is_fresh(path):
+    """
+    Check a compiled level against its TMX: a matching mtime and size is trusted, otherwise the
+    content hash decides (so a touched but unchanged map does not force a rebuild).
+    """
+    meta_path = join(cache_dir(path), 'meta.json')
+    if not exists(meta_path):
+        return False
+    with open(meta_path) as file:
+        meta = json.load(file)
+    if meta.get('version') != CACHE_VERSION:
+        return False
+    source = meta['source']
+    signature = source_signature(path)
+    if signature['mtime'] == source['mtime'] and signature['size'] == source['size']:
+        return True
+    return source_signature(path, with_hash=True)['sha1'] == source['sha1']
+
+
+def read_cache(path):
+    import numpy as np
+    directory = cache_dir(path)
+    with open(join(directory, 'meta.json')) as file:
+        meta = json.load(file)
+    tiles = np.load(join(directory, 'tiles.npy'), mmap_mode='r')
+    collisions = np.load(join(directory, 'collisions.npy'), mmap_mode='r')
+    return meta, tiles, collisions
+
+
+def parse_tmx(path):
+    """
+    Read the parts of a Tiled map the game uses straight from the XML.
+
+    Only orthogonal maps with CSV-encoded layers, unflipped tiles and plain tileset images are
+    supported; anything else raises ValueError so callers fall back to pytmx.
+    """
+    root = ElementTree.parse(path).getroot()
+    width, height = int(root.get('width')), int(root.get('height'))
+    tilesets = []
+    for element in root.iter('tileset'):
+        image = element.find('image')
+        if element.get('source') or image is None or int(element.get('spacing', 0)) or int(element.get('margin', 0)):
+            raise ValueError(f"unsupported tileset {element.get('name')!r}")
+        tilesets.append({
+            'firstgid': int(element.get('firstgid')),
+            'tilewidth': int(element.get('tilewidth')),
+            'tileheight': int(element.get('tileheight')),
+            'columns': int(element.get('columns')),
+            'image': image.get('source'),
+        })
+    layers = {}
+    for element in root.iter('layer'):
+        data = element.find('data')
+        if data.get('encoding') != 'csv':
+            raise ValueError(f"layer {element.get('name')!r} is not CSV encoded")
+        gids = [int(value) for value in data.text.replace('\n', '').split(',') if value.strip()]
+        if any(gid & GID_FLAGS for gid in gids):
+            raise ValueError(f"layer {element.get('name')!r} uses flipped tiles")
+        layers[element.get('name')] = gids
+    groups = {}
+    for element in root.iter('objectgroup'):
+        groups[element.get('name')] = [
+            (obj.get('name'), float(obj.get('x', 0)), float(obj.get('y', 0)),
+             float(obj.get('width', 0)), float(obj.get('height', 0)))
+            for obj in element.iter('object')
+        ]
+    return width, height, tilesets, layers, groups
+
+
+def compile_level(path):
+    """
+    Compile a Tiled map into the binary level cache next to it:
+
+    - tiles.npy: uint32 gid array of shape (layers, height, width)
+    - collisions.npy: float64 (x, y, width, height) rows from the Collisions layer
+    - meta.json: source signature, map size, layer names, tileset atlas references and spawns
+    """
+    import numpy as np
+    width, height, tilesets, layers, groups = parse_tmx(path)
+    names = list(layers)
+    tiles = np.array([layers[name] for name in names], dtype=np.uint32).reshape(len(names), height, width)
+    collisions = np.array([obj[1:] for obj in groups['Collisions']], dtype=np.float64).reshape(-1, 4)
+    meta = {
+        'version': CACHE_VERSION,
+        'source': source_signature(path, with_hash=True),
+        'width': width,
+        'height': height,
+        'layers': names,
+        'tilesets': tilesets,
+        'spawns': [[name, x, y] for name, x, y, _, _ in groups['Spawns']],
+    }
+    directory = cache_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    if exists(join(directory, 'meta.json')):
+        os.remove(join(directory, 'meta.json'))
+    np.save(join(directory, 'tiles.npy'), tiles)
+    np.save(join(directory, 'collisions.npy'), collisions)
+    # meta.json is written last so a half-written cache is never considered fresh
+    with open(join(directory, 'meta.json'), 'w') as file:
+        json.dump(meta, file)
+    return directory
+
+
+if __name__ == "__main__":
+    for map_path in sys.argv[1:] or [LEVEL_PATH]:
+        print(f"{map_path} -> {compile_level(map_path)}")
@@ -0,0 +1,166 @@
+import glob
+import logging
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from settings import *
+from world import World
+
+log = logging.getLogger(__name__)
+
+
+def discover_levels(root=MAPS_DIR):
+    """Return the campaign levels: the first .tmx of every directory under root, by directory name."""
+    paths = []
+    for directory in sorted(glob.glob(join(root, '*', ''))):
+        maps = sorted(glob.glob(join(directory, '*.tmx')))
+        if maps:
+            paths.append(maps[0])
+    return paths
+
+
+def prepared_size(prepared):
+    """Estimated bytes held by a prepared level: its baked chunk surfaces dominate."""
+    level, tiles, chunks = prepared
+    pixels = sum(surface.get_width() * surface.get_height() * surface.get_bytesize()
+                 for surface, _ in (chunks or {}).values())
+    # Tile objects and collider tuples; tile images are shared tileset subsurfaces
+    return pixels + 64 * len(tiles) + 80 * len(level.collisions)
+
+
+class LevelManager:
+    """
+    Plays levels in campaign order, prefetching the next one while the current one is played.
+
+    Levels are built with World.prepare_level on a background thread and kept in an LRU cache
+    bounded by `budget` bytes (the level being played is never evicted), so moving to the next
+    level, or back to a recent one, does not stop the game to parse and bake it.
+
+    Streamed levels (STREAM_WORLD) are not prepared up front, so with prepare=False the manager
+    only keeps the campaign order and get() returns None.
+
+    Args:
+        paths (list): Level files in campaign order (default: discover_levels()).
+        budget (int): Most bytes of prepared levels kept cached.
+        start (str): Level to start on, if it is in the campaign (default: LEVEL_PATH).
+        prepare (bool): Prepare, prefetch and cache levels.
+    """
+
+    def __init__(self, paths=None, budget=LEVEL_CACHE_BYTES, start=LEVEL_PATH, prepare=True):
+        self.paths = list(discover_levels() if paths is None else paths)
+        self.budget = budget
+        self.prepare = prepare
+        self.index = self.paths.index(start) if start in self.paths else 0
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level-prefetch')
+        self.hits = 0
+        self.late = 0
+        self.misses = 0
+        self.failed = 0
+        self.startup_builds = 0
+        self.transitions = []
+
+    @property
+    def current(self):
+        return self.paths[self.index] if self.paths else LEVEL_PATH
+
+    @property
+    def next(self):
+        """The level after the current one, or None on the last level."""
+        return self.paths[self.index + 1] if self.index + 1 < len(self.paths) else None
+
+    def put(self, path, prepared):
+        """Cache a prepared level, evicting the least recently used ones beyond the budget."""
+        self.cache[path] = (prepared, prepared_size(prepared))
+        self.cache.move_to_end(path)
+        for old in list(self.cache):
+            if sum(size for _, size in self.cache.values()) <= self.budget:
+                break
+            if old not in (path, self.current):
+                del self.cache[old]
+
+    def prefetch(self, path):
+        """Start building a level in the background unless it is cached or already being built."""
+        if self.prepare and path and path not in self.cache and path not in self.pending:
+            self.pending[path] = self.executor.submit(World.prepare_level, path)
+
+    def prefetch_next(self):
+        self.prefetch(self.next)
+
+    def get(self, path, startup=False):
+        """
+        Return a prepared level: from the cache (hit), by waiting for its prefetch (late) or by
+        building it now (miss). A prefetch that failed is built again here.
+
+        Args:
+            path (str): Level file.
+            startup (bool): The level the game starts on; nothing could have prefetched it, so
+                building it is counted in startup_builds rather than as a miss.
+        """
+        if not self.prepare:
+            return None
+        if path in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(path)
+            return self.cache[path][0]
+        future = self.pending.pop(path, None)
+        done = future is not None and future.done()
+        prepared = self.prefetched(future, path)
+        if prepared is not None:
+            self.late += not done
+            self.hits += done
+        else:
+            self.startup_builds += startup
+            self.misses += not startup
+            prepared = World.prepare_level(path)
+        self.put(path, prepared)
+        return prepared
+
+    def prefetched(self, future, path):
+        """Wait for a prefetch and return its level, or None if there was none or it failed."""
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            # A broken background build must not end the game: the level is built again on demand
+            log.exception("prefetching %s failed", path)
+            self.failed += 1
+            return None
+
+    def collect(self):
+        """Move finished prefetches into the cache; call once per frame."""
+        for path, future in list(self.pending.items()):
+            if future.done():
+                del self.pending[path]
+                prepared = self.prefetched(future, path)
+                if prepared is not None:
+                    self.put(path, prepared)
+
+    def advance(self):
+        """Move to the next level and return (path, prepared level)."""
+        self.index += 1
+        return self.current, self.get(self.current)
+
+    def restart(self):
+        """Go back to the first level and return (path, prepared level)."""
+        self.index = 0
+        return self.current, self.get(self.current)
+
+    def record_transition(self, seconds):
+        self.transitions.append(seconds)
+
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self):
+        requests = self.hits + self.late + self.misses
+        return {
+            'hits': self.hits, 'late': self.late, 'misses': self.misses, 'failed': self.failed,
+            'startup_builds': self.startup_builds,
+            'hit_rate': self.hits / requests if requests else None,
+            'transition_ms_mean': 1000 * sum(self.transitions) / len(self.transitions) if self.transitions else None,
+            'transition_ms_max': 1000 * max(self.transitions) if self.transitions else None,
+            'cached': len(self.cache),
+            'cached_bytes': sum(size for _, size in self.cache.values()),
+        }
@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+from random import Random
+from settings import *
+from controls import InputState
+from coop import CoopClient, CoopServer
+from netcode import ENEMY
+
+
+def bot_input(client, rng, hold=30):
+    """Wander, changing direction every `hold` inputs, and shoot at the nearest enemy."""
+    if client.seq % hold == 0:
+        client.wander = (rng.randint(-1, 1), rng.randint(-1, 1))
+    aim = (1, 0)
+    if client.position:
+        x, y = client.position
+        enemies = [(ex, ey) for kind, ex, ey, *_ in client.interpolated().values() if kind == ENEMY]
+        if enemies:
+            ex, ey = min(enemies, key=lambda pos: (pos[0] - x) ** 2 + (pos[1] - y) ** 2)
+            aim = (ex - x, ey - y)
+    return InputState(client.wander, rng.random() < 0.2, True, aim)
+
+
+async def run_bot(client, duration, rng):
+    loop = asyncio.get_running_loop()
+    end = loop.time() + duration
+    interval = 1 / client.tick_rate
+    while client.connected and loop.time() < end:
+        client.send_input(bot_input(client, rng))
+        await asyncio.sleep(interval)
+
+
+async def load_test(clients=4, enemies=30, duration=10.0, tick_rate=NET_TICK_RATE, level_path=LEVEL_PATH, seed=0):
+    """
+    Run a co-op server and bot clients over localhost TCP in one process and measure them.
+
+    Args:
+        clients (int): Bot clients to connect.
+        enemies (int): Enemy count for the server world.
+        duration (float): Seconds to play.
+        tick_rate (int): Server net ticks per second.
+        level_path (str): Level to play.
+        seed (int): Seed for spawns and bot input.
+
+    Returns:
+        dict: Server tick cost, per-client bandwidth, delta vs full snapshot size and prediction corrections.
+    """
+    server = CoopServer(level_path, port=0, tick_rate=tick_rate, enemy_count=enemies, seed=seed, measure_full=True)
+    await server.start()
+    bots = []
+    for i in range(clients):
+        bot = CoopClient(f'bot-{i}')
+        await bot.connect(server.host, server.port)
+        bots.append(bot)
+    server_task = asyncio.create_task(server.run())
+    rng = Random(seed)
+    await asyncio.gather(*(run_bot(bot, duration, Random(rng.random())) for bot in bots))
+    server.stop()
+    await server_task
+    for bot in bots:
+        await bot.close()
+    await server.close()
+
+    report = server.stats()
+    # Enemies still alive at the end are fewer than were spawned
+    report['enemies'] = enemies
+    snapshots = sum(bot.bytes_received for bot in bots)
+    sent = sum(bot.bytes_sent for bot in bots)
+    corrections = [correction for bot in bots for correction in bot.corrections]
+    report.update({
+        'clients': clients,
+        'duration': duration,
+        'tick_rate': tick_rate,
+        'down_kbps_per_client': 8 * snapshots / clients / duration / 1000 if clients else 0.0,
+        'up_kbps_per_client': 8 * sent / clients / duration / 1000 if clients else 0.0,
+        'snapshot_bytes_mean': snapshots / max(1, sum(bot.snapshot_count for bot in bots)),
+        'full_snapshot_bytes_mean': server.full_bytes / max(1, server.tick_count),
+        'correction_px_mean': statistics.mean(corrections) if corrections else 0.0,
+        'correction_px_max': max(corrections, default=0.0),
+    })
+    return report
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    parser = argparse.ArgumentParser(description='Load-test the co-op server with bot clients on localhost.')
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--enemies', type=int, default=30)
+    parser.add_argument('--duration', type=float, default=10, help='seconds to play')
+    parser.add_argument('--tick-rate', type=int, default=NET_TICK_RATE)
+    parser.add_argument('--level', default=LEVEL_PATH)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='also write the report as JSON')
+    args = parser.parse_args()
+
+    report = asyncio.run(load_test(args.clients, args.enemies, args.duration, args.tick_rate, args.level, args.seed))
+    print(f"{report['clients']} clients, {report['enemies']} enemies, {report['ticks']} ticks at {report['tick_rate']}/s")
+    print(f"  server tick   {report['tick_ms_mean']:.2f} ms mean, {report['tick_ms_p95']:.2f} ms p95, "
+          f"{report['tick_ms_max']:.2f} ms max (sim {report['sim_ms_mean']:.2f} ms), {report['overruns']} overruns")
+    print(f"  per client    {report['down_kbps_per_client']:.1f} kbit/s down, {report['up_kbps_per_client']:.1f} kbit/s up")
+    print(f"  snapshots     {report['snapshot_bytes_mean']:.0f} B delta vs {report['full_snapshot_bytes_mean']:.0f} B full")
+    print(f"  prediction    {report['correction_px_mean']:.2f} px mean correction, {report['correction_px_max']:.1f} px max")
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
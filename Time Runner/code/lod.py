@@ -0,0 +1,128 @@
+from settings import *
+
+NEAR, MID, FAR = 'near', 'mid', 'far'
+
+
+class EnemyLOD:
+    """
+    Simulation level of detail for enemies, by distance to the player (the camera center).
+
+    - near (within near px): moved every tick.
+    - mid (within far px): moved every mid_interval ticks by the time since their last move, so
+      they cover the same ground in fewer steps. Mid enemies are split into mid_interval phases
+      and only one phase moves per tick.
+    - far: asleep, not moved at all until they are reassessed as mid or near again.
+
+    Tiers are reassessed round-robin, every enemy once per reassess_interval ticks, so a tick costs
+    the near enemies plus a fraction of the rest rather than a full pass over every enemy.
+
+    Args:
+        near (float): Distance in pixels within which enemies are fully simulated.
+        far (float): Distance in pixels beyond which enemies sleep.
+        mid_interval (int): Ticks between moves of a mid enemy.
+        reassess_interval (int): Ticks between reassessments of the same enemy.
+    """
+
+    def __init__(self, near=LOD_NEAR, far=LOD_FAR, mid_interval=LOD_MID_INTERVAL,
+                 reassess_interval=LOD_REASSESS_INTERVAL):
+        self.near_sq = near * near
+        self.far_sq = far * far
+        self.mid_interval = mid_interval
+        self.reassess_interval = reassess_interval
+        self.members = []
+        self.slots = {}
+        self.tier_of = {}
+        self.phase_of = {}
+        self.near = {}
+        # One dict per phase: enemy -> simulation time of its last move
+        self.mid = [{} for _ in range(mid_interval)]
+        self.asleep = {}
+        self.focus = None
+        self.cursor = 0
+        self.added = 0
+        self.ticks = 0
+        self.time = 0.0
+
+    def add(self, enemy):
+        """Register an enemy, tiered by the last known player position (near if there is none yet)."""
+        self.slots[enemy] = len(self.members)
+        self.members.append(enemy)
+        self.phase_of[enemy] = self.added % self.mid_interval
+        self.added += 1
+        self.tier_of[enemy] = NEAR
+        self.near[enemy] = None
+        if self.focus:
+            self.reassess(enemy, self.focus)
+
+    def remove(self, enemy):
+        slot = self.slots.pop(enemy, None)
+        if slot is None:
+            return
+        last = self.members.pop()
+        if last is not enemy:
+            self.members[slot] = last
+            self.slots[last] = slot
+        self.cursor = min(self.cursor, len(self.members))
+        self.bucket(enemy).pop(enemy)
+        del self.tier_of[enemy], self.phase_of[enemy]
+
+    def bucket(self, enemy):
+        tier = self.tier_of[enemy]
+        if tier == NEAR:
+            return self.near
+        if tier == MID:
+            return self.mid[self.phase_of[enemy]]
+        return self.asleep
+
+    def reassess(self, enemy, focus):
+        dx = enemy.rect.centerx - focus[0]
+        dy = enemy.rect.centery - focus[1]
+        distance_sq = dx * dx + dy * dy
+        tier = NEAR if distance_sq < self.near_sq else MID if distance_sq < self.far_sq else FAR
+        if tier == self.tier_of[enemy]:
+            return
+        last_move = self.bucket(enemy).pop(enemy)
+        if self.tier_of[enemy] == MID and self.time > last_move:
+            # Catch up on the movement owed since its last mid-rate step
+            enemy.move(self.time - last_move)
+        self.tier_of[enemy] = tier
+        self.bucket(enemy)[enemy] = self.time if tier == MID else None
+
+    def reassess_all(self, focus):
+        """Tier every enemy at once, e.g. right after a level has spawned."""
+        self.focus = focus
+        for enemy in self.members:
+            self.reassess(enemy, focus)
+
+    def update(self, focus, delta_time):
+        """
+        Reassess this tick's share of enemies, then move the near ones and this tick's mid phase.
+
+        Args:
+            focus (tuple): Player position.
+            delta_time (float): Tick length in seconds.
+        """
+        self.focus = focus
+        count = min(-(-len(self.members) // self.reassess_interval), len(self.members))
+        for _ in range(count):
+            if self.cursor >= len(self.members):
+                self.cursor = 0
+            self.reassess(self.members[self.cursor], focus)
+            self.cursor += 1
+        # Reassessed before the clock advances: catch-up covers past ticks, this one is moved below
+        self.time += delta_time
+        for enemy in self.near:
+            enemy.move(delta_time)
+        phase = self.mid[self.ticks % self.mid_interval]
+        for enemy, last_move in phase.items():
+            enemy.move(self.time - last_move)
+            phase[enemy] = self.time
+        self.ticks += 1
+
+    @property
+    def active(self):
+        """Enemies simulated at all (near and mid), the number that drives the per-tick cost."""
+        return len(self.near) + sum(len(phase) for phase in self.mid)
+
+    def counts(self):
+        return {NEAR: len(self.near), MID: sum(len(phase) for phase in self.mid), FAR: len(self.asleep)}
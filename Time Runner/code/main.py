@@ -0,0 +1,39 @@
+import time
+LAUNCHED = time.perf_counter()
+
+import argparse
+from settings import *
+from startup import Preloader, StartupTimer
+import main_menu
+
+
+def main(report=False):
+    """
+    Open the menu as soon as possible and load the game behind it.
+
+    Only pygame, the settings and the menu are imported before the window opens; the game modules,
+    images and level are loaded by a Preloader while the player types a nickname.
+
+    Args:
+        report (bool): Print the startup timing report once the game is ready.
+    """
+    timer = StartupTimer(LAUNCHED)
+    timer.record('import (menu)', time.perf_counter() - LAUNCHED)
+    with timer.phase('display init'):
+        main_menu.init_display()
+    preloader = Preloader(LEVEL_PATH, timer)
+    menu_result, nickname = main_menu.main_menu()
+    if menu_result == "start":
+        prepared = preloader.result()
+        with timer.phase('game init'):
+            from game import Game
+            game = Game(nickname, prepared=prepared)
+        if report:
+            print(timer.report())
+        game.run()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Time Runner')
+    parser.add_argument('--startup-report', action='store_true', help='print how long each startup phase took')
+    main(parser.parse_args().startup_report)
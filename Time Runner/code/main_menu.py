@@ -1,21 +1,16 @@
 import pygame
 import sys
 
-pygame.init()
-
 # Constants
 WIDTH, HEIGHT = 1280, 720
 WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 LIGHT_BLUE = (104, 117, 142)
 
-# Setup the display
-screen = pygame.display.set_mode((WIDTH, HEIGHT))
-pygame.display.set_caption("Time Runner: Menu")
-
-# Fonts
-font = pygame.font.SysFont('impact', 35)
-button_font = pygame.font.SysFont('impact', 30)
+# Display and fonts, created by init_display() rather than at import time
+screen = None
+font = None
+button_font = None
 
 # UI Elements
 input_box = pygame.Rect(WIDTH / 2 - 150, HEIGHT / 2 - 200, 300, 50)
@@ -24,9 +19,22 @@ quit_button = pygame.Rect(WIDTH // 2 - 100, HEIGHT // 2 + 50, 200, 50)
 
 # Global Variables
 nickname = ''
+# Screen area covered by the nickname box and its text when it was last drawn
+input_area = input_box
+
+
+def init_display():
+    """Initialize pygame and open the menu window (reusing the window if one is already open)."""
+    global screen, font, button_font
+    pygame.init()
+    screen = pygame.display.get_surface() or pygame.display.set_mode((WIDTH, HEIGHT))
+    pygame.display.set_caption("Time Runner: Menu")
+    font = pygame.font.SysFont('impact', 35)
+    button_font = pygame.font.SysFont('impact', 30)
 
 
 def draw_menu():
+    """Draw the whole menu and update the full screen (first frame, or after the window was exposed)."""
     screen.fill(LIGHT_BLUE)
 
     # Draw Start button
@@ -42,9 +50,7 @@ def draw_menu():
     screen.blit(quit_text, (WIDTH // 2 - quit_text.get_width() // 2, HEIGHT // 2 + 55))
 
     # Draw nickname input box
-    pygame.draw.rect(screen, WHITE, input_box)
-    nickname_text = font.render(nickname, True, BLACK)
-    screen.blit(nickname_text, (input_box.x + 10, input_box.y + 10))
+    draw_input_box()
 
     # Instructions text
     instructions = font.render("Enter Nickname:", True, BLACK)
@@ -53,6 +59,23 @@ def draw_menu():
     pygame.display.update()
 
 
+def draw_input_box():
+    """
+    Redraw the nickname box, clearing text left over from the previous nickname.
+
+    Returns:
+        Rect: Screen area that changed.
+    """
+    global input_area
+    previous_area = input_area
+    screen.fill(LIGHT_BLUE, previous_area)
+    pygame.draw.rect(screen, WHITE, input_box)
+    nickname_text = font.render(nickname, True, BLACK)
+    text_rect = screen.blit(nickname_text, (input_box.x + 10, input_box.y + 10))
+    input_area = input_box.union(text_rect)
+    return input_area.union(previous_area)
+
+
 def handle_text_input(event):
     global nickname
     if event.key == pygame.K_BACKSPACE:
@@ -74,23 +97,31 @@ def handle_button_click(mouse_pos):
 
 
 def main_menu():
-    global nickname
+    """Event-driven menu: sleeps until there is input and only updates the parts of the screen that changed."""
+    if screen is None:
+        init_display()
+    draw_menu()
     while True:
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
-                pygame.quit()
-                sys.exit()
-
-            # Handle text input
-            if event.type == pygame.KEYDOWN:
-                result = handle_text_input(event)
-                if result:
-                    return result
-
-            # Handle button clicks
-            if event.type == pygame.MOUSEBUTTONDOWN:
-                result = handle_button_click(pygame.mouse.get_pos())
-                if result:
-                    return result
-
-        draw_menu()
\ No newline at end of file
+        event = pygame.event.wait()
+        if event.type == pygame.QUIT:
+            pygame.quit()
+            sys.exit()
+
+        # Handle text input
+        elif event.type == pygame.KEYDOWN:
+            typed = nickname
+            result = handle_text_input(event)
+            if result:
+                return result
+            if nickname != typed:
+                pygame.display.update(draw_input_box())
+
+        # Handle button clicks
+        elif event.type == pygame.MOUSEBUTTONDOWN:
+            result = handle_button_click(event.pos)
+            if result:
+                return result
+
+        # The window was uncovered or restored; its contents may be gone
+        elif event.type == pygame.WINDOWEXPOSED:
+            draw_menu()
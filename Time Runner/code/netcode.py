@@ -0,0 +1,120 @@
+import struct
+from settings import *
+from controls import InputState
+
+# Message types
+JOIN, WELCOME, INPUT, SNAPSHOT = range(1, 5)
+# payload length, message type
+FRAME = struct.Struct('<IB')
+# client id, net ticks per second, simulation steps per net tick, level path length
+WELCOME_FORMAT = struct.Struct('<HHHH')
+# input sequence, last snapshot tick received, move x, move y, flags (1: sprint, 2: fire), aim x, aim y
+INPUT_FORMAT = struct.Struct('<IIbbBhh')
+# tick, baseline tick (0: full snapshot), last input sequence applied, own entity id, removed count, changed count
+SNAPSHOT_HEADER = struct.Struct('<IIIHHH')
+# entity id, bit mask of the fields that follow
+ENTITY_HEADER = struct.Struct('<HB')
+
+# Entity kinds and their fields: (kind, x, y, a, b, c), where a/b/c are player stamina, ammo and
+# flags or boss health, and positions are in 1/NET_POSITION_SCALE pixel units
+PLAYER, ENEMY, BULLET, BOSS = range(4)
+FIELDS = (struct.Struct('<B'), struct.Struct('<H'), struct.Struct('<H'),
+          struct.Struct('<B'), struct.Struct('<B'), struct.Struct('<B'))
+ALL_FIELDS = (1 << len(FIELDS)) - 1
+PLAYER_DOWN = 1
+
+
+def frame(kind, payload=b''):
+    return FRAME.pack(len(payload), kind) + payload
+
+
+async def read_frame(reader):
+    """Read one message from an asyncio StreamReader; returns (type, payload)."""
+    length, kind = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return kind, await reader.readexactly(length)
+
+
+def quantize_position(value):
+    return max(0, min(0xFFFF, int(round(value * NET_POSITION_SCALE))))
+
+
+def position(value):
+    return value / NET_POSITION_SCALE
+
+
+def entity_state(kind, pos, a=0, b=0, c=0):
+    """Quantize one entity into the tuple snapshots carry."""
+    return (kind, quantize_position(pos[0]), quantize_position(pos[1]),
+            max(0, min(255, int(a))), max(0, min(255, int(b))), c)
+
+
+def encode_input(seq, ack, state):
+    (move_x, move_y), sprint, fire, (aim_x, aim_y) = state
+    return INPUT_FORMAT.pack(seq, ack, move_x, move_y, sprint | fire << 1, aim_x, aim_y)
+
+
+def decode_input(payload):
+    seq, ack, move_x, move_y, flags, aim_x, aim_y = INPUT_FORMAT.unpack(payload)
+    return seq, ack, InputState((move_x, move_y), bool(flags & 1), bool(flags & 2), (aim_x, aim_y))
+
+
+def encode_snapshot(tick, baseline_tick, input_seq, own_id, entities, baseline):
+    """
+    Encode entities as a delta against a baseline the client already has.
+
+    Only entities whose quantized state changed are written, and only their changed fields; an
+    entity missing from the baseline is written whole. With an empty baseline (baseline_tick 0)
+    this is a full snapshot.
+
+    Args:
+        tick (int): Server tick of this snapshot.
+        baseline_tick (int): Tick of the baseline, 0 for none.
+        input_seq (int): Last input sequence of this client the server applied.
+        own_id (int): Entity id of the client's player.
+        entities (dict): Entity id -> state tuple from entity_state().
+        baseline (dict): Entities of the baseline snapshot.
+    """
+    removed = [entity_id for entity_id in baseline if entity_id not in entities]
+    body = []
+    changed = 0
+    for entity_id, state in entities.items():
+        old = baseline.get(entity_id)
+        if old == state:
+            continue
+        mask = ALL_FIELDS if old is None else sum(1 << i for i, (new, prev) in enumerate(zip(state, old)) if new != prev)
+        body.append(ENTITY_HEADER.pack(entity_id, mask))
+        body.extend(FIELDS[i].pack(value) for i, value in enumerate(state) if mask & 1 << i)
+        changed += 1
+    header = SNAPSHOT_HEADER.pack(tick, baseline_tick, input_seq, own_id, len(removed), changed)
+    return header + struct.pack(f'<{len(removed)}H', *removed) + b''.join(body)
+
+
+def decode_snapshot(payload, baselines):
+    """
+    Decode a snapshot, applying it to its baseline.
+
+    Args:
+        payload (bytes): Encoded snapshot.
+        baselines (dict): Tick -> entities of the snapshots received so far.
+
+    Returns:
+        tuple: (tick, input sequence applied, own entity id, entities) or None if the baseline is unknown.
+    """
+    tick, baseline_tick, input_seq, own_id, removed_count, changed = SNAPSHOT_HEADER.unpack_from(payload)
+    if baseline_tick and baseline_tick not in baselines:
+        return None
+    entities = dict(baselines[baseline_tick]) if baseline_tick else {}
+    offset = SNAPSHOT_HEADER.size
+    for entity_id in struct.unpack_from(f'<{removed_count}H', payload, offset):
+        entities.pop(entity_id, None)
+    offset += 2 * removed_count
+    for _ in range(changed):
+        entity_id, mask = ENTITY_HEADER.unpack_from(payload, offset)
+        offset += ENTITY_HEADER.size
+        state = list(entities.get(entity_id, (0,) * len(FIELDS)))
+        for i, field in enumerate(FIELDS):
+            if mask & 1 << i:
+                (state[i],) = field.unpack_from(payload, offset)
+                offset += field.size
+        entities[entity_id] = tuple(state)
+    return tick, input_seq, own_id, entities
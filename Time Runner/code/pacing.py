@@ -0,0 +1,54 @@
+from settings import *
+
+
+def set_mode(size, vsync=VSYNC):
+    """
+    Open the game window, asking for vsync if configured.
+
+    Args:
+        size (tuple): Window size.
+        vsync (int): 0 for none, 1 for vsync, -1 for adaptive vsync (falls back to plain vsync,
+            then none, when the driver refuses).
+    """
+    for mode in dict.fromkeys((vsync, 1) if vsync else ()):
+        try:
+            return pygame.display.set_mode(size, pygame.SCALED, vsync=mode)
+        except (pygame.error, ValueError):
+            pass
+    return pygame.display.set_mode(size)
+
+
+class FramePacer:
+    """
+    Caps the frame rate, sleeping between frames instead of spinning.
+
+    While the window is unfocused or minimized the cap drops to idle_fps to save CPU and power.
+
+    Args:
+        target_fps (int): Frame cap while focused (0 for uncapped).
+        idle_fps (int): Frame cap while unfocused.
+    """
+
+    def __init__(self, target_fps=TARGET_FPS, idle_fps=IDLE_FPS):
+        self.clock = pygame.time.Clock()
+        self.target_fps = target_fps
+        self.idle_fps = idle_fps
+        self.focused = True
+
+    @property
+    def fps_cap(self):
+        return self.target_fps if self.focused else self.idle_fps
+
+    def handle_event(self, event):
+        """Track focus from window events; call for every event the loop receives."""
+        if event.type in (pygame.WINDOWFOCUSLOST, pygame.WINDOWMINIMIZED):
+            self.focused = False
+        elif event.type in (pygame.WINDOWFOCUSGAINED, pygame.WINDOWRESTORED):
+            self.focused = True
+
+    def tick(self):
+        """Wait out the rest of the frame and return the time since the last tick in seconds."""
+        return self.clock.tick(self.fps_cap) / 1000
+
+    def get_fps(self):
+        return self.clock.get_fps()
@@ -0,0 +1,128 @@
+from settings import *
+
+# Neighbour offsets; diagonals come last so straight moves win ties
+NEIGHBOURS = ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+class FlowField:
+    """
+    Breadth-first distance map toward the player over the TILE_SIZE grid, shared by all enemies.
+
+    The field is only rebuilt when the target moves to another tile; enemies then sample the
+    next step from their own tile in O(1), so pathfinding cost does not depend on enemy count.
+    The search stops `radius` steps from the target, so a rebuild costs the same on any map size;
+    enemies further away are off the field and chase the target directly.
+
+    Args:
+        collision_sprites: Walls, rasterized once into blocked tiles.
+        width, height (int): Map size in tiles.
+        radius (int): Path length in tiles beyond which the field is not computed.
+    """
+
+    def __init__(self, collision_sprites, width, height, radius=FLOW_FIELD_RADIUS):
+        self.width = width
+        self.height = height
+        self.radius = radius
+        self.blocked = self.rasterize(collision_sprites, width, height)
+        self.dist = [-1] * (width * height)
+        # Tiles the last search reached; only these are cleared before the next one
+        self.visited = []
+        self.target_tile = None
+        self.generation = 0
+        # Next tile on the path, memoized per tile until the next rebuild
+        self.next_tiles = {}
+
+    @staticmethod
+    def rasterize(collision_sprites, width, height):
+        """Mark every tile whose center lies inside a collider as blocked."""
+        blocked = bytearray(width * height)
+        for sprite in collision_sprites:
+            rect = sprite.rect
+            for x in range(max(int(rect.left // TILE_SIZE), 0), min(int(rect.right // TILE_SIZE) + 1, width)):
+                for y in range(max(int(rect.top // TILE_SIZE), 0), min(int(rect.bottom // TILE_SIZE) + 1, height)):
+                    if rect.collidepoint((x + 0.5) * TILE_SIZE, (y + 0.5) * TILE_SIZE):
+                        blocked[y * width + x] = 1
+        return blocked
+
+    def tile_at(self, pos):
+        x, y = int(pos[0] // TILE_SIZE), int(pos[1] // TILE_SIZE)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return x, y
+        return None
+
+    def update(self, target_pos):
+        """
+        Rebuild the distance map if the target entered a new tile.
+
+        Args:
+            target_pos (tuple): World position of the target (the player's center).
+
+        Returns:
+            bool: True if the field was rebuilt.
+        """
+        tile = self.tile_at(target_pos)
+        if tile is None or tile == self.target_tile:
+            return False
+        self.target_tile = tile
+        self.rebuild(tile)
+        return True
+
+    def rebuild(self, tile):
+        """Run a 4-connected BFS from the target tile over unblocked tiles, up to radius steps."""
+        width, blocked, dist = self.width, self.blocked, self.dist
+        for index in self.visited:
+            dist[index] = -1
+        last_row = len(dist) - width
+        start = tile[1] * width + tile[0]
+        dist[start] = 0
+        # The queue is never popped: it doubles as the list of visited tiles
+        queue = [start]
+        for index in queue:
+            step = dist[index] + 1
+            if step > self.radius:
+                break
+            x = index % width
+            for neighbour, valid in ((index - 1, x > 0), (index + 1, x < width - 1),
+                                     (index - width, index >= width), (index + width, index < last_row)):
+                if valid and dist[neighbour] < 0 and not blocked[neighbour]:
+                    dist[neighbour] = step
+                    queue.append(neighbour)
+        self.visited = queue
+        self.next_tiles = {}
+        self.generation += 1
+
+    def reachable(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height and self.dist[y * self.width + x] >= 0
+
+    def next_tile(self, x, y):
+        """Return the neighbour of a tile closest to the target, or None if none is closer."""
+        best, best_dist = None, self.dist[y * self.width + x]
+        for dx, dy in NEIGHBOURS:
+            nx, ny = x + dx, y + dy
+            # Diagonal steps must not cut the corner of a blocked tile
+            if not self.reachable(nx, ny) or (dx and dy and not (self.reachable(nx, y) and self.reachable(x, ny))):
+                continue
+            if self.dist[ny * self.width + nx] < best_dist:
+                best, best_dist = (nx, ny), self.dist[ny * self.width + nx]
+        return best
+
+    def direction(self, pos):
+        """
+        Return the unit direction from pos toward the center of the next tile on the path.
+
+        Args:
+            pos (tuple): World position of the enemy.
+
+        Returns:
+            Vector2 or None: None when pos is off the field, unreachable or already in the target tile.
+        """
+        tile = self.tile_at(pos)
+        if tile is None or tile == self.target_tile or not self.reachable(*tile):
+            return None
+        if tile not in self.next_tiles:
+            self.next_tiles[tile] = self.next_tile(*tile)
+        best = self.next_tiles[tile]
+        if best is None:
+            return None
+        offset = pygame.Vector2((best[0] + 0.5) * TILE_SIZE - pos[0], (best[1] + 0.5) * TILE_SIZE - pos[1])
+        return offset.normalize() if offset else None
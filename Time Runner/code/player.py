@@ -1,11 +1,18 @@
 from settings import *
 from sprites import Arrow
+from assets import assets
+from hud import hud
+from controls import IDLE_INPUT
 
 
 class Player(pygame.sprite.Sprite):
+    mask = None
+
     def __init__(self, pos, groups, collision_sprites):
         super().__init__(groups)
-        self.image = pygame.image.load(join('images', 'boy.png')).convert_alpha()
+        self.image = assets.image(join('images', 'boy.png'))
+        if Player.mask is None:
+            Player.mask = pygame.mask.from_surface(self.image)
         self.rect = self.image.get_frect(center=pos)
         self.hitbox_rect = self.rect.inflate(-5, -30)
 
@@ -15,6 +22,7 @@ class Player(pygame.sprite.Sprite):
         self.boosted_speed = 500
         self.speed = self.default_speed
         self.collision_sprites = collision_sprites
+        self.input_state = IDLE_INPUT
 
         # Stamina
         self.max_stamina = 50
@@ -30,12 +38,11 @@ class Player(pygame.sprite.Sprite):
         self.ammo_regeneration_rate = 0.5
 
     def input(self, delta_time):
-        keys = pygame.key.get_pressed()
-        self.direction.x = int(keys[pygame.K_d]) - int(keys[pygame.K_a])
-        self.direction.y = int(keys[pygame.K_s]) - int(keys[pygame.K_w])
+        state = self.input_state
+        self.direction.x, self.direction.y = state.move
         self.direction = self.direction.normalize() if self.direction else self.direction
 
-        if keys[pygame.K_SPACE] and self.stamina > 0 and self.cooldown_timer == 0:
+        if state.sprint and self.stamina > 0 and self.cooldown_timer == 0:
             self.speed = self.boosted_speed
             self.stamina -= self.stamina_depletion_rate * delta_time
         else:
@@ -66,7 +73,7 @@ class Player(pygame.sprite.Sprite):
         self.rect.center = self.hitbox_rect.center
 
     def collision(self, direction):
-        for sprite in self.collision_sprites:
+        for sprite in self.collision_sprites.nearby(self.hitbox_rect):
             if sprite.rect.colliderect(self.hitbox_rect):
                 if direction == 'horizontal':
                     if self.direction.x > 0:
@@ -80,18 +87,8 @@ class Player(pygame.sprite.Sprite):
                         self.hitbox_rect.bottom = sprite.rect.top
 
     def render_bar(self, surface, x, y, bar_width, bar_height, current_value, max_value, bg_color, fg_color, label):
-        # Background
-        pygame.draw.rect(surface, bg_color, (x, y, bar_width, bar_height))
-
-        # Foreground
-        value_width = (current_value / max_value) * bar_width
-        pygame.draw.rect(surface, fg_color, (x, y, value_width, bar_height))
-
-        # Label
-        font = pygame.font.SysFont('impact', 25)
-        text = font.render(label, True, (255, 0, 0))
-        text_rect = text.get_rect(center=(x + bar_width / 2, y + bar_height / 2))
-        surface.blit(text, text_rect)
+        hud.bar(surface, label, (x, y, bar_width, bar_height), current_value, max_value,
+                bg_color, fg_color, label, ('impact', 25), (255, 0, 0))
 
     def stamina_bar(self, surface):
         self.render_bar(
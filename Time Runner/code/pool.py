@@ -0,0 +1,54 @@
+class SpritePool:
+    """
+    Recycles sprites of one class instead of allocating a new one per spawn.
+
+    The class must build itself through reset(*args), which also (re)adds it to its groups, and
+    call release() from kill(). acquire() hands out a released sprite after resetting it, or
+    constructs a new one when the free list is empty.
+
+    Args:
+        cls (type): Sprite class; its `pool` attribute is set on every sprite the pool creates.
+    """
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.free = []
+        self.active = set()
+        self.high_water = 0
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self.free:
+            sprite = self.free.pop()
+            sprite.reset(*args)
+            self.reused += 1
+        else:
+            sprite = self.cls(*args)
+            sprite.pool = self
+            self.created += 1
+        self.active.add(sprite)
+        self.high_water = max(self.high_water, len(self.active))
+        return sprite
+
+    def release(self, sprite):
+        """Return a killed sprite to the free list; releasing it again (a double kill) is ignored."""
+        if sprite in self.active:
+            self.active.remove(sprite)
+            self.free.append(sprite)
+
+    def reserve(self, count, *args):
+        """Construct sprites until `count` are free or in use, so later acquires do not allocate."""
+        high_water = self.high_water
+        spare = [self.acquire(*args) for _ in range(count - len(self.free) - len(self.active))]
+        for sprite in spare:
+            sprite.kill()
+        self.high_water = high_water
+
+    def release_all(self):
+        for sprite in list(self.active):
+            sprite.kill()
+
+    def stats(self):
+        return {'in_use': len(self.active), 'free': len(self.free), 'high_water': self.high_water,
+                'created': self.created, 'reused': self.reused}
@@ -0,0 +1,133 @@
+import csv
+import json
+import time
+from collections import deque
+from settings import *
+from hud import hud
+
+
+class Scope:
+    """Context manager adding the time spent inside it to one named stage of the current frame."""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        stages = self.profiler.stages
+        stages[self.name] = stages.get(self.name, 0.0) + (time.perf_counter() - self.start) * 1000
+
+
+class FrameProfiler:
+    """
+    Per-frame timing of named stages plus counters, over a rolling window of frames.
+
+    Wrap each stage in `with profiler.scope(name):`; a stage entered several times in one frame
+    (e.g. fixed steps) is summed. end_frame() closes the frame and records its total time, stage
+    times and counters such as sprite and blit counts.
+
+    Args:
+        window (int): Number of recent frames kept for percentiles and export.
+    """
+
+    def __init__(self, window=PROFILE_WINDOW):
+        self.frames = deque(maxlen=window)
+        self.scopes = {}
+        self.stages = {}
+        self.frame_start = None
+        self.show_overlay = False
+        self.overlay_lines = []
+        self.overlay_age = 0
+
+    def scope(self, name):
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+
+    def begin_frame(self):
+        self.frame_start = time.perf_counter()
+        self.stages = {}
+
+    def end_frame(self, **counts):
+        """Record the frame started by begin_frame() with its stage times and the given counters."""
+        if self.frame_start is None:
+            return
+        self.frames.append({
+            'frame_ms': (time.perf_counter() - self.frame_start) * 1000,
+            'stages': self.stages,
+            'counts': counts,
+        })
+        self.frame_start = None
+
+    def samples(self, stage=None):
+        """Frame times, or one stage's times (0 in frames where it did not run), in milliseconds."""
+        if stage is None:
+            return [frame['frame_ms'] for frame in self.frames]
+        return [frame['stages'].get(stage, 0.0) for frame in self.frames]
+
+    def percentiles(self, stage=None, quantiles=(50, 95, 99)):
+        """Return {'p50': ms, ...} over the window (nearest-rank), or zeros if it is empty."""
+        values = sorted(self.samples(stage))
+        if not values:
+            return {f'p{q}': 0.0 for q in quantiles}
+        return {f'p{q}': values[min(len(values) - 1, int(q / 100 * len(values)))] for q in quantiles}
+
+    def stage_names(self):
+        names = []
+        for frame in self.frames:
+            names.extend(name for name in frame['stages'] if name not in names)
+        return names
+
+    def report(self):
+        """Percentiles for the whole frame and every stage, plus the last frame's counters."""
+        return {
+            'frames': len(self.frames),
+            'frame': self.percentiles(),
+            'stages': {name: self.percentiles(name) for name in self.stage_names()},
+            'counts': self.frames[-1]['counts'] if self.frames else {},
+        }
+
+    def export(self, path):
+        """Write the window as a JSON trace (with the report) or, for a .csv path, one row per frame."""
+        if path.endswith('.csv'):
+            stages = self.stage_names()
+            counts = sorted({name for frame in self.frames for name in frame['counts']})
+            with open(path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['frame_ms'] + stages + counts)
+                for frame in self.frames:
+                    writer.writerow([round(frame['frame_ms'], 4)]
+                                    + [round(frame['stages'].get(name, 0.0), 4) for name in stages]
+                                    + [frame['counts'].get(name, '') for name in counts])
+        else:
+            with open(path, 'w') as file:
+                json.dump({'report': self.report(), 'frames': list(self.frames)}, file, indent=1)
+
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+
+    def draw_overlay(self, surface, refresh=30):
+        """Draw frame and stage percentiles and the last counters in the top-right corner, updated every `refresh` frames."""
+        if not self.overlay_lines or self.overlay_age >= refresh:
+            report = self.report()
+            frame = report['frame']
+            lines = [f"frame  p50 {frame['p50']:.2f}  p95 {frame['p95']:.2f}  p99 {frame['p99']:.2f} ms"]
+            for name, stage in report['stages'].items():
+                lines.append(f"{name:<16} p50 {stage['p50']:.2f}  p95 {stage['p95']:.2f} ms")
+            lines.extend(f"{name}: {value}" for name, value in report['counts'].items())
+            self.overlay_lines = lines
+            self.overlay_age = 0
+        self.overlay_age += 1
+        for i, line in enumerate(self.overlay_lines):
+            text = hud.text(line, 'Consolas', 16, (255, 255, 0))
+            surface.blit(text, (WINDOW_WIDTH - text.get_width() - 10, 10 + i * 18))
+
+
+profiler = FrameProfiler()
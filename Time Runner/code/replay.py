@@ -0,0 +1,184 @@
+import argparse
+import hashlib
+import os
+import struct
+import time
+from collections import deque, namedtuple
+from settings import *
+from controls import InputState
+
+MAGIC = b'TRRP'
+VERSION = 1
+# magic, version, timestep, seed, enemy count (-1: the level's own), level path length
+HEADER = struct.Struct('<4sBdqiH')
+# ticks the input is held, move x, move y, flags (1: sprint, 2: fire), aim x, aim y
+RUN = struct.Struct('<IbbBhh')
+# result (0: none, 1: win, 2: lose), steps, simulated seconds, SHA-1 of the final state
+FOOTER = struct.Struct('<BId20s')
+RESULTS = (None, 'win', 'lose')
+
+Recording = namedtuple('Recording', 'timestep seed enemy_count level_path runs result steps sim_time state_hash')
+
+
+def quantize(state):
+    """Round an InputState to what a recording can store, so live play and replay see the same input."""
+    (move_x, move_y), sprint, fire, (aim_x, aim_y) = state
+    clamp = lambda value: max(-32768, min(32767, int(round(value))))
+    aim = (clamp(aim_x), clamp(aim_y))
+    if aim == (0, 0) and (aim_x or aim_y):
+        # Keep tiny aim vectors pointing somewhere rather than turning them into "no aim"
+        aim = (clamp(aim_x * 1000), clamp(aim_y * 1000))
+    return InputState((int(move_x), int(move_y)), bool(sprint), bool(fire), aim)
+
+
+def state_hash(world):
+    """SHA-1 over the simulation state that decides a run: positions, resources, timers and result."""
+    digest = hashlib.sha1()
+    player = world.player
+    digest.update(struct.pack('<4d3d', *player.rect, player.stamina, player.ammo_count, player.cooldown_timer))
+    for group in (world.enemy_sprites, world.bullet_sprites):
+        rects = sorted(tuple(sprite.rect) for sprite in group)
+        digest.update(struct.pack('<I', len(rects)))
+        for rect in rects:
+            digest.update(struct.pack('<4d', *rect))
+    digest.update(struct.pack('<id', world.boss.health if world.boss else 0, world.sim_time))
+    digest.update(str(world.result).encode())
+    return digest.digest()
+
+
+class InputRecorder:
+    """
+    Records the input of every simulation tick, run-length encoded.
+
+    World.step calls record() with each tick's input when a recorder is attached. Unchanged input
+    only extends the current run, so a recording costs RUN.size bytes per input change rather
+    than per tick.
+
+    Args:
+        seed (int): Spawn seed of the recorded world (see Simulation).
+        enemy_count (int): Enemy count override of the recorded world, None for the level's own.
+        level_path (str): Level that was played.
+        timestep (float): Seconds per tick.
+    """
+
+    def __init__(self, seed=0, enemy_count=None, level_path=LEVEL_PATH, timestep=FIXED_TIMESTEP):
+        self.seed = seed
+        self.enemy_count = enemy_count
+        self.level_path = level_path
+        self.timestep = timestep
+        self.runs = []
+
+    def record(self, state):
+        """Log one tick of input and return it quantized, as a replay will see it."""
+        state = quantize(state)
+        if self.runs and self.runs[-1][1] == state:
+            self.runs[-1][0] += 1
+        else:
+            self.runs.append([1, state])
+        return state
+
+    def clear(self):
+        self.runs = []
+
+    @property
+    def steps(self):
+        return sum(count for count, _ in self.runs)
+
+    def save(self, path, world):
+        """Write the recording with the final result and state hash of the world it drove."""
+        level = self.level_path.encode()
+        enemy_count = -1 if self.enemy_count is None else self.enemy_count
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, self.timestep, self.seed, enemy_count, len(level)))
+            file.write(level)
+            file.write(struct.pack('<I', len(self.runs)))
+            for count, ((move_x, move_y), sprint, fire, (aim_x, aim_y)) in self.runs:
+                file.write(RUN.pack(count, move_x, move_y, sprint | fire << 1, aim_x, aim_y))
+            file.write(FOOTER.pack(RESULTS.index(world.result), self.steps, world.sim_time, state_hash(world)))
+
+
+def load(path):
+    """Read a recording written by InputRecorder.save."""
+    with open(path, 'rb') as file:
+        data = file.read()
+    magic, version, timestep, seed, enemy_count, level_length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a version {VERSION} Time Runner recording")
+    offset = HEADER.size
+    level_path = data[offset:offset + level_length].decode()
+    offset += level_length
+    (run_count,) = struct.unpack_from('<I', data, offset)
+    offset += 4
+    runs = []
+    for _ in range(run_count):
+        count, move_x, move_y, flags, aim_x, aim_y = RUN.unpack_from(data, offset)
+        runs.append((count, InputState((move_x, move_y), bool(flags & 1), bool(flags & 2), (aim_x, aim_y))))
+        offset += RUN.size
+    result, steps, sim_time, digest = FOOTER.unpack_from(data, offset)
+    return Recording(timestep, seed, None if enemy_count < 0 else enemy_count, level_path, runs,
+                     RESULTS[result], steps, sim_time, digest)
+
+
+class ReplayInput:
+    """Input source that plays back the ticks of a Recording."""
+
+    def __init__(self, recording):
+        self.ticks = (state for count, state in recording.runs for _ in range(count))
+        self.world = None
+
+    def poll(self):
+        return next(self.ticks)
+
+
+def replay(recording, profile=False):
+    """
+    Re-run a recording headlessly as fast as possible and check it reproduces the recorded result.
+
+    Args:
+        recording (Recording | str): Recording or path to one.
+        profile (bool): Record every tick as a profiler frame, to look into captured spikes.
+
+    Returns:
+        dict: result, sim_time, steps, wall_time, speedup and verified (final state hash matches).
+    """
+    from simulation import Simulation
+    from profiler import profiler
+    if isinstance(recording, str):
+        recording = load(recording)
+    simulation = Simulation(ReplayInput(recording), recording.level_path, recording.timestep,
+                            recording.enemy_count, recording.seed)
+    if profile:
+        profiler.frames = deque(maxlen=max(recording.steps, 1))
+    start = time.perf_counter()
+    for _ in range(recording.steps):
+        if profile:
+            profiler.begin_frame()
+        simulation.tick()
+        if profile:
+            profiler.end_frame(enemies=len(simulation.enemy_sprites), bullets=len(simulation.bullet_sprites))
+    wall_time = time.perf_counter() - start
+    return {
+        'result': simulation.result,
+        'sim_time': simulation.sim_time,
+        'steps': simulation.steps,
+        'wall_time': wall_time,
+        'speedup': simulation.sim_time / wall_time if wall_time else float('inf'),
+        'verified': state_hash(simulation) == recording.state_hash and simulation.result == recording.result,
+    }
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    parser = argparse.ArgumentParser(description='Replay a recorded game headlessly and verify it.')
+    parser.add_argument('recording')
+    parser.add_argument('--profile', help='export a per-tick profiler trace (.json or .csv) to this path')
+    args = parser.parse_args()
+
+    report = replay(args.recording, profile=bool(args.profile))
+    if args.profile:
+        from profiler import profiler
+        profiler.export(args.profile)
+    status = 'VERIFIED' if report['verified'] else 'MISMATCH'
+    print(f"{status}: {report['result']} after {report['sim_time']:.2f}s simulated ({report['steps']} ticks) "
+          f"in {report['wall_time']:.2f}s, {report['speedup']:.0f}x real time")
+    raise SystemExit(0 if report['verified'] else 1)
@@ -4,3 +4,77 @@ from os import walk
 
 WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
 TILE_SIZE = 32
+
+# Simulation
+FIXED_TIMESTEP = 1 / 120
+MAX_FRAME_TIME = 0.25
+
+# Frame pacing
+TARGET_FPS = 60
+IDLE_FPS = 10
+VSYNC = 0
+
+# Level
+LEVEL_PATH = join('data', 'maps', 'maplvl1', 'map1.tmx')
+TILE_LAYERS = ('Ground1', 'Cliff2', 'Objects2', 'Objects1')
+LEVEL_CACHE = True
+# Campaign: every directory under MAPS_DIR holds one level, played in name order
+MAPS_DIR = join('data', 'maps')
+LEVEL_CACHE_BYTES = 128 * 2 ** 20  # prepared levels kept in memory for instant transitions
+
+# Rendering
+CHUNKED_RENDERING = True
+CHUNK_SIZE = 16
+# Stream chunks around the player instead of building the whole map (for very large maps)
+STREAM_WORLD = False
+STREAM_MARGIN = 1  # chunks kept loaded beyond the view
+STREAM_CAPACITY = 48  # most chunks loaded at once, least recently needed evicted first
+STREAM_BUDGET = 2  # most finished chunks added per tick
+ROTATION_STEPS = 360
+DIRTY_RECTS = True
+
+# Collisions
+COLLISION_CELL_SIZE = TILE_SIZE * 4
+
+# Enemies
+ENEMY_SWARM = False
+# Simulation level of detail: full rate near the player, reduced rate further out, asleep beyond
+ENEMY_LOD = True
+LOD_NEAR = 800  # px, about the view's half diagonal
+LOD_FAR = 1600  # px
+LOD_MID_INTERVAL = 4  # ticks between moves of a mid-range enemy
+LOD_REASSESS_INTERVAL = 12  # ticks between tier checks of the same enemy
+FLOW_FIELD = True
+FLOW_FIELD_RADIUS = LOD_FAR // TILE_SIZE  # path length in tiles the flow field covers around the player
+
+# Pools
+BULLET_POOL_SIZE = 4
+
+# HUD
+HUD_TEXT_CACHE_SIZE = 256
+
+# History
+HISTORY_PATH = 'game_history.db'
+HISTORY_BATCH_SIZE = 64
+HISTORY_FLUSH_INTERVAL = 0.5
+HISTORY_SYNCHRONOUS = 'NORMAL'
+
+# Replays
+RECORD_INPUT = True
+REPLAY_DIR = 'replays'
+
+# Co-op networking
+NET_HOST = '127.0.0.1'
+NET_PORT = 47800
+NET_TICK_RATE = 30  # snapshots and inputs per second
+NET_POSITION_SCALE = 2  # snapshot position units per pixel
+NET_SNAPSHOT_HISTORY = 64  # snapshots kept per client as delta baselines
+NET_INPUT_BUFFER = 3  # queued inputs per client before the oldest are dropped
+NET_INTERP_DELAY = 0.1  # seconds remote entities are drawn in the past
+NET_SEND_LIMIT = 64 * 1024  # bytes queued to a slow client before its snapshots are skipped
+
+# Profiling
+PROFILE_WINDOW = 600
+PROFILE_OVERLAY_KEY = pygame.K_F3
+PROFILE_EXPORT_KEY = pygame.K_F4
+PROFILE_EXPORT_PATH = 'profile_trace.json'
@@ -0,0 +1,96 @@
+import os
+import time
+from random import Random
+from settings import *
+from controls import ScriptedInput
+from level import Spawn
+from world import World
+
+
+class Simulation(World):
+    """
+    Headless, fixed-timestep game simulation.
+
+    No window is opened and nothing is drawn; input comes from an injectable source, so runs are
+    deterministic and step as fast as the CPU allows.
+
+    Args:
+        controls: Object with a poll() method returning an InputState (default: idle ScriptedInput).
+        level_path (str): Level to load.
+        timestep (float): Seconds simulated per step.
+        enemy_count (int): Number of enemies to spawn instead of the level's own (None keeps the level's).
+        seed (int): Seed for choosing and jittering enemy spawns when enemy_count is set.
+        stream (bool): Stream the level in chunks; enemy_count is ignored since enemies spawn per chunk.
+        headless (bool): Skip tile images and chunk baking; False builds the level as the game does
+            and needs a display mode to be set.
+    """
+
+    def __init__(self, controls=None, level_path=LEVEL_PATH, timestep=FIXED_TIMESTEP, enemy_count=None, seed=0,
+                 stream=STREAM_WORLD, headless=True):
+        self.controls = controls or ScriptedInput()
+        self.controls.world = self
+        self.timestep = timestep
+        self.enemy_count = enemy_count
+        self.seed = seed
+        self.steps = 0
+        self.step_times = []
+        self.active_max = 0
+        super().__init__(level_path, headless=headless, stream=stream)
+
+    def spawns(self):
+        """Spawn enemy_count enemies at level enemy spawns, jittered by up to two tiles when reused."""
+        spawns = self.level.spawns
+        if self.enemy_count is None or self.stream:
+            return spawns
+        rng = Random(self.seed)
+        enemy_spawns = [spawn for spawn in spawns if spawn.name == 'enemy']
+        others = [spawn for spawn in spawns if spawn.name != 'enemy']
+        enemies = rng.sample(enemy_spawns, min(self.enemy_count, len(enemy_spawns)))
+        while len(enemies) < self.enemy_count:
+            x, y = rng.choice(enemy_spawns).pos
+            jitter = 2 * TILE_SIZE
+            enemies.append(Spawn('enemy', (x + rng.uniform(-jitter, jitter), y + rng.uniform(-jitter, jitter))))
+        # The player must exist before enemies that chase it
+        return tuple(others) + tuple(enemies)
+
+    def tick(self):
+        """Advance one fixed step with input from the controls."""
+        start = time.perf_counter()
+        self.step(self.timestep, self.controls.poll())
+        self.step_times.append(time.perf_counter() - start)
+        self.active_max = max(self.active_max, self.active_enemies)
+        self.steps += 1
+
+    def run(self, max_steps):
+        """
+        Step until the game is won or lost, or max_steps have been simulated.
+
+        Returns:
+            dict: result ('win', 'lose' or None), simulated seconds, steps, wall-clock seconds,
+            per-step cost (mean, p95 and max in milliseconds) and the most enemies active in a step.
+        """
+        start = time.perf_counter()
+        for _ in range(max_steps):
+            if self.result:
+                break
+            self.tick()
+        step_ms = sorted(duration * 1000 for duration in self.step_times) or [0.0]
+        return {
+            'result': self.result,
+            'sim_time': round(self.sim_time, 4),
+            'steps': self.steps,
+            'wall_time': time.perf_counter() - start,
+            'step_ms_mean': sum(step_ms) / len(step_ms),
+            'step_ms_p95': step_ms[int(0.95 * (len(step_ms) - 1))],
+            'step_ms_max': step_ms[-1],
+            'active_max': self.active_max,
+        }
+
+
+if __name__ == "__main__":
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+    simulation = Simulation()
+    report = simulation.run(int(60 / FIXED_TIMESTEP))
+    speedup = report['sim_time'] / report['wall_time']
+    print(f"{report['steps']} steps, {report['sim_time']}s simulated in {report['wall_time']:.2f}s "
+          f"({speedup:.0f}x real time), result: {report['result']}")
@@ -1,6 +1,8 @@
 import pygame
 from math import atan2, degrees
 from settings import *
+from assets import assets
+from hud import hud
 
 
 class Sprite(pygame.sprite.Sprite):
@@ -17,28 +19,81 @@ class CollisionSprite(pygame.sprite.Sprite):
         self.rect = self.image.get_rect(topleft=pos)
 
 
+class Tile:
+    """Static map tile: only an image and a rect, with no sprite group bookkeeping."""
+
+    __slots__ = ('image', 'rect')
+
+    def __init__(self, pos, surf):
+        self.image = surf
+        self.rect = surf.get_rect(topleft=pos)
+
+
+class Collider:
+    """Static wall: a bare rect stored in CollisionSprites, without a surface."""
+
+    __slots__ = ('rect',)
+
+    def __init__(self, x, y, width, height):
+        self.rect = pygame.Rect(x, y, width, height)
+
+
+class RotationAtlas:
+    """
+    Copies of a surface pre-rotated at ROTATION_STEPS quantized angles.
+
+    Atlases are shared per (surface, steps), so rotating sprites look frames up instead of
+    calling rotozoom every frame.
+    """
+    atlases = {}
+
+    def __init__(self, surface, steps=ROTATION_STEPS):
+        self.steps = steps
+        self.frames = [pygame.transform.rotozoom(surface, step * 360 / steps, 1) for step in range(steps)]
+
+    @classmethod
+    def for_surface(cls, surface, steps=ROTATION_STEPS):
+        """Return the shared atlas for a surface, building it on first use."""
+        key = (surface, steps)
+        if key not in cls.atlases:
+            cls.atlases[key] = cls(surface, steps)
+        return cls.atlases[key]
+
+    def index(self, angle):
+        """Return the frame index closest to an angle in degrees (counter-clockwise)."""
+        return round(angle * self.steps / 360) % self.steps
+
+    def get(self, angle):
+        return self.frames[self.index(angle)]
+
+
 class Arrow(pygame.sprite.Sprite):
     def __init__(self, player, groups):
         super().__init__(groups)
         self.player = player
         self.distance = 50
         self.player_direction = pygame.Vector2(1, 0)
-        self.arrow_surf = pygame.image.load(join('images', 'arrow.png')).convert_alpha()
+        self.arrow_surf = assets.image(join('images', 'arrow.png'))
+        self.atlas = RotationAtlas.for_surface(self.arrow_surf)
+        self.frame = None
         self.image = self.arrow_surf
         self.rect = self.image.get_rect(
             center=self.player.rect.center + self.player_direction * self.distance
         )
 
     def get_direction(self):
-        """Calculate the direction of the arrow based on the mouse position."""
-        mouse_pos = pygame.Vector2(pygame.mouse.get_pos())
-        player_pos = pygame.Vector2(WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
-        self.player_direction = (mouse_pos - player_pos).normalize()
+        """Calculate the direction of the arrow from the player's aim input."""
+        aim = pygame.Vector2(self.player.input_state.aim)
+        if aim:
+            self.player_direction = aim.normalize()
 
     def rotate_arrow(self):
         """Rotate the arrow to face the direction of the mouse."""
         angle = degrees(atan2(self.player_direction.x, self.player_direction.y)) + 90
-        self.image = pygame.transform.rotozoom(self.arrow_surf, angle, 1)
+        frame = self.atlas.index(angle)
+        if frame != self.frame:
+            self.frame = frame
+            self.image = self.atlas.frames[frame]
 
     def update(self, _):
         """Update the arrow's direction and position."""
@@ -48,20 +103,42 @@ class Arrow(pygame.sprite.Sprite):
 
 
 class Bullet(pygame.sprite.Sprite):
-    def __init__(self, surf, pos, direction, groups, boss=None):
-        super().__init__(groups)
+    # Collision masks shared by every bullet using the same surface
+    masks = {}
+    # SpritePool that recycles this bullet, if any
+    pool = None
+
+    def __init__(self, surf, pos, direction, groups, boss=None, atlas=None):
+        super().__init__()
+        self.reset(surf, pos, direction, groups, boss, atlas)
+
+    def reset(self, surf, pos, direction, groups, boss=None, atlas=None):
+        """(Re)initialize the bullet and add it to its groups; used by __init__ and SpritePool."""
+        self.add(groups)
+        # With an atlas the bullet is drawn turned to face its direction of travel
+        if atlas:
+            surf = atlas.get(degrees(atan2(-direction.y, direction.x)))
         self.image = surf
-        self.rect = self.image.get_rect(center=pos)
-        self.spawn_time = pygame.time.get_ticks()
-        self.lifetime = 1500
+        if surf not in Bullet.masks:
+            Bullet.masks[surf] = pygame.mask.from_surface(surf)
+        self.mask = Bullet.masks[surf]
+        self.rect = self.image.get_frect(center=pos)
+        self.age = 0
+        self.lifetime = 1.5
         self.direction = direction
         self.speed = 600
         self.boss = boss
 
+    def kill(self):
+        super().kill()
+        if self.pool:
+            self.pool.release(self)
+
     def update(self, delta_time):
         """Update the bullet's position and check for collisions."""
         self.rect.center += self.direction * self.speed * delta_time
-        if pygame.time.get_ticks() - self.spawn_time >= self.lifetime:
+        self.age += delta_time
+        if self.age >= self.lifetime:
             self.kill()
         if self.boss and self.rect.colliderect(self.boss.rect):
             self.boss.take_damage(1)
@@ -69,21 +146,44 @@ class Bullet(pygame.sprite.Sprite):
 
 
 class Enemy(pygame.sprite.Sprite):
-    def __init__(self, pos, groups, player, collision_sprites):
-        super().__init__(groups)
+    # Collision mask built from the first enemy image and shared by every enemy
+    mask = None
+    # SpritePool that recycles this enemy, if any
+    pool = None
+
+    def __init__(self, pos, groups, player, collision_sprites, swarm=None, flow_field=None, lod=None):
+        super().__init__()
+        self.swarm_index = None
+        self.reset(pos, groups, player, collision_sprites, swarm, flow_field, lod)
+
+    def reset(self, pos, groups, player, collision_sprites, swarm=None, flow_field=None, lod=None):
+        """(Re)initialize the enemy and add it to its groups; used by __init__ and SpritePool."""
+        self.add(groups)
         self.player = player
-        self.image = pygame.image.load(join('images', 'slime.png')).convert_alpha()
-        self.rect = self.image.get_rect(center=pos)
+        self.image = assets.image(join('images', 'slime.png'))
+        if Enemy.mask is None:
+            Enemy.mask = pygame.mask.from_surface(self.image)
+        self.rect = self.image.get_frect(center=pos)
         self.hitbox_rect = self.rect.inflate(0, 0)
         self.collision_sprites = collision_sprites
         self.direction = pygame.Vector2()
         self.speed = 110
+        self.flow_field = flow_field
+        self.swarm = swarm
+        self.swarm_index = swarm.add(self) if swarm else None
+        self.lod = lod
+        if lod:
+            lod.add(self)
 
     def move(self, delta_time):
-        """Move the enemy toward the player."""
-        player_pos = pygame.Vector2(self.player.rect.center)
-        enemy_pos = pygame.Vector2(self.rect.center)
-        self.direction = (player_pos - enemy_pos).normalize()
+        """Move the enemy toward the player, following the flow field around walls when there is one."""
+        flow_direction = self.flow_field.direction(self.rect.center) if self.flow_field else None
+        if flow_direction:
+            self.direction = flow_direction
+        else:
+            player_pos = pygame.Vector2(self.player.rect.center)
+            enemy_pos = pygame.Vector2(self.rect.center)
+            self.direction = (player_pos - enemy_pos).normalize()
         self.hitbox_rect.x += self.direction.x * self.speed * delta_time
         self.collision('horizontal')
         self.hitbox_rect.y += self.direction.y * self.speed * delta_time
@@ -92,7 +192,7 @@ class Enemy(pygame.sprite.Sprite):
 
     def collision(self, direction):
         """Handle collisions with other sprites."""
-        for sprite in self.collision_sprites:
+        for sprite in self.collision_sprites.nearby(self.hitbox_rect):
             if sprite.rect.colliderect(self.hitbox_rect):
                 if direction == 'horizontal':
                     if self.direction.x > 0:
@@ -105,14 +205,29 @@ class Enemy(pygame.sprite.Sprite):
                     elif self.direction.y > 0:
                         self.hitbox_rect.bottom = sprite.rect.top
 
+    def kill(self):
+        if self.swarm:
+            self.swarm.remove(self)
+        if self.lod:
+            self.lod.remove(self)
+        super().kill()
+        if self.pool:
+            self.pool.release(self)
+
     def update(self, delta_time):
-        self.move(delta_time)
+        # Swarm members are moved in bulk by EnemySwarm.update, LOD members by EnemyLOD.update
+        if not self.swarm and not self.lod:
+            self.move(delta_time)
 
 
 class Boss(pygame.sprite.Sprite):
+    mask = None
+
     def __init__(self, pos, groups, collision_sprites):
         super().__init__(groups)
-        self.image = pygame.image.load(join('images', 'boss.png')).convert_alpha()
+        self.image = assets.image(join('images', 'boss.png'))
+        if Boss.mask is None:
+            Boss.mask = pygame.mask.from_surface(self.image)
         self.rect = self.image.get_rect(center=pos)
         self.hitbox_rect = self.rect.inflate(30, 30)
         self.collision_sprites = collision_sprites
@@ -127,16 +242,11 @@ class Boss(pygame.sprite.Sprite):
     def health_bar(self, surface):
         bar_width, bar_height = 150, 30
         x, y = WINDOW_WIDTH - 400, 50
-        pygame.draw.rect(surface, (60, 10, 100), (x, y, bar_width, bar_height))
-        health_width = (self.health / self.max_health) * bar_width
-        pygame.draw.rect(surface, (150, 60, 230), (x, y, health_width, bar_height))
-        font = pygame.font.SysFont('Impact', 16)
-        health_text = font.render(f"{self.health}/{self.max_health}", True, (255, 255, 255))
-        text_rect = health_text.get_rect(center=(x + bar_width / 2, y + bar_height / 2))
-        surface.blit(health_text, text_rect)
-        boss_text = font.render("BOSS", True, (255, 255, 255))
+        hud.bar(surface, 'boss', (x, y, bar_width, bar_height), self.health, self.max_health,
+                (60, 10, 100), (150, 60, 230), f"{self.health}/{self.max_health}", ('Impact', 16), (255, 255, 255))
+        boss_text = hud.text("BOSS", 'Impact', 16, (255, 255, 255))
         boss_text_rect = boss_text.get_rect(center=(x + bar_width // 2, y - 15))
-        surface.blit(boss_text, boss_text_rect)
+        hud.blit(surface, boss_text, boss_text_rect)
 
     def update(self, delta_time):
         pass
\ No newline at end of file
@@ -0,0 +1,80 @@
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from settings import *
+
+
+class StartupTimer:
+    """
+    Wall-clock time of each startup phase, for the startup report.
+
+    Phases can be timed from any thread; background phases overlap the menu, so only
+    'wait at start' and 'game init' delay the game once Start is pressed.
+
+    Args:
+        origin (float): time.perf_counter() at process start.
+    """
+
+    def __init__(self, origin=None):
+        self.origin = time.perf_counter() if origin is None else origin
+        self.phases = {}
+
+    def record(self, name, seconds):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def report(self):
+        lines = ['Startup:']
+        lines.extend(f"  {name:<16} {seconds * 1000:>8.1f} ms" for name, seconds in self.phases.items())
+        lines.append(f"  {'total':<16} {(time.perf_counter() - self.origin) * 1000:>8.1f} ms since launch")
+        return '\n'.join(lines)
+
+
+class Preloader:
+    """
+    Imports the game modules, decodes the sprite images and prepares the level on a background
+    thread, so that all of it happens while the menu waits for the nickname.
+
+    A streamed level (STREAM_WORLD) has nothing to prepare up front; its chunks load in game.
+
+    Args:
+        level_path (str): Level to prepare.
+        timer (StartupTimer): Receives 'import (game)', 'asset decode' and 'level build'.
+    """
+
+    def __init__(self, level_path=LEVEL_PATH, timer=None):
+        self.level_path = level_path
+        self.timer = timer or StartupTimer()
+        self.prepared = None
+        self.error = None
+        self.thread = threading.Thread(target=self.run, name='preloader', daemon=True)
+        self.thread.start()
+
+    def run(self):
+        try:
+            with self.timer.phase('import (game)'):
+                importlib.import_module('game')
+            from world import World
+            from assets import assets
+            with self.timer.phase('asset decode'):
+                assets.preload(World.IMAGES)
+            if not STREAM_WORLD:
+                with self.timer.phase('level build'):
+                    self.prepared = World.prepare_level(self.level_path)
+        except Exception as error:
+            self.error = error
+
+    def result(self):
+        """Wait for the preload to finish and return the prepared level (None if it failed or is streamed)."""
+        with self.timer.phase('wait at start'):
+            self.thread.join()
+        # A failed preload is not fatal: the game builds everything itself as it did before
+        return None if self.error else self.prepared
@@ -0,0 +1,230 @@
+import queue
+import threading
+from collections import OrderedDict
+from os.path import dirname
+from settings import *
+from level import Spawn, TileAtlas, cache_is_fresh, compile_level, read_cache
+
+# Spawns that exist for the whole game rather than belonging to a chunk
+GLOBAL_SPAWNS = ('player', 'boss')
+
+
+class LevelStream:
+    """
+    A compiled level opened for streaming.
+
+    Tile gids stay memory-mapped and only the tiles of a requested chunk are read and baked.
+    Colliders and enemy spawns are bucketed by the chunks they overlap.
+
+    Args:
+        path (str): TMX map file; its binary cache is (re)built if needed.
+        images (bool): Bake tile surfaces; headless simulations only need colliders and spawns.
+    """
+
+    def __init__(self, path, images=True):
+        if not cache_is_fresh(path):
+            compile_level(path)
+        meta, tiles, collisions = read_cache(path)
+        self.path = path
+        self.width, self.height = meta['width'], meta['height']
+        self.layers = [tiles[meta['layers'].index(name)] for name in TILE_LAYERS] if images else []
+        self.atlas = TileAtlas(dirname(path), meta['tilesets']) if images else None
+        self.chunk_pixels = CHUNK_SIZE * TILE_SIZE
+
+        # Collider index -> rect, and chunk -> indices of the colliders overlapping it
+        self.collisions = [tuple(rect) for rect in collisions.tolist()]
+        self.chunk_collisions = {}
+        for index, (x, y, width, height) in enumerate(self.collisions):
+            for key in self.chunks_overlapping(x, y, width, height):
+                self.chunk_collisions.setdefault(key, []).append(index)
+
+        self.global_spawns = []
+        self.chunk_spawns = {}
+        for name, x, y in meta['spawns']:
+            if name in GLOBAL_SPAWNS:
+                self.global_spawns.append(Spawn(name, (x, y)))
+            else:
+                self.chunk_spawns.setdefault(self.chunk_at((x, y)), []).append(Spawn(name, (x, y)))
+
+    @property
+    def chunk_columns(self):
+        return -(-self.width // CHUNK_SIZE)
+
+    @property
+    def chunk_rows(self):
+        return -(-self.height // CHUNK_SIZE)
+
+    def chunk_at(self, pos):
+        return int(pos[0] // self.chunk_pixels), int(pos[1] // self.chunk_pixels)
+
+    def chunks_overlapping(self, x, y, width, height):
+        """Chunk keys covered by a pixel rect, clipped to the map."""
+        left, top = self.chunk_at((x, y))
+        right, bottom = self.chunk_at((x + max(width, 1) - 1, y + max(height, 1) - 1))
+        return [(cx, cy)
+                for cx in range(max(left, 0), min(right, self.chunk_columns - 1) + 1)
+                for cy in range(max(top, 0), min(bottom, self.chunk_rows - 1) + 1)]
+
+    def build_chunk(self, key):
+        """Bake one chunk's tiles into a surface (None if it has no tiles or images are off). Thread-safe."""
+        if not self.layers:
+            return None
+        cx, cy = key
+        x0, y0 = cx * CHUNK_SIZE, cy * CHUNK_SIZE
+        surface = None
+        for layer in self.layers:
+            gids = layer[y0:y0 + CHUNK_SIZE, x0:x0 + CHUNK_SIZE]
+            for y, x in zip(*gids.nonzero()):
+                if surface is None:
+                    surface = pygame.Surface((self.chunk_pixels, self.chunk_pixels), pygame.SRCALPHA)
+                surface.blit(self.atlas[int(gids[y, x])], (x * TILE_SIZE, y * TILE_SIZE))
+        return surface
+
+
+class WorldStreamer:
+    """
+    Keeps the chunks around the camera loaded and evicts the least recently needed ones.
+
+    A loaded chunk contributes its baked surface to AllSprites.chunks, its colliders to the
+    collision group and its enemies to the world. When a chunk is evicted, the enemies standing
+    in it are parked and respawn where they stood once it loads again. Colliders that overlap
+    several chunks are reference counted.
+
+    With threaded=True chunks are baked on a background thread and at most `budget` finished
+    chunks are added per update, so a frame never waits for loading. Without a thread, chunks
+    load synchronously inside update(), which keeps headless runs deterministic.
+
+    Args:
+        world (World): World to stream into.
+        stream (LevelStream): Level being streamed.
+        margin (int): Chunks loaded beyond the edges of the view.
+        capacity (int): Most chunks kept loaded.
+        threaded (bool): Bake chunks on a background thread.
+        budget (int): Most chunks integrated per update when threaded.
+    """
+
+    def __init__(self, world, stream, margin=STREAM_MARGIN, capacity=STREAM_CAPACITY, threaded=True,
+                 budget=STREAM_BUDGET):
+        self.world = world
+        self.stream = stream
+        self.margin = margin
+        self.capacity = capacity
+        self.budget = budget
+        self.loaded = OrderedDict()
+        self.pending = set()
+        self.collider_refs = {}
+        self.spawned = set()
+        self.parked = {}
+        self.loads = 0
+        self.evictions = 0
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.worker = None
+        if threaded:
+            self.worker = threading.Thread(target=self.build_loop, name='chunk-loader', daemon=True)
+            self.worker.start()
+
+    def build_loop(self):
+        while True:
+            key = self.requests.get()
+            if key is None:
+                break
+            self.results.put((key, self.stream.build_chunk(key)))
+
+    def needed(self, focus):
+        """Chunk keys overlapping the view around focus, widened by margin chunks."""
+        pad = self.margin * self.stream.chunk_pixels
+        return self.stream.chunks_overlapping(focus[0] - WINDOW_WIDTH / 2 - pad, focus[1] - WINDOW_HEIGHT / 2 - pad,
+                                              WINDOW_WIDTH + 2 * pad, WINDOW_HEIGHT + 2 * pad)
+
+    def update(self, focus, wait=False):
+        """
+        Request the chunks around focus, add finished ones and evict beyond capacity.
+
+        Args:
+            focus (tuple): World position the camera is centered on.
+            wait (bool): Block until every needed chunk is loaded (first frame).
+        """
+        needed = self.needed(focus)
+        for key in needed:
+            if key in self.loaded:
+                self.loaded.move_to_end(key)
+            elif not self.worker:
+                self.integrate(key, self.stream.build_chunk(key))
+            elif key not in self.pending:
+                self.pending.add(key)
+                self.requests.put(key)
+        if self.worker:
+            integrated = 0
+            while self.pending and (wait or integrated < self.budget):
+                try:
+                    key, surface = self.results.get(block=wait)
+                except queue.Empty:
+                    break
+                self.pending.discard(key)
+                self.integrate(key, surface)
+                integrated += 1
+        needed = set(needed)
+        for key in list(self.loaded):
+            if len(self.loaded) <= self.capacity:
+                break
+            if key not in needed:
+                self.evict(key)
+
+    def integrate(self, key, surface):
+        if key in self.loaded:
+            return
+        origin = (key[0] * self.stream.chunk_pixels, key[1] * self.stream.chunk_pixels)
+        if surface is not None:
+            if pygame.display.get_surface():
+                surface = surface.convert_alpha()
+            self.world.all_sprites.chunks[key] = (surface, origin)
+            self.world.all_sprites.invalidate()
+        for index in self.stream.chunk_collisions.get(key, ()):
+            ref = self.collider_refs.get(index)
+            if ref:
+                ref[0] += 1
+            else:
+                self.collider_refs[index] = [1, self.world.collision_sprites.add_rect(*self.stream.collisions[index])]
+        if key not in self.spawned:
+            self.spawned.add(key)
+            for spawn in self.stream.chunk_spawns.get(key, ()):
+                self.world.spawn(spawn)
+        for spawn in self.parked.pop(key, ()):
+            self.world.spawn(spawn)
+        self.loaded[key] = origin
+        self.loads += 1
+
+    def evict(self, key):
+        del self.loaded[key]
+        self.world.all_sprites.chunks.pop(key, None)
+        for index in self.stream.chunk_collisions.get(key, ()):
+            ref = self.collider_refs[index]
+            ref[0] -= 1
+            if ref[0] == 0:
+                self.world.collision_sprites.remove(ref[1])
+                del self.collider_refs[index]
+        parked = self.parked.setdefault(key, [])
+        for enemy in list(self.world.enemy_sprites):
+            if self.stream.chunk_at(enemy.rect.center) == key:
+                parked.append(Spawn('enemy', enemy.rect.center))
+                enemy.kill()
+        self.evictions += 1
+
+    def respawn(self):
+        """Restart: forget parked enemies and spawn every loaded chunk's enemies afresh."""
+        self.parked.clear()
+        self.spawned = set(self.loaded)
+        for key in self.loaded:
+            for spawn in self.stream.chunk_spawns.get(key, ()):
+                self.world.spawn(spawn)
+
+    def close(self):
+        if self.worker and self.worker.is_alive():
+            self.requests.put(None)
+            self.worker.join()
+
+    def stats(self):
+        return {'loaded': len(self.loaded), 'pending': len(self.pending), 'colliders': len(self.collider_refs),
+                'parked': sum(len(spawns) for spawns in self.parked.values()),
+                'loads': self.loads, 'evictions': self.evictions}
@@ -0,0 +1,201 @@
+import numpy as np
+from settings import *
+from pathfinding import NEIGHBOURS
+
+
+class EnemySwarm:
+    """
+    Struct-of-arrays store that moves every registered Enemy with batched NumPy operations.
+
+    Enemies keep their sprite for drawing and mask collisions; the swarm owns their positions
+    and writes the resulting centers back to each sprite's rect after every update.
+    """
+
+    def __init__(self, collision_sprites, capacity=64, flow_field=None):
+        self.collision_sprites = collision_sprites
+        self.flow_field = flow_field
+        self.flow_generation = None
+        self.enemies = []
+        self.pos = np.zeros((capacity, 2))
+        self.half_size = np.zeros((capacity, 2))
+        self.speed = np.zeros(capacity)
+        self.active = np.zeros(capacity, dtype=bool)
+        self.walls = None
+
+    def add(self, enemy):
+        """
+        Register an enemy and return its slot in the arrays.
+
+        Args:
+            enemy (Enemy): Enemy whose hitbox_rect and speed seed the slot.
+        """
+        index = enemy.swarm_index
+        # A recycled enemy gets its old slot back
+        if index is None or index >= len(self.enemies) or self.enemies[index] is not enemy:
+            index = len(self.enemies)
+            if index == len(self.active):
+                self.grow(2 * index)
+            self.enemies.append(enemy)
+        self.pos[index] = enemy.hitbox_rect.center
+        self.half_size[index] = (enemy.hitbox_rect.width / 2, enemy.hitbox_rect.height / 2)
+        self.speed[index] = enemy.speed
+        self.active[index] = True
+        return index
+
+    def remove(self, enemy):
+        self.active[enemy.swarm_index] = False
+
+    def grow(self, capacity):
+        extra = capacity - len(self.active)
+        self.pos = np.concatenate((self.pos, np.zeros((extra, 2))))
+        self.half_size = np.concatenate((self.half_size, np.zeros((extra, 2))))
+        self.speed = np.concatenate((self.speed, np.zeros(extra)))
+        self.active = np.concatenate((self.active, np.zeros(extra, dtype=bool)))
+
+    def load_walls(self):
+        """
+        Pack the collider rects into (left, top, right, bottom) columns and bucket them into
+        a flat grid of cell_size cells stored as CSR arrays (cell_start, cell_walls).
+        """
+        rects = [sprite.rect for sprite in self.collision_sprites]
+        self.walls = np.array([(r.left, r.top, r.right, r.bottom) for r in rects], dtype=float).reshape(-1, 4)
+        size = self.collision_sprites.cell_size
+        self.cell_size = size
+        self.grid_cols = int(self.walls[:, 2].max() // size) + 1 if len(rects) else 1
+        self.grid_rows = int(self.walls[:, 3].max() // size) + 1 if len(rects) else 1
+        buckets = [[] for _ in range(self.grid_cols * self.grid_rows)]
+        for wall, (left, top, right, bottom) in enumerate(self.walls.tolist()):
+            for x in range(max(int(left // size), 0), int(right // size) + 1):
+                for y in range(max(int(top // size), 0), int(bottom // size) + 1):
+                    buckets[y * self.grid_cols + x].append(wall)
+        self.cell_start = np.cumsum([0] + [len(bucket) for bucket in buckets])
+        self.cell_walls = np.array([wall for bucket in buckets for wall in bucket], dtype=np.intp)
+
+    def candidate_pairs(self, low, high):
+        """
+        Return (row, wall) index arrays pairing each hitbox with the walls in the cells it covers.
+
+        Args:
+            low (ndarray): Top-left corners of the hitboxes.
+            high (ndarray): Bottom-right corners of the hitboxes.
+        """
+        # Clamping to the grid keeps hitboxes outside it paired with the walls along its border
+        bounds = (self.grid_cols - 1, self.grid_rows - 1)
+        first = np.clip(np.floor(low / self.cell_size).astype(np.intp), 0, bounds)
+        last = np.clip(np.floor(high / self.cell_size).astype(np.intp), 0, bounds)
+        span = int((last - first).max()) + 1
+        rows, walls = [], []
+        for dx in range(span):
+            for dy in range(span):
+                cx, cy = first[:, 0] + dx, first[:, 1] + dy
+                inside = (cx <= last[:, 0]) & (cy <= last[:, 1])
+                row = np.flatnonzero(inside)
+                cell = cy[row] * self.grid_cols + cx[row]
+                counts = self.cell_start[cell + 1] - self.cell_start[cell]
+                row = np.repeat(row, counts)
+                # Offsets of every wall slot inside its cell's run of cell_walls
+                offsets = np.arange(len(row)) - np.repeat(np.cumsum(counts) - counts, counts)
+                rows.append(row)
+                walls.append(self.cell_walls[np.repeat(self.cell_start[cell], counts) + offsets])
+        return np.concatenate(rows), np.concatenate(walls)
+
+    def steer(self, index, target):
+        """Return unit direction vectors from the enemies at index toward the target."""
+        offset = np.asarray(target, dtype=float) - self.pos[index]
+        length = np.hypot(offset[:, 0], offset[:, 1])[:, None]
+        return np.divide(offset, length, out=np.zeros_like(offset), where=length > 0)
+
+    def flow_steer(self, index, target):
+        """
+        Return unit directions that follow the flow field toward the next tile on each path.
+
+        Enemies off the field, on unreachable tiles or already in the target tile steer straight at it.
+        """
+        field = self.flow_field
+        if field.generation != self.flow_generation:
+            # Pad with unreachable tiles so neighbour lookups never leave the array
+            dist = np.asarray(field.dist, dtype=np.int64).reshape(field.height, field.width)
+            self.flow_dist = np.pad(dist, 1, constant_values=-1)
+            self.flow_generation = field.generation
+        direction = self.steer(index, target)
+        pos = self.pos[index]
+        tile = np.floor(pos / TILE_SIZE).astype(np.intp)
+        inside = (tile[:, 0] >= 0) & (tile[:, 0] < field.width) & (tile[:, 1] >= 0) & (tile[:, 1] < field.height)
+        x = np.clip(tile[:, 0], 0, field.width - 1) + 1
+        y = np.clip(tile[:, 1], 0, field.height - 1) + 1
+        dist = self.flow_dist
+        own = dist[y, x]
+        options = np.empty((len(index), len(NEIGHBOURS)), dtype=np.int64)
+        for k, (dx, dy) in enumerate(NEIGHBOURS):
+            neighbour = dist[y + dy, x + dx]
+            usable = neighbour >= 0
+            if dx and dy:
+                usable &= (dist[y, x + dx] >= 0) & (dist[y + dy, x] >= 0)
+            options[:, k] = np.where(usable, neighbour, np.iinfo(np.int64).max)
+        best = options.argmin(axis=1)
+        follow = inside & (own > 0) & (options[np.arange(len(index)), best] < own)
+        offsets = np.array(NEIGHBOURS)[best]
+        center = (tile + offsets + 0.5) * TILE_SIZE
+        offset = center - pos
+        length = np.hypot(offset[:, 0], offset[:, 1])[:, None]
+        follow &= length[:, 0] > 0
+        direction[follow] = (offset / np.where(length > 0, length, 1))[follow]
+        return direction
+
+    def push_out(self, index, axis, step):
+        """
+        Push hitboxes that moved into a wall back to the wall edge along one axis.
+
+        Args:
+            index (ndarray): Slots being resolved.
+            axis (int): 0 for horizontal, 1 for vertical.
+            step (ndarray): Signed movement of each slot along the axis this frame.
+        """
+        if not len(self.walls):
+            return
+        pos, half = self.pos[index], self.half_size[index]
+        low, high = pos - half, pos + half
+        rows, walls = self.candidate_pairs(low, high)
+        left, top, right, bottom = self.walls[walls].T
+        overlap = ((low[rows, 0] < right) & (high[rows, 0] > left) &
+                   (low[rows, 1] < bottom) & (high[rows, 1] > top))
+        rows = rows[overlap]
+        if not len(rows):
+            return
+        near_edge, far_edge = (left, right) if axis == 0 else (top, bottom)
+        stop_forward = np.full(len(index), np.inf)
+        stop_backward = np.full(len(index), -np.inf)
+        np.minimum.at(stop_forward, rows, near_edge[overlap])
+        np.maximum.at(stop_backward, rows, far_edge[overlap])
+        hit = np.isfinite(stop_forward)
+        resolved = pos[:, axis]
+        resolved = np.where(hit & (step > 0), stop_forward - half[:, axis], resolved)
+        resolved = np.where(hit & (step < 0), stop_backward + half[:, axis], resolved)
+        self.pos[index, axis] = resolved
+
+    def update(self, target, delta_time):
+        """
+        Steer every active enemy toward the target, move it and resolve wall collisions.
+
+        Args:
+            target (tuple): World position the swarm chases (the player's center).
+            delta_time (float): Seconds since the last update.
+        """
+        if self.walls is None:
+            self.load_walls()
+        index = np.flatnonzero(self.active[:len(self.enemies)])
+        if not len(index):
+            return
+        direction = self.flow_steer(index, target) if self.flow_field else self.steer(index, target)
+        step = direction * (self.speed[index] * delta_time)[:, None]
+        for axis in (0, 1):
+            self.pos[index, axis] += step[:, axis]
+            self.push_out(index, axis, step[:, axis])
+        self.sync(index)
+
+    def sync(self, index):
+        """Write swarm positions back to the enemy sprites."""
+        for i, (x, y) in zip(index.tolist(), self.pos[index].tolist()):
+            enemy = self.enemies[i]
+            enemy.hitbox_rect.center = (x, y)
+            enemy.rect.center = enemy.hitbox_rect.center
@@ -1,8 +1,64 @@
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
 import pygame
 import unittest
 from unittest.mock import patch, MagicMock
 import time
+import asyncio
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+from os.path import join
+from random import Random
+try:
+    import numpy as np
+except ImportError:
+    np = None
 from game import Game
+from world import World, EnemySwarm
+from settings import TILE_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT, FIXED_TIMESTEP, LEVEL_PATH
+from groups import AllSprites, CollisionSprites, sweep_pairs
+from sprites import Sprite, CollisionSprite, Tile, Enemy, Bullet, RotationAtlas
+from pathfinding import FlowField
+from assets import AssetCache, assets
+from hud import HUD
+from controls import InputState, ScriptedInput
+from simulation import Simulation
+from batch import run_batch, summarize
+from profiler import FrameProfiler, profiler as game_profiler
+from benchmark import run_suite, compare
+from history import HistoryStore
+from pool import SpritePool
+from lod import EnemyLOD
+from startup import Preloader, StartupTimer
+from levels import LevelManager, discover_levels
+from pacing import FramePacer
+from replay import InputRecorder, load, replay
+from coop import CoopWorld
+from loadtest import load_test
+from netcode import ENEMY, PLAYER, decode_snapshot, encode_snapshot, entity_state
+from level import Level, compile_level, cache_is_fresh
+
+
+def setUpModule():
+    """
+    Create the Game singleton with a throwaway history store and replay directory, so tests never
+    touch the real leaderboard or leave recordings behind.
+    """
+    global test_directory, replay_dir_patch
+    test_directory = tempfile.mkdtemp()
+    replay_dir_patch = patch("game.REPLAY_DIR", join(test_directory, 'replays'))
+    replay_dir_patch.start()
+    Game("TestPlayer", history=HistoryStore(join(test_directory, 'history.db')))
+
+
+def tearDownModule():
+    Game._instance.history.close()
+    replay_dir_patch.stop()
+    shutil.rmtree(test_directory)
 
 
 class TestGame(unittest.TestCase):
@@ -17,19 +73,27 @@ class TestGame(unittest.TestCase):
         self.assertIs(self.game, game2, "Game class is not following the Singleton pattern.")
 
     def test_save_game_history(self):
-        """Test saving game history to a CSV file."""
-        with patch("builtins.open", new_callable=MagicMock) as mock_open:
+        """Test that saving game history only queues the record for the background writer."""
+        with patch.object(self.game.history, "record") as mock_record, \
+                patch("builtins.open", new_callable=MagicMock) as mock_open:
             self.game.save_game_history("win")
-            mock_open.assert_called_once_with("game_history.csv", mode="a", newline="")
-            # Ensure data is written using csv.writer
-            with patch("csv.writer") as mock_csv_writer:
-                self.game.save_game_history("win")
-                mock_csv_writer().writerow.assert_called_with([self.nickname, unittest.mock.ANY, "win"])
+        mock_record.assert_called_once_with(self.nickname, unittest.mock.ANY, "win")
+        mock_open.assert_not_called()
+
+    def test_history_records_simulated_time(self):
+        """Test that the recorded time is the simulation clock, which is what a replay verifies."""
+        self.game.restart_game()
+        for _ in range(120):
+            self.game.step(FIXED_TIMESTEP)
+        time.sleep(0.05)
+        with patch.object(self.game.history, "record") as mock_record:
+            self.game.save_game_history("lose")
+        mock_record.assert_called_once_with(self.nickname, round(120 * FIXED_TIMESTEP, 2), "lose")
 
     def test_display_message(self):
         """Test that display_message is called with correct arguments."""
         with patch.object(self.game, "display_message") as mock_display_message:
-            self.game.start_time = time.time() - 120  # Simulate 2 minutes of gameplay
+            self.game.sim_time = 120.0  # Simulate 2 minutes of gameplay
             self.game.game_won()
             mock_display_message.assert_called_once_with(
                 "You Win!", unittest.mock.ANY, "Press R to Restart or Q to Quit"
@@ -38,7 +102,7 @@ class TestGame(unittest.TestCase):
     def test_game_won_message(self):
         """Test that the game_won method displays the correct message."""
         with patch.object(self.game, "display_message") as mock_display_message:
-            self.game.start_time = time.time() - 120  # Simulate 2 minutes of gameplay
+            self.game.sim_time = 120.0  # Simulate 2 minutes of gameplay
             self.game.game_won()
             mock_display_message.assert_called_once_with(
                 "You Win!", unittest.mock.ANY, "Press R to Restart or Q to Quit"
@@ -47,12 +111,24 @@ class TestGame(unittest.TestCase):
     def test_game_over_message(self):
         """Test that the game_over method displays the correct message."""
         with patch.object(self.game, "display_message") as mock_display_message:
-            self.game.start_time = time.time() - 90  # Simulate 1.5 minutes of gameplay
+            self.game.sim_time = 90.0  # Simulate 1.5 minutes of gameplay
             self.game.game_over()
             mock_display_message.assert_called_once_with(
                 "Game Over!", unittest.mock.ANY, "Press R to Restart or Q to Quit"
             )
 
+    def test_save_replay_paths(self):
+        """Test that replays stay inside the replay directory and never overwrite each other."""
+        self.game.nickname = "../../evil/name"
+        try:
+            paths = [self.game.save_replay() for _ in range(2)]
+        finally:
+            self.game.nickname = self.nickname
+        self.assertNotEqual(paths[0], paths[1])
+        for path in paths:
+            self.assertEqual(os.path.dirname(path), join(test_directory, 'replays'))
+            self.assertTrue(os.path.basename(path).startswith('evil_name-'))
+
     @patch.object(Game, "setup", return_value=None)
     def test_restart_game(self, mock_setup):
         """Test that the restart_game method resets the game state."""
@@ -69,13 +145,902 @@ class TestGame(unittest.TestCase):
         self.assertEqual(len(self.game.enemy_sprites), 0, "Enemy sprites were not cleared.")
         self.assertEqual(len(self.game.all_sprites), 0, "All sprites were not cleared.")
 
+    def test_restart_reuses_parsed_level(self):
+        """Test that restarting respawns entities from the level snapshot in milliseconds."""
+        level = self.game.level
+        with patch("pytmx.util_pygame.load_pygame") as mock_load:
+            start = time.perf_counter()
+            self.game.restart_game()
+            elapsed = time.perf_counter() - start
+        mock_load.assert_not_called()
+        self.assertIs(self.game.level, level)
+        self.assertEqual(len(self.game.enemy_sprites), sum(spawn.name == 'enemy' for spawn in level.spawns))
+        self.assertLess(elapsed, 0.05)
+
     def test_arrow_timer(self):
         """Test that the arrow timer correctly handles cooldown."""
-        with patch("pygame.time.get_ticks", return_value=1000):
-            self.game.shoot_time = 200  # Simulate a shoot time of 200ms
-            self.game.arrow_cooldown = 800
-            self.game.arrow_timer()
-            self.assertTrue(self.game.can_shoot, "Arrow cooldown was not handled correctly.")
+        self.game.can_shoot = False
+        self.game.sim_time = 1.0  # Simulation clock at 1000ms
+        self.game.shoot_time = 200  # Simulate a shoot time of 200ms
+        self.game.arrow_cooldown = 800
+        self.game.arrow_timer()
+        self.assertTrue(self.game.can_shoot, "Arrow cooldown was not handled correctly.")
+
+
+class TestAllSprites(unittest.TestCase):
+    def setUp(self):
+        Game("TestPlayer")
+        self.tiles = []
+        for i in range(40):
+            surf = pygame.Surface((TILE_SIZE, TILE_SIZE))
+            surf.fill((i * 6, 255 - i * 6, 100))
+            self.tiles.append(Sprite((i * 37, i * 23), surf, ()))
+
+    def render(self, chunked, target_pos):
+        group = AllSprites(chunked=chunked)
+        group.set_static(self.tiles)
+        group.display_surface.fill('black')
+        blits = group.draw(target_pos)
+        return pygame.image.tobytes(group.display_surface, 'RGB'), blits
+
+    def test_chunked_draw_matches_legacy(self):
+        """Test that chunk-baked rendering produces the same frame as per-sprite blits."""
+        for target_pos in [(640, 360), (900, 700), (1500, 1100)]:
+            legacy, legacy_blits = self.render(False, target_pos)
+            chunked, chunked_blits = self.render(True, target_pos)
+            self.assertEqual(legacy, chunked)
+            self.assertLess(chunked_blits, legacy_blits)
+
+
+class TestCollisionSprites(unittest.TestCase):
+    @staticmethod
+    def resolve(hitbox, direction, sprites):
+        """Player.collision's horizontal/vertical push-out against an iterable of sprites."""
+        for axis in ('horizontal', 'vertical'):
+            for sprite in sprites(hitbox):
+                if sprite.rect.colliderect(hitbox):
+                    if axis == 'horizontal':
+                        if direction.x > 0:
+                            hitbox.right = sprite.rect.left
+                        if direction.x < 0:
+                            hitbox.left = sprite.rect.right
+                    else:
+                        if direction.y < 0:
+                            hitbox.top = sprite.rect.bottom
+                        if direction.y > 0:
+                            hitbox.bottom = sprite.rect.top
+        return hitbox
+
+    def test_grid_resolution_matches_linear_scan(self):
+        """Test that grid lookups resolve collisions exactly like scanning every collider."""
+        rng = Random(1)
+        group = CollisionSprites()
+        for _ in range(150):
+            size = (rng.randint(5, 300), rng.randint(5, 300))
+            CollisionSprite((rng.uniform(0, 1600), rng.uniform(0, 1600)), pygame.Surface(size), group)
+        group.build_index()
+        for _ in range(500):
+            hitbox = pygame.FRect(rng.uniform(0, 1600), rng.uniform(0, 1600), 54, 57)
+            direction = pygame.Vector2(rng.uniform(-1, 1), rng.uniform(-1, 1))
+            expected = self.resolve(hitbox.copy(), direction, lambda rect: group)
+            actual = self.resolve(hitbox.copy(), direction, group.nearby)
+            self.assertEqual(tuple(expected), tuple(actual))
+
+    def test_compact_colliders(self):
+        """Test that rect colliders carry no surface and mix with sprite colliders in insertion order."""
+        group = CollisionSprites()
+        first = group.add_rect(0, 0, 10, 10)
+        sprite = CollisionSprite((5, 5), pygame.Surface((10, 10)), group)
+        last = group.add_rect(8, 8, 4, 4)
+        self.assertFalse(hasattr(first, '__dict__') or hasattr(first, 'image'))
+        self.assertEqual(list(group.nearby(pygame.Rect(6, 6, 2, 2))), [first, sprite, last])
+        sprite.kill()
+        self.assertEqual(group.sprites(), [first, last])
+        self.assertEqual(list(group.nearby(pygame.Rect(6, 6, 4, 4))), [first, last])
+        self.assertFalse(hasattr(Tile((0, 0), pygame.Surface((4, 4))), '__dict__'))
+
+    def test_index_updates_in_place(self):
+        """Test that adding and removing colliders updates the built grid to what a full rebuild gives."""
+        rng = Random(4)
+        group = CollisionSprites()
+        colliders = [group.add_rect(rng.uniform(0, 1600), rng.uniform(0, 1600), 90, 40) for _ in range(60)]
+        group.build_index()
+        cells = group.cells
+        group.remove(*colliders[::3])
+        colliders.extend(group.add_rect(rng.uniform(0, 1600), rng.uniform(0, 1600), 300, 20) for _ in range(20))
+        self.assertIs(group.cells, cells)
+        rebuilt = CollisionSprites()
+        rebuilt.colliders = dict(group.colliders)
+        rebuilt.build_index()
+        self.assertEqual({key: sorted(cell, key=lambda pair: pair[0]) for key, cell in group.cells.items()},
+                         rebuilt.cells)
+
+    def test_sweep_pairs_matches_brute_force(self):
+        """Test that the sort-and-sweep broad phase finds exactly the overlapping rect pairs."""
+        rng = Random(3)
+        bullets = [Sprite((rng.uniform(0, 800), rng.uniform(0, 800)), pygame.Surface((32, 15)), ()) for _ in range(40)]
+        enemies = [Sprite((rng.uniform(0, 800), rng.uniform(0, 800)), pygame.Surface((81, 49)), ()) for _ in range(60)]
+        expected = [(bullet, [enemy for enemy in enemies if bullet.rect.colliderect(enemy.rect)]) for bullet in bullets]
+        self.assertEqual(sweep_pairs(bullets, enemies), [pair for pair in expected if pair[1]])
+
+
+@unittest.skipIf(EnemySwarm is None, "NumPy is not installed")
+class TestEnemySwarm(unittest.TestCase):
+    def setUp(self):
+        Game("TestPlayer")
+        self.walls = CollisionSprites()
+        CollisionSprite((300, 0), pygame.Surface((40, 400)), self.walls)
+        self.walls.build_index()
+        self.target = Sprite((600, 180), pygame.Surface((40, 40)), ())
+        self.swarm = EnemySwarm(self.walls)
+
+    def test_swarm_stops_at_walls(self):
+        """Test that swarm enemies chase the target but are pushed out of walls."""
+        enemies = [Enemy((100, 50 + i * 60), (), self.target, self.walls, self.swarm) for i in range(5)]
+        for _ in range(120):
+            self.swarm.update(self.target.rect.center, 1 / 60)
+        for enemy in enemies:
+            self.assertEqual(enemy.hitbox_rect.right, 300)
+            self.assertFalse(any(wall.rect.colliderect(enemy.hitbox_rect) for wall in self.walls))
+
+    def test_killed_enemy_leaves_swarm(self):
+        """Test that killing an enemy stops the swarm from moving it."""
+        enemy = Enemy((100, 100), (), self.target, self.walls, self.swarm)
+        enemy.kill()
+        self.swarm.update(self.target.rect.center, 1 / 60)
+        self.assertEqual(enemy.rect.center, (100, 100))
+
+
+class TestEnemyLOD(unittest.TestCase):
+    def setUp(self):
+        Game("TestPlayer")
+        self.walls = CollisionSprites()
+        self.target = Sprite((-20, 280), pygame.Surface((40, 40)), ())
+        self.lod = EnemyLOD(near=100, far=500, mid_interval=4, reassess_interval=1)
+        self.enemies = [Enemy((x, 300), (), self.target, self.walls, lod=self.lod) for x in (80, 300, 1000)]
+        self.lod.reassess_all(self.target.rect.center)
+
+    def step(self, ticks):
+        for _ in range(ticks):
+            self.lod.update(self.target.rect.center, FIXED_TIMESTEP)
+
+    def test_tiers_by_distance(self):
+        """Test that near enemies move every tick, mid ones less often and far ones sleep."""
+        self.assertEqual(self.lod.counts(), {'near': 1, 'mid': 1, 'far': 1})
+        self.assertEqual(self.lod.active, 2)
+        start = [enemy.rect.centerx for enemy in self.enemies]
+        self.step(3)
+        near, mid, far = (before - enemy.rect.centerx for before, enemy in zip(start, self.enemies))
+        self.assertAlmostEqual(near, 3 * FIXED_TIMESTEP * self.enemies[0].speed, places=3)
+        self.assertGreater(mid, 0)
+        self.assertLess(mid, near)
+        self.assertEqual(far, 0)
+
+    def test_mid_enemy_catches_up(self):
+        """Test that a mid enemy promoted to near has covered the same ground as a near one."""
+        start = [enemy.rect.centerx for enemy in self.enemies[:2]]
+        self.step(7)
+        self.lod.near_sq = 400 ** 2
+        self.step(1)
+        near, mid = (before - enemy.rect.centerx for before, enemy in zip(start, self.enemies))
+        self.assertEqual(self.lod.counts()['near'], 2)
+        self.assertAlmostEqual(mid, near, places=3)
+
+    def test_killed_enemy_leaves_lod(self):
+        """Test that killing an enemy removes it from its tier."""
+        self.enemies[1].kill()
+        self.assertEqual(self.lod.counts(), {'near': 1, 'mid': 0, 'far': 1})
+        self.step(4)
+
+
+class TestFlowField(unittest.TestCase):
+    def setUp(self):
+        Game("TestPlayer")
+        # A wall splits a 10x10 tile room except for a gap along the bottom row
+        self.walls = CollisionSprites()
+        CollisionSprite((5 * TILE_SIZE, 0), pygame.Surface((TILE_SIZE, 9 * TILE_SIZE)), self.walls)
+        self.field = FlowField(self.walls, 10, 10)
+        self.target = (8.5 * TILE_SIZE, 1.5 * TILE_SIZE)
+
+    def test_rebuilds_only_when_target_changes_tile(self):
+        """Test that the field is recomputed only when the target enters a new tile."""
+        self.assertTrue(self.field.update(self.target))
+        self.assertFalse(self.field.update((self.target[0] + 5, self.target[1] - 5)))
+        self.assertTrue(self.field.update((self.target[0], self.target[1] + TILE_SIZE)))
+
+    def test_direction_routes_around_walls(self):
+        """Test that enemies behind a wall are sent around it instead of straight at the target."""
+        self.field.update(self.target)
+        direction = self.field.direction((2.5 * TILE_SIZE, 1.5 * TILE_SIZE))
+        self.assertGreater(direction.y, 0)
+        self.assertIsNone(self.field.direction(self.target))
+
+    def test_search_is_bounded_by_radius(self):
+        """Test that tiles further than radius steps stay off the field and a rebuild clears the old one."""
+        field = FlowField(self.walls, 10, 10, radius=3)
+        field.update(self.target)
+        self.assertTrue(field.reachable(8, 4))
+        self.assertFalse(field.reachable(8, 5))
+        field.update((1.5 * TILE_SIZE, 1.5 * TILE_SIZE))
+        self.assertFalse(field.reachable(8, 1))
+        self.assertEqual(max(field.dist), 3)
+
+    @unittest.skipIf(EnemySwarm is None, "NumPy is not installed")
+    def test_swarm_samples_same_directions(self):
+        """Test that the vectorized swarm lookup agrees with FlowField.direction."""
+        self.field.update(self.target)
+        swarm = EnemySwarm(self.walls, flow_field=self.field)
+        rng = Random(2)
+        target = Sprite(self.target, pygame.Surface((1, 1)), ())
+        enemies = [Enemy((rng.uniform(0, 320), rng.uniform(0, 320)), (), target, self.walls, swarm) for _ in range(50)]
+        directions = swarm.flow_steer(np.arange(len(enemies)), self.target)
+        for enemy, direction in zip(enemies, directions):
+            expected = self.field.direction(swarm.pos[enemy.swarm_index])
+            if expected:
+                self.assertAlmostEqual(expected.x, direction[0])
+                self.assertAlmostEqual(expected.y, direction[1])
+
+
+class TestAssetCache(unittest.TestCase):
+    def setUp(self):
+        Game("TestPlayer")
+        self.cache = AssetCache()
+        self.path = join('images', 'slime.png')
+
+    def test_image_is_loaded_once_and_shared(self):
+        """Test that repeated lookups return the same surface without touching the disk."""
+        with patch("pygame.image.load", wraps=pygame.image.load) as mock_load:
+            first = self.cache.image(self.path)
+            second = self.cache.image(self.path)
+        self.assertIs(first, second)
+        mock_load.assert_called_once()
+        self.assertEqual(self.cache.stats(), {'images': 1, 'hits': 1, 'misses': 1})
+
+    def test_evict(self):
+        """Test that evicted images are decoded again on the next lookup."""
+        self.cache.preload([self.path], mode='opaque')
+        self.cache.evict(self.path)
+        self.cache.image(self.path, mode='opaque')
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_enemies_share_cached_surface(self):
+        """Test that spawning enemies reuses the process-wide cached slime image."""
+        game = Game("TestPlayer")
+        enemies = [Enemy((0, 0), (), game.player, game.collision_sprites) for _ in range(3)]
+        self.assertTrue(all(enemy.image is assets.image(self.path) for enemy in enemies))
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestLevelCache(unittest.TestCase):
+    def setUp(self):
+        Game("TestPlayer")
+        self.directory = tempfile.mkdtemp()
+        self.path = join(self.directory, 'map1.tmx')
+        shutil.copy(LEVEL_PATH, self.path)
+        os.symlink(os.path.abspath(join(os.path.dirname(LEVEL_PATH), 'Hexed Forest 1.4')),
+                   join(self.directory, 'Hexed Forest 1.4'))
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_cache_matches_tmx(self):
+        """Test that a compiled level holds the same tiles, colliders and spawns as the TMX."""
+        tmx = Level.from_tmx(self.path)
+        compile_level(self.path)
+        cached = Level.from_cache(self.path)
+        self.assertEqual((tmx.width, tmx.height, tmx.spawns), (cached.width, cached.height, cached.spawns))
+        self.assertEqual(tmx.collisions, cached.collisions)
+        self.assertEqual([pos for pos, _ in tmx.tiles], [pos for pos, _ in cached.tiles])
+        for (_, expected), (_, actual) in zip(tmx.tiles[::97], cached.tiles[::97]):
+            self.assertEqual(pygame.image.tobytes(expected, 'RGBA'), pygame.image.tobytes(actual, 'RGBA'))
+
+    def test_stale_cache_is_rebuilt(self):
+        """Test that editing the TMX invalidates the cache and Level.load recompiles it."""
+        compile_level(self.path)
+        self.assertTrue(cache_is_fresh(self.path))
+        with open(self.path, 'a') as file:
+            file.write('\n')
+        self.assertFalse(cache_is_fresh(self.path))
+        Level.load(self.path)
+        self.assertTrue(cache_is_fresh(self.path))
+
+
+class TestLevelManager(unittest.TestCase):
+    def setUp(self):
+        self.game = Game("TestPlayer")
+        self.root = tempfile.mkdtemp()
+        self.paths = []
+        for name in ('level1', 'level2', 'level3'):
+            os.makedirs(join(self.root, name))
+            shutil.copy(LEVEL_PATH, join(self.root, name, 'map.tmx'))
+            os.symlink(os.path.abspath(join(os.path.dirname(LEVEL_PATH), 'Hexed Forest 1.4')),
+                       join(self.root, name, 'Hexed Forest 1.4'))
+            self.paths.append(join(self.root, name, 'map.tmx'))
+        self.manager = LevelManager(discover_levels(self.root), start=self.paths[0])
+
+    def tearDown(self):
+        self.manager.close()
+        shutil.rmtree(self.root)
+
+    def test_discovers_levels_in_order(self):
+        """Test that every map directory becomes a level, in name order."""
+        self.assertEqual(self.manager.paths, self.paths)
+        self.assertEqual((self.manager.current, self.manager.next), (self.paths[0], self.paths[1]))
+
+    def test_prefetched_level_is_a_hit(self):
+        """Test that a level prefetched in the background is taken from the cache on transition."""
+        self.manager.prefetch_next()
+        self.manager.pending[self.paths[1]].result()
+        self.manager.collect()
+        path, prepared = self.manager.advance()
+        self.assertEqual((path, prepared[0].path), (self.paths[1], self.paths[1]))
+        self.assertEqual(self.manager.stats()['hit_rate'], 1)
+
+    def test_failed_prefetch_builds_on_demand(self):
+        """Test that a prefetch that raised is logged and the level is built synchronously instead."""
+        def broken():
+            raise ValueError("corrupt level cache")
+        self.manager.pending[self.paths[1]] = self.manager.executor.submit(broken)
+        with self.assertLogs('levels', 'ERROR'):
+            path, prepared = self.manager.advance()
+        self.assertEqual(prepared[0].path, self.paths[1])
+        self.assertEqual((self.manager.failed, self.manager.misses), (1, 1))
+
+    def test_startup_build_is_not_a_miss(self):
+        """Test that building the first level is kept out of the hit rate."""
+        self.manager.get(self.paths[0], startup=True)
+        self.manager.prefetch_next()
+        self.manager.pending[self.paths[1]].result()
+        self.manager.advance()
+        stats = self.manager.stats()
+        self.assertEqual((stats['startup_builds'], stats['misses'], stats['hit_rate']), (1, 0, 1))
+
+    def test_cache_stays_within_budget(self):
+        """Test that old levels are evicted beyond the byte budget but the current one is kept."""
+        self.manager.budget = 1
+        for path in self.paths:
+            self.manager.get(path)
+        self.assertEqual(list(self.manager.cache), [self.paths[0], self.paths[2]])
+        self.assertEqual(self.manager.stats()['misses'], 3)
+
+    def test_boss_kill_moves_to_next_level(self):
+        """Test that the game continues on the next level, built in the background, after the boss dies."""
+        levels = self.game.levels
+        self.game.levels = self.manager
+        try:
+            self.game.change_level(self.paths[0], self.manager.get(self.paths[0]))
+            self.manager.prefetch_next()
+            self.game.boss.health = 0
+            self.assertEqual(self.game.result, 'win')
+            self.game.next_level()
+            self.assertEqual(self.game.level_path, self.paths[1])
+            self.assertIsNone(self.game.result)
+            self.assertEqual(self.manager.misses, 1)
+            self.assertEqual(len(self.manager.transitions), 1)
+        finally:
+            self.game.levels = levels
+            self.game.change_level(LEVEL_PATH, levels.get(LEVEL_PATH))
+
+    def test_every_level_saves_its_replay(self):
+        """Test that a two-level campaign leaves one replay per level, each naming its own level."""
+        levels = self.game.levels
+        self.game.levels = self.manager
+        replay_dir = join(test_directory, 'replays')
+        before = set(os.listdir(replay_dir)) if os.path.isdir(replay_dir) else set()
+        try:
+            self.game.change_level(self.paths[0], self.manager.get(self.paths[0]))
+            self.game.recorder.level_path = self.paths[0]
+            for _ in range(2):
+                self.game.step(FIXED_TIMESTEP)
+                self.game.boss.health = 0
+                if self.manager.next == self.paths[1]:
+                    self.game.next_level()
+            self.game.game_won()
+        finally:
+            self.game.levels = levels
+            self.game.change_level(LEVEL_PATH, levels.get(LEVEL_PATH))
+        saved = sorted(set(os.listdir(replay_dir)) - before)
+        self.assertEqual(len(saved), 2)
+        self.assertEqual(sorted(load(join(replay_dir, name)).level_path for name in saved), self.paths[:2])
+
+    def test_restart_after_losing_restarts_the_campaign(self):
+        """Test that R after losing on level 2 goes back to level 1, so a later win counts every level."""
+        levels = self.game.levels
+        self.game.levels = self.manager
+        restart = pygame.event.Event(pygame.KEYDOWN, key=pygame.K_r)
+        try:
+            self.game.change_level(self.paths[0], self.manager.get(self.paths[0]))
+            self.game.boss.health = 0
+            self.game.next_level()
+            self.game.step(FIXED_TIMESTEP)
+            self.game.game_over_state = True
+            with patch("pygame.event.wait", return_value=restart):
+                self.game.wait_for_restart()
+            self.assertEqual(self.game.level_path, self.paths[0])
+            self.assertEqual(self.game.time_passed, 0)
+            for level in range(len(self.paths)):
+                for _ in range(60):
+                    self.game.step(FIXED_TIMESTEP)
+                self.game.boss.health = 0
+                if self.manager.next:
+                    self.game.next_level()
+            self.assertEqual(self.game.result, 'win')
+            with patch.object(self.game.history, "record") as mock_record:
+                self.game.save_game_history("win")
+            mock_record.assert_called_once_with("TestPlayer", round(180 * FIXED_TIMESTEP, 2), "win")
+        finally:
+            self.game.levels = levels
+            self.game.change_level(LEVEL_PATH, levels.get(LEVEL_PATH))
+
+
+class TestRotationAtlas(unittest.TestCase):
+    def setUp(self):
+        self.game = Game("TestPlayer")
+
+    def test_arrow_reuses_frames(self):
+        """Test that the arrow looks up shared pre-rotated frames instead of rotating every frame."""
+        arrow = self.game.arrow
+        arrow.player.input_state = InputState((0, 0), False, False, (WINDOW_WIDTH / 2, 0))
+        with patch("pygame.transform.rotozoom") as mock_rotozoom:
+            arrow.update(0)
+            image = arrow.image
+            arrow.update(0)
+        mock_rotozoom.assert_not_called()
+        self.assertIs(arrow.image, image)
+        self.assertIn(image, arrow.atlas.frames)
+
+    def test_bullet_faces_direction(self):
+        """Test that a bullet given an atlas picks the frame for its direction."""
+        atlas = RotationAtlas.for_surface(self.game.bullet_surf, 8)
+        self.assertIs(atlas, RotationAtlas.for_surface(self.game.bullet_surf, 8))
+        bullet = Bullet(self.game.bullet_surf, (0, 0), pygame.Vector2(0, -1), (), atlas=atlas)
+        self.assertIs(bullet.image, atlas.frames[2])
+
+
+class TestHUD(unittest.TestCase):
+    def setUp(self):
+        self.game = Game("TestPlayer")
+        self.hud = HUD()
+
+    def draw_bar(self, value):
+        self.hud.bar(self.game.display_surface, 'stamina', (10, 10, 150, 30), value, 50,
+                     (175, 95, 0), (255, 151, 0), "STAMINA", ('impact', 25), (255, 0, 0))
+
+    def test_fonts_are_looked_up_once(self):
+        """Test that the font registry calls SysFont once per (name, size)."""
+        with patch("pygame.font.SysFont", wraps=pygame.font.SysFont) as mock_sysfont:
+            for _ in range(3):
+                self.hud.text("Time: 1.0s", 'Impact', 30, (255, 255, 255))
+                self.hud.text("Time: 1.01s", 'impact', 30, (255, 255, 255))
+        mock_sysfont.assert_called_once()
+        self.assertEqual(self.hud.renders, 2)
+
+    def test_bar_redraws_only_on_change(self):
+        """Test that a bar is re-rendered only when its filled width changes."""
+        self.draw_bar(25)
+        image = self.hud.bars['stamina'][1]
+        self.draw_bar(25.001)
+        self.assertIs(self.hud.bars['stamina'][1], image)
+        self.draw_bar(30)
+        self.assertIsNot(self.hud.bars['stamina'][1], image)
+
+
+class TestSimulation(unittest.TestCase):
+    @staticmethod
+    def policy(world):
+        """Walk right while firing at the nearest enemy."""
+        enemies = world.enemy_sprites.sprites()
+        aim = (1, 0)
+        if enemies:
+            target = min(enemies, key=lambda enemy: pygame.Vector2(enemy.rect.center).distance_to(world.player.rect.center))
+            aim = pygame.Vector2(target.rect.center) - world.player.rect.center
+        return InputState((1, 0), False, True, tuple(aim))
+
+    def test_runs_without_display_calls(self):
+        """Test that a headless simulation never touches the window, keyboard or mouse."""
+        with patch("pygame.display.set_mode") as mock_set_mode, \
+                patch("pygame.key.get_pressed") as mock_keys, patch("pygame.mouse.get_pos") as mock_mouse:
+            simulation = Simulation(ScriptedInput(self.policy))
+            report = simulation.run(600)
+        mock_set_mode.assert_not_called()
+        mock_keys.assert_not_called()
+        mock_mouse.assert_not_called()
+        self.assertEqual(report['steps'], simulation.steps)
+        self.assertAlmostEqual(report['sim_time'], simulation.steps * FIXED_TIMESTEP, places=3)
+
+    def test_runs_are_deterministic(self):
+        """Test that the same inputs produce the same world state."""
+        def run():
+            simulation = Simulation(ScriptedInput(self.policy))
+            simulation.run(600)
+            return (tuple(simulation.player.rect), simulation.result, len(simulation.enemy_sprites),
+                    sorted(tuple(enemy.rect) for enemy in simulation.enemy_sprites))
+        self.assertEqual(run(), run())
+
+
+class TestBatch(unittest.TestCase):
+    def test_enemy_count_override(self):
+        """Test that enemy_count spawns exactly that many enemies, reusing level spawns when needed."""
+        self.assertEqual(len(Simulation(enemy_count=3).enemy_sprites), 3)
+        self.assertEqual(len(Simulation(enemy_count=25).enemy_sprites), 25)
+
+    def test_batch_is_reproducible(self):
+        """Test that a seeded batch gives the same outcomes in process and across a pool."""
+        def outcomes(workers):
+            results = run_batch(2, 'random', enemies=10, max_time=2, seed=5, workers=workers)
+            return [(result['seed'], result['result'], result['steps']) for result in results]
+        self.assertEqual(outcomes(1), outcomes(2))
+        summary = summarize(run_batch(2, 'idle', max_time=0.5, workers=1))
+        self.assertEqual(summary['runs'], 2)
+        self.assertEqual(summary['timeouts'], 2)
+        self.assertIsNone(summarize([])['step_ms_p95_max'])
+
+
+class TestFrameProfiler(unittest.TestCase):
+    def test_scopes_and_percentiles(self):
+        """Test that repeated scopes in a frame are summed and percentiles cover the window."""
+        profiler = FrameProfiler(window=100)
+        for i in range(150):
+            profiler.begin_frame()
+            for _ in range(2):
+                with profiler.scope('update'):
+                    pass
+            profiler.end_frame(blits=i)
+        self.assertEqual(len(profiler.frames), 100)
+        report = profiler.report()
+        self.assertEqual(report['counts'], {'blits': 149})
+        self.assertIn('update', report['stages'])
+        self.assertLessEqual(report['frame']['p50'], report['frame']['p99'])
+
+    def test_export(self):
+        """Test the JSON and CSV traces."""
+        profiler = FrameProfiler()
+        profiler.begin_frame()
+        with profiler.scope('draw'):
+            pass
+        profiler.end_frame(sprites=3)
+        with tempfile.TemporaryDirectory() as directory:
+            profiler.export(join(directory, 'trace.json'))
+            profiler.export(join(directory, 'trace.csv'))
+            with open(join(directory, 'trace.json')) as file:
+                self.assertEqual(json.load(file)['frames'][0]['counts'], {'sprites': 3})
+            with open(join(directory, 'trace.csv')) as file:
+                self.assertEqual(file.readline().strip(), 'frame_ms,draw,sprites')
+
+    def test_game_frame_counts_collisions(self):
+        """Test that a game frame records broad- and narrow-phase counts summed over its fixed steps."""
+        game = Game("TestPlayer")
+        Enemy(game.player.rect.center, (game.enemy_sprites,), game.player, game.collision_sprites)
+        game.running = True
+        try:
+            # One frame of four fixed steps; the enemy overlaps the player but its mask never hits
+            with patch.object(game.pacer, 'tick', return_value=4 * FIXED_TIMESTEP), \
+                    patch('pygame.event.get', return_value=[pygame.event.Event(pygame.QUIT)]), \
+                    patch('pygame.sprite.collide_mask', return_value=None), \
+                    patch.object(game.history, 'close'), patch.object(game.levels, 'close'), patch('pygame.quit'):
+                game.run()
+            counts = game_profiler.frames[-1]['counts']
+            self.assertEqual(counts['steps'], 4)
+            self.assertGreaterEqual(counts['broad_phase_pairs'], 4)
+            self.assertGreaterEqual(counts['narrow_phase_tests'], 4)
+        finally:
+            game.restart_game()
+
+
+class TestBenchmark(unittest.TestCase):
+    def test_quick_suite_records(self):
+        """Test that a quick run yields one machine-readable record per scenario."""
+        results = run_suite(['restart', 'arrow_collision'], quick=True)
+        self.assertEqual([(record['scenario'], record['value']) for record in results],
+                         [('restart', 7), ('arrow_collision', 10)])
+        self.assertTrue(all(record['ms'] >= 0 for record in results))
+
+    def test_compare_flags_regressions(self):
+        """Test that only measurements slower than the tolerance are flagged."""
+        baseline = [{'scenario': 'draw', 'param': 'map_size', 'value': 50, 'ms': 1.0},
+                    {'scenario': 'setup', 'param': 'enemies', 'value': 7, 'ms': 10.0}]
+        results = [{'scenario': 'draw', 'param': 'map_size', 'value': 50, 'ms': 1.5},
+                   {'scenario': 'setup', 'param': 'enemies', 'value': 7, 'ms': 11.0},
+                   {'scenario': 'restart', 'param': 'enemies', 'value': 7, 'ms': 1.0}]
+        rows = compare(results, baseline, tolerance=0.2)
+        self.assertEqual([(row[0], row[-1]) for row in rows], [('draw', True), ('setup', False)])
+
+
+class TestHistoryStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = HistoryStore(join(self.directory, 'history.db'), batch_size=4, flush_interval=0.05)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.directory)
+
+    def test_leaderboards(self):
+        """Test that batched background writes feed the leaderboard queries."""
+        for nickname, time_passed, result in [('ana', 50, 'win'), ('ana', 40, 'win'), ('bob', 45, 'win'),
+                                              ('bob', 10, 'lose'), ('cid', 30, 'lose')]:
+            self.store.record(nickname, time_passed, result)
+        self.store.flush()
+        self.assertEqual(self.store.best_times(), [('ana', 40.0), ('bob', 45.0)])
+        self.assertEqual(self.store.top_wins(1), [('ana', 2)])
+        self.assertEqual(self.store.fastest_wins(2), [('ana', 40.0), ('bob', 45.0)])
+        self.assertEqual(self.store.player_stats('cid'), {'games': 1, 'wins': 0, 'best': None})
+        self.assertLess(self.store.commits, 5)
+
+    def test_failed_write_does_not_stop_the_writer(self):
+        """Test that a failing commit is logged, flush() still returns and later rows are written."""
+        with sqlite3.connect(self.store.path) as connection:
+            connection.execute('ALTER TABLE games RENAME TO moved')
+        with self.assertLogs('history', 'ERROR'):
+            self.store.record('ana', 10, 'win')
+            flush = threading.Thread(target=self.store.flush, daemon=True)
+            flush.start()
+            flush.join(5)
+        self.assertFalse(flush.is_alive())
+        self.assertEqual(self.store.failed, 1)
+        with sqlite3.connect(self.store.path) as connection:
+            connection.execute('ALTER TABLE moved RENAME TO games')
+        self.store.record('bob', 20, 'win')
+        self.store.flush()
+        self.assertEqual(self.store.best_times(), [('bob', 20.0)])
+
+    def test_import_csv_and_close(self):
+        """Test importing an old CSV with a header and that close() commits everything queued."""
+        path = join(self.directory, 'game_history.csv')
+        with open(path, 'w', newline='') as file:
+            file.write('Nickname,Time Passed (s),Result\nana,12.5,win\nbob,8,lose\n')
+        self.assertEqual(self.store.import_csv(path), 2)
+        self.store.close()
+        reopened = HistoryStore(join(self.directory, 'history.db'))
+        self.assertEqual(reopened.best_times(), [('ana', 12.5)])
+        reopened.close()
+
+
+class TestSpritePool(unittest.TestCase):
+    def setUp(self):
+        self.surf = pygame.Surface((8, 8))
+        self.pool = SpritePool(Bullet)
+        self.group = pygame.sprite.Group()
+
+    def test_recycles_with_group_membership(self):
+        """Test that a killed bullet is reused, reset and put back in its groups."""
+        bullet = self.pool.acquire(self.surf, (0, 0), pygame.Vector2(1, 0), (self.group,))
+        bullet.update(2.0)  # outlives its lifetime
+        self.assertEqual(len(self.group), 0)
+        again = self.pool.acquire(self.surf, (50, 60), pygame.Vector2(0, 1), (self.group,))
+        self.assertIs(again, bullet)
+        self.assertEqual((again.age, again.rect.center), (0, (50, 60)))
+        self.assertIn(again, self.group)
+        self.assertEqual(self.pool.stats(), {'in_use': 1, 'free': 0, 'high_water': 1, 'created': 1, 'reused': 1})
+
+    def test_double_kill_releases_once(self):
+        """Test that killing a pooled sprite twice does not hand it out twice."""
+        bullet = self.pool.acquire(self.surf, (0, 0), pygame.Vector2(1, 0), (self.group,))
+        bullet.kill()
+        bullet.kill()
+        first = self.pool.acquire(self.surf, (0, 0), pygame.Vector2(1, 0), (self.group,))
+        second = self.pool.acquire(self.surf, (0, 0), pygame.Vector2(1, 0), (self.group,))
+        self.assertIsNot(first, second)
+
+    def test_world_preallocates_from_spawns(self):
+        """Test that enemies are preallocated from the spawn table and recycled on restart."""
+        simulation = Simulation()
+        enemies = sum(spawn.name == 'enemy' for spawn in simulation.level.spawns)
+        simulation.restart_game()
+        stats = simulation.pool_stats()['enemies']
+        self.assertEqual((stats['created'], stats['in_use'], stats['high_water']), (enemies, enemies, enemies))
+        self.assertEqual(simulation.pool_stats()['bullets']['created'], 4)
+
+
+class TestDirtyRects(unittest.TestCase):
+    def test_static_camera_reports_sprite_areas(self):
+        """Test that only moving sprites are dirty while the camera stays still."""
+        pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
+        group = AllSprites()
+        sprite = Sprite((100, 100), pygame.Surface((10, 10)), group)
+        group.draw((0, 0))
+        self.assertIsNone(group.dirty_rects)  # first frame is always full
+        sprite.rect.x += 5
+        group.draw((0, 0))
+        offset = (WINDOW_WIDTH / 2, WINDOW_HEIGHT / 2)
+        self.assertEqual(group.dirty_rects, [pygame.Rect(100 + offset[0], 100 + offset[1], 10, 10),
+                                             pygame.Rect(105 + offset[0], 100 + offset[1], 10, 10)])
+        group.draw((1, 0))
+        self.assertIsNone(group.dirty_rects)
+        group.draw((1, 0))
+        group.invalidate()
+        group.draw((1, 0))
+        self.assertIsNone(group.dirty_rects)
+
+    def test_menu_is_event_driven(self):
+        """Test that the menu waits for events and only updates the nickname box while typing."""
+        import main_menu
+        main_menu.nickname = ''
+        pygame.event.clear()
+        for key, char in ((pygame.K_a, 'a'), (pygame.K_b, 'b'), (pygame.K_RETURN, '\r')):
+            pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=key, unicode=char))
+        with patch("pygame.display.update") as mock_update:
+            self.assertEqual(main_menu.main_menu(), ("start", "ab"))
+        calls = mock_update.call_args_list
+        self.assertEqual(calls[0], unittest.mock.call())
+        self.assertEqual(len(calls), 3)
+        for call in calls[1:]:
+            self.assertTrue(call.args[0].contains(main_menu.input_box))
+            self.assertLess(call.args[0].width * call.args[0].height, WINDOW_WIDTH * WINDOW_HEIGHT / 10)
+
+
+class TestFramePacing(unittest.TestCase):
+    def test_focus_lowers_the_cap(self):
+        """Test that losing focus switches to the idle frame cap and regaining it restores the target."""
+        pacer = FramePacer(target_fps=60, idle_fps=10)
+        pacer.handle_event(pygame.event.Event(pygame.WINDOWFOCUSLOST))
+        self.assertEqual(pacer.fps_cap, 10)
+        pacer.handle_event(pygame.event.Event(pygame.WINDOWFOCUSGAINED))
+        self.assertEqual(pacer.fps_cap, 60)
+
+    def test_tick_sleeps_to_the_cap(self):
+        """Test that ticking at a 50 FPS cap takes at least 20ms per frame."""
+        pacer = FramePacer(target_fps=50)
+        pacer.tick()
+        start = time.perf_counter()
+        for _ in range(5):
+            pacer.tick()
+        self.assertGreaterEqual(time.perf_counter() - start, 0.09)
+
+    def test_wait_for_restart_blocks_on_events(self):
+        """Test that the restart screen waits for events instead of polling."""
+        game = Game("TestPlayer")
+        pygame.event.clear()
+        pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_r, unicode='r'))
+        with patch.object(game, "restart_game") as mock_restart, patch("pygame.event.get") as mock_get:
+            game.wait_for_restart()
+        mock_restart.assert_called_once()
+        mock_get.assert_not_called()
+
+
+class TestStartup(unittest.TestCase):
+    def setUp(self):
+        Game("TestPlayer")
+
+    def test_preloader_prepares_level(self):
+        """Test that the preloader builds the level in the background and times each phase."""
+        timer = StartupTimer()
+        prepared = Preloader(LEVEL_PATH, timer).result()
+        self.assertEqual(prepared[0].path, LEVEL_PATH)
+        self.assertTrue(prepared[2])
+        for phase in ('import (game)', 'asset decode', 'level build', 'wait at start'):
+            self.assertIn(phase, timer.phases)
+            self.assertIn(phase, timer.report())
+
+    def test_world_uses_prepared_level(self):
+        """Test that a World given a prepared level uses its tiles and chunks instead of rebuilding them."""
+        prepared = World.prepare_level(LEVEL_PATH)
+        with patch("world.Level.load") as mock_load:
+            world = World(prepared=prepared)
+        mock_load.assert_not_called()
+        self.assertIs(world.level, prepared[0])
+        self.assertIs(world.all_sprites.chunks, prepared[2])
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = join(self.directory, 'run.trr')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_game_recording_replays_headless(self):
+        """Test that input recorded in the windowed game reproduces the same final state headlessly."""
+        game = Game("TestPlayer")
+        game.recorder = InputRecorder()
+        game.restart_game()
+        for tick in range(600):
+            aim = (300 - tick, 120.4)
+            game.step(FIXED_TIMESTEP, InputState(((tick // 100) % 3 - 1, 1), tick % 50 < 20, tick % 7 == 0, aim))
+        game.recorder.save(self.path, game)
+        recording = load(self.path)
+        self.assertEqual(recording.steps, 600)
+        report = replay(recording)
+        self.assertTrue(report['verified'])
+        self.assertEqual(report['steps'], 600)
+
+    def test_tampered_recording_is_rejected(self):
+        """Test that changing recorded input makes verification fail."""
+        simulation = Simulation(ScriptedInput(TestSimulation.policy))
+        simulation.recorder = InputRecorder()
+        simulation.run(300)
+        simulation.recorder.runs[0][1] = simulation.recorder.runs[0][1]._replace(move=(-1, 0))
+        simulation.recorder.save(self.path, simulation)
+        self.assertFalse(replay(self.path)['verified'])
+
+
+class TestWorldStreaming(unittest.TestCase):
+    def setUp(self):
+        self.simulation = Simulation(stream=True)
+        self.streamer = self.simulation.streamer
+
+    def test_loads_only_chunks_around_player(self):
+        """Test that only the chunks around the player are loaded, with just the colliders overlapping them."""
+        needed = set(self.streamer.needed(self.simulation.player.rect.center))
+        self.assertEqual(set(self.streamer.loaded), needed)
+        self.assertLess(len(needed), self.streamer.stream.chunk_columns * self.streamer.stream.chunk_rows)
+        expected = {index for key in needed for index in self.streamer.stream.chunk_collisions.get(key, ())}
+        self.assertEqual(set(self.streamer.collider_refs), expected)
+        self.assertLess(len(expected), len(self.streamer.stream.collisions))
+
+    def test_evicted_chunks_park_and_respawn_enemies(self):
+        """Test that chunks no longer needed are evicted and their parked enemies come back with them."""
+        enemies = sorted(enemy.rect.center for enemy in self.simulation.enemy_sprites)
+        self.streamer.capacity = 0
+        far = (self.streamer.stream.width * TILE_SIZE - 100, self.streamer.stream.height * TILE_SIZE - 100)
+        self.streamer.update(far)
+        self.assertEqual(set(self.streamer.loaded), set(self.streamer.needed(far)))
+        self.assertGreater(self.streamer.stats()['parked'], 0)
+        self.streamer.update(self.simulation.player.rect.center)
+        self.assertEqual(sorted(enemy.rect.center for enemy in self.simulation.enemy_sprites), enemies)
+
+    def test_unchunked_rendering_draws_streamed_chunks(self):
+        """Test that a streamed level is drawn when chunked rendering is off."""
+        game = Game("TestPlayer")
+        world = World(stream=True)
+        try:
+            world.streamer.update(world.player.rect.center, wait=True)
+            world.all_sprites.chunked = False
+            world.all_sprites.display_surface.fill('black')
+            self.assertGreaterEqual(world.all_sprites.draw(world.player.rect.center), len(world.streamer.loaded))
+            surface = world.all_sprites.display_surface
+            self.assertTrue(any(surface.get_at((x, y))[:3] != (0, 0, 0)
+                                for x in range(0, WINDOW_WIDTH, 64) for y in range(0, WINDOW_HEIGHT, 64)))
+        finally:
+            world.streamer.close()
+            game.all_sprites.invalidate()
+
+    def test_background_loading(self):
+        """Test that a windowed world bakes its chunks on the loader thread and draws them."""
+        Game("TestPlayer")
+        world = World(stream=True)
+        try:
+            self.assertIsNotNone(world.streamer.worker)
+            self.assertEqual(set(world.all_sprites.chunks), set(world.streamer.loaded))
+        finally:
+            world.streamer.close()
+
+
+class TestCoop(unittest.TestCase):
+    def test_snapshot_delta_round_trip(self):
+        """Test that a delta snapshot carries only changes and decodes to the full state."""
+        baseline = {1: entity_state(PLAYER, (100, 100), 250, 250), 2: entity_state(ENEMY, (300, 40)),
+                    3: entity_state(ENEMY, (50, 60))}
+        entities = {1: entity_state(PLAYER, (102.5, 100), 240, 250), 2: baseline[2], 4: entity_state(ENEMY, (8, 9))}
+        full = encode_snapshot(1, 0, 0, 1, baseline, {})
+        delta = encode_snapshot(2, 1, 7, 1, entities, baseline)
+        self.assertLess(len(delta), len(encode_snapshot(2, 0, 7, 1, entities, {})))
+        received = {1: decode_snapshot(full, {})[3]}
+        self.assertEqual(decode_snapshot(delta, received), (2, 7, 1, entities))
+        self.assertIsNone(decode_snapshot(delta, {}))
+
+    def test_enemies_chase_the_nearest_player(self):
+        """Test that every client gets a player and enemies retarget to whoever is closest."""
+        world = CoopWorld(enemy_count=10)
+        near = world.add_player(1)
+        far = world.add_player(2)
+        far.player.hitbox_rect.center = far.player.rect.center = (-5000, -5000)
+        world.step(FIXED_TIMESTEP)
+        self.assertTrue(all(enemy.player is near.player for enemy in world.enemy_sprites))
+        entities, own = world.snapshot()
+        self.assertEqual(set(own), {1, 2})
+        self.assertEqual(sum(state[0] == ENEMY for state in entities.values()), len(world.enemy_sprites))
+        world.restart_game()
+        self.assertEqual(set(world.seats), {1, 2})
+
+    def test_load_test(self):
+        """Test that bot clients play over localhost and deltas are smaller than full snapshots."""
+        report = asyncio.run(load_test(clients=2, enemies=10, duration=1.0))
+        self.assertGreater(report['ticks'], 10)
+        self.assertEqual(report['players'], 0)
+        self.assertGreater(report['down_kbps_per_client'], 0)
+        self.assertLess(report['snapshot_bytes_mean'], report['full_snapshot_bytes_mean'])
 
 
 if __name__ == "__main__":
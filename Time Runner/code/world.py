@@ -0,0 +1,273 @@
+import pygame
+from settings import *
+from player import *
+from sprites import *
+from assets import assets
+from controls import IDLE_INPUT
+from groups import AllSprites, CollisionSprites, sweep_pairs
+from pathfinding import FlowField
+from level import Level
+from profiler import profiler
+from pool import SpritePool
+from streaming import LevelStream, WorldStreamer
+from lod import EnemyLOD
+try:
+    from swarm import EnemySwarm
+except ImportError:  # NumPy is optional; without it every Enemy moves itself
+    EnemySwarm = None
+
+
+class World:
+    """
+    Game simulation without a window: level, sprites, shooting, collisions and the fixed-step update.
+
+    Game adds the display, menus and history on top; Simulation runs it headless. With stream=True
+    the level is streamed in chunks around the player instead of being built whole (see WorldStreamer).
+    `prepared` is the result of prepare_level() for level_path, e.g. built by a Preloader during the menu.
+    """
+
+    IMAGES = tuple(join('images', name) for name in ('arrow.png', 'boss.png', 'boy.png', 'bullet.png', 'slime.png'))
+    # The swarm, flow field and enemy LOD are built around the one player; worlds with several turn them off
+    swarm_enabled = ENEMY_SWARM
+    flow_field_enabled = FLOW_FIELD
+    lod_enabled = ENEMY_LOD
+
+    def __init__(self, level_path=LEVEL_PATH, headless=False, stream=STREAM_WORLD, prepared=None):
+        self.level_path = level_path
+        self.headless = headless
+        self.prepared = prepared
+        self.stream = None
+        self.streamer = None
+        self.streaming = stream
+        self.game_over_state = False
+        self.sim_time = 0.0
+
+        # Groups
+        self.all_sprites = AllSprites()
+        self.collision_sprites = CollisionSprites()
+        self.bullet_sprites = pygame.sprite.Group()
+        self.enemy_sprites = pygame.sprite.Group()
+        self.level = None
+        # InputRecorder logging every tick's input, if any
+        self.recorder = None
+
+        # Bullets and enemies are recycled instead of allocated per spawn
+        self.bullet_pool = SpritePool(Bullet)
+        self.enemy_pool = SpritePool(Enemy)
+
+        # Collision instrumentation (per frame)
+        self.broad_phase_pairs = 0
+        self.narrow_phase_tests = 0
+
+        # Arrow timer
+        self.can_shoot = True
+        self.shoot_time = 0
+        self.arrow_cooldown = 800
+
+        # Setup
+        self.load_images()
+        self.setup()
+
+    def ticks(self):
+        """Simulation time in milliseconds."""
+        return int(self.sim_time * 1000)
+
+    def load_images(self):
+        assets.preload(self.IMAGES)
+        self.bullet_surf = assets.image(join('images', 'bullet.png'))
+
+    def input(self, state):
+        if state.fire and self.can_shoot and self.player.ammo_count == 1:
+            pos = self.arrow.rect.center + self.arrow.player_direction * 50
+            self.bullet_pool.acquire(self.bullet_surf, pos, self.arrow.player_direction,
+                                     (self.all_sprites, self.bullet_sprites), self.boss)
+            self.player.ammo_count -= 1
+            self.can_shoot = False
+            self.shoot_time = self.ticks()
+
+    def arrow_timer(self):
+        if not self.can_shoot:
+            current_time = self.ticks()
+            if current_time - self.shoot_time >= self.arrow_cooldown:
+                self.can_shoot = True
+
+    def setup(self):
+        """Spawn the level's dynamic entities, parsing the level only the first time."""
+        if self.level is None:
+            self.load_level(self.level_path)
+        self.swarm = (EnemySwarm(self.collision_sprites, flow_field=self.flow_field)
+                      if self.swarm_enabled and EnemySwarm and not self.stream else None)
+        self.lod = EnemyLOD() if self.lod_enabled and not self.swarm else None
+        spawns = self.spawns()
+        self.reserve_pools(spawns)
+        for spawn in spawns:
+            self.spawn(spawn)
+        if self.stream:
+            # Headless runs load chunks synchronously so they stay deterministic
+            if self.streamer is None:
+                self.streamer = WorldStreamer(self, self.stream, threaded=not self.headless)
+            else:
+                self.streamer.respawn()
+            self.streamer.update(self.player.rect.center, wait=True)
+        if self.lod:
+            self.lod.reassess_all(self.player.rect.center)
+
+    def spawn(self, spawn):
+        """Create the entity of one Spawn; enemies need the player to exist already."""
+        if spawn.name == 'player':
+            self.player = Player(spawn.pos, self.all_sprites, self.collision_sprites)
+            self.arrow = Arrow(self.player, self.all_sprites)
+        elif spawn.name == 'enemy':
+            self.enemy_pool.acquire(spawn.pos, (self.all_sprites, self.enemy_sprites), self.player,
+                                    self.collision_sprites, self.swarm, self.flow_field, self.lod)
+        elif spawn.name == 'boss':
+            self.boss = Boss(spawn.pos, self.all_sprites, self.collision_sprites)
+
+    def spawns(self):
+        """Return the spawn table used by setup()."""
+        return self.level.spawns
+
+    def reserve_pools(self, spawns):
+        """Preallocate one enemy per enemy spawn and BULLET_POOL_SIZE bullets."""
+        pos = spawns[0].pos if spawns else (0, 0)
+        self.enemy_pool.reserve(sum(spawn.name == 'enemy' for spawn in spawns), pos, (), None, self.collision_sprites)
+        self.bullet_pool.reserve(BULLET_POOL_SIZE, self.bullet_surf, pos, pygame.Vector2(1, 0), ())
+
+    @property
+    def active_enemies(self):
+        """Enemies simulated this tick; sleeping (far) enemies are not counted."""
+        return self.lod.active if self.lod else len(self.enemy_sprites)
+
+    def pool_stats(self):
+        return {'bullets': self.bullet_pool.stats(), 'enemies': self.enemy_pool.stats()}
+
+    @staticmethod
+    def prepare_level(path, images=True):
+        """
+        Load a level and bake its static chunks without a World, so it can run on a worker thread.
+
+        Returns:
+            tuple: (Level, tiles, chunks or None), to pass to World as `prepared`.
+        """
+        level = Level.load(path, images=images)
+        tiles = [Tile(pos, image) for pos, image in level.tiles]
+        return level, tiles, AllSprites.bake_chunks(tiles) if CHUNKED_RENDERING else None
+
+    def load_level(self, path):
+        """Parse a level (unless it was prepared) and build its static tiles, colliders and flow field."""
+        if self.streaming:
+            self.open_stream(path)
+            return
+        prepared, self.prepared = self.prepared, None
+        if prepared is None or prepared[0].path != path:
+            prepared = self.prepare_level(path, images=not self.headless)
+        self.level, tiles, chunks = prepared
+        self.all_sprites.set_static(tiles, chunks)
+        self.collision_sprites.empty()
+        for rect in self.level.collisions:
+            self.collision_sprites.add_rect(*rect)
+        self.collision_sprites.build_index()
+        self.flow_field = (FlowField(self.collision_sprites, self.level.width, self.level.height)
+                           if self.flow_field_enabled else None)
+
+    def open_stream(self, path):
+        """
+        Open a level for streaming: only the player and boss spawn up front, tiles, colliders and
+        enemies arrive with their chunks. The flow field and swarm cover the whole map, so streamed
+        enemies steer straight at the player instead.
+        """
+        self.stream = LevelStream(path, images=not self.headless)
+        self.level = Level(path, self.stream.width, self.stream.height, (), (), tuple(self.stream.global_spawns))
+        self.all_sprites.set_static([])
+        self.collision_sprites.empty()
+        self.flow_field = None
+
+    def change_level(self, path, prepared=None):
+        """Replace the level with another one (prepare_level() output, if given) and start it like restart_game()."""
+        if self.streamer:
+            self.streamer.close()
+            self.streamer = None
+        self.stream = None
+        self.level = None
+        self.level_path = path
+        self.prepared = prepared
+        self.restart_game()
+
+    def collide_mask(self, sprite_a, sprite_b):
+        """Narrow phase: pixel-perfect mask test, counted for instrumentation."""
+        self.narrow_phase_tests += 1
+        return pygame.sprite.collide_mask(sprite_a, sprite_b)
+
+    def arrow_collision(self):
+        for bullet, enemies in sweep_pairs(self.bullet_sprites, self.enemy_sprites):
+            self.broad_phase_pairs += len(enemies)
+            collided_enemies = [enemy for enemy in enemies if enemy.alive() and self.collide_mask(bullet, enemy)]
+            if collided_enemies:
+                bullet.kill()
+            for enemy in collided_enemies:
+                enemy.kill()
+
+    def player_collision(self):
+        candidates = pygame.sprite.spritecollide(self.player, self.enemy_sprites, False)
+        self.broad_phase_pairs += len(candidates)
+        if any(self.collide_mask(self.player, enemy) for enemy in candidates):
+            self.game_over_state = True
+        if self.boss and self.player.rect.colliderect(self.boss.rect) and self.collide_mask(self.player, self.boss):
+            self.game_over_state = True
+
+    @property
+    def result(self):
+        """'lose' once the player was caught, 'win' once the boss is dead, otherwise None."""
+        if self.game_over_state:
+            return 'lose'
+        if self.boss and self.boss.health <= 0:
+            return 'win'
+        return None
+
+    def step(self, delta_time, state=IDLE_INPUT):
+        """
+        Advance the simulation by one tick.
+
+        Args:
+            delta_time (float): Tick length in seconds (FIXED_TIMESTEP in the game loop).
+            state (InputState): Player input for this tick.
+        """
+        if self.recorder:
+            state = self.recorder.record(state)
+        self.sim_time += delta_time
+        self.broad_phase_pairs = 0
+        self.narrow_phase_tests = 0
+        self.player.input_state = state
+        if self.streamer:
+            with profiler.scope('stream'):
+                self.streamer.update(self.player.rect.center)
+        with profiler.scope('input'):
+            self.arrow_timer()
+            self.input(state)
+        with profiler.scope('arrow_collision'):
+            self.arrow_collision()
+        with profiler.scope('player_collision'):
+            self.player_collision()
+        with profiler.scope('update'):
+            if self.flow_field:
+                self.flow_field.update(self.player.rect.center)
+            self.all_sprites.update(delta_time)
+            if self.swarm:
+                self.swarm.update(self.player.rect.center, delta_time)
+            if self.lod:
+                self.lod.update(self.player.rect.center, delta_time)
+
+    def restart_game(self):
+        """Reset the dynamic entities and timers; the parsed level and static tiles are kept."""
+        self.game_over_state = False
+        self.bullet_pool.release_all()
+        self.enemy_pool.release_all()
+        self.enemy_sprites.empty()
+        self.bullet_sprites.empty()
+        self.all_sprites.empty()
+        self.can_shoot = True
+        self.shoot_time = 0
+        self.sim_time = 0.0
+        if self.recorder:
+            self.recorder.clear()
+        self.setup()